@@ -34,8 +34,9 @@ class AlarmDialog:
         # 将窗口居中显示
         self._center_window()
 
-        # 开始播放闹钟音乐
-        self.audio_player.play_alarm(self.alarm.audio_file)
+        # 开始播放闹钟音乐（以闹钟ID为键，多个提醒窗口各自播放）
+        self.audio_player.play_alarm(self.alarm.audio_file, key=self.alarm.id,
+                                     priority=self.alarm.priority)
 
     def _create_widgets(self):
         """创建对话框控件"""
@@ -98,8 +99,8 @@ class AlarmDialog:
 
     def _on_close(self):
         """关闭对话框"""
-        # 停止播放音乐
-        self.audio_player.stop()
+        # 只停止本闹钟的音乐，其他同时响铃的闹钟继续播放
+        self.audio_player.stop(self.alarm.id)
 
         # 关闭窗口
         self.window.destroy()
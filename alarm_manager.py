@@ -1,41 +1,152 @@
 # alarm_manager.py - 闹钟管理核心逻辑
 
-import json
+import heapq
 import os
 import threading
 import time
 import uuid
-from datetime import datetime
-from typing import Dict, Optional, Callable
+from collections import deque
+from datetime import datetime, time as dt_time, timedelta
+from typing import Dict, Iterable, List, Optional, Callable
+from clock import WallClock
+from countdown import CountdownTimer
+from metrics import REGISTRY
+from recurrence import compile_rule
+from scheduler import create_scheduler
+from storage import LOAD_ERRORS, JsonFileStorage, create_storage
+from utils import parse_minute_of_day, parse_time_of_day
+
+
+# 调度线程单次最长休眠时间（秒）：休眠使用单调时钟，墙上时间跳变或系统休眠后
+# 最迟在这么长时间内被发现
+MAX_SLEEP_SECONDS = 60
+
+# 墙上时间与单调时钟的进度相差超过该秒数时，视为时钟跳变或系统休眠
+CLOCK_JUMP_SECONDS = 5
+
+# 默认补发窗口（秒）：错过的闹钟在该时间内补发一次，超过则跳过
+CATCH_UP_GRACE_SECONDS = 15 * 60
+
+# 触发延迟统计保留的最近样本数
+LATENESS_SAMPLES = 1000
+
+# 默认预热窗口（秒）：该时间内将要触发的闹钟，提前通知on_prewarm解码音频
+PREWARM_SECONDS = 5 * 60
+
+# 倒计时器到期判断的容差（秒）：墙上时间换算带来的舍入误差不视为提前到期
+COUNTDOWN_TOLERANCE = 0.001
+
+# 一天的分钟数，即分钟索引的格数
+MINUTES_PER_DAY = 1440
+
+
+# 闹钟共享的分段锁，代替每个闹钟各自持有一把RLock
+LOCK_STRIPES = 64
+_alarm_locks = [threading.RLock() for _ in range(LOCK_STRIPES)]
 
 
 class Alarm:
-    """单个闹钟"""
+    """单个闹钟
+
+    使用__slots__减少内存占用：时间在设置时解析一次并保存为一天中的毫秒数，
+    上次触发时间保存为时间戳，锁从共享的分段锁中按ID选取。
+    时间可以是"HH:MM"（整分钟），也可以精确到秒"HH:MM:SS"或毫秒"HH:MM:SS.mmm"。
+    设置了重复规则recurrence（见recurrence.py）时按规则触发，repeat_daily不再起作用。
+    priority是播放优先级：同时响铃的闹钟超过播放通道数时，优先级高的抢占优先级低的。
+    """
+
+    __slots__ = ('id', '_time_str', '_ms_of_day', 'repeat_daily', 'enabled',
+                 'audio_file', 'message', 'priority', '_last_triggered', 'has_triggered', '_rule')
 
     def __init__(self, alarm_id: str, time_str: str, repeat_daily: bool = True,
-                 enabled: bool = True, audio_file: str = None, message: str = ""):
+                 enabled: bool = True, audio_file: str = None, message: str = "",
+                 created_at: Optional[datetime] = None, recurrence: Optional[str] = None,
+                 priority: int = 0):
         self.id = alarm_id  # UUID
-        self.time_str = time_str  # "HH:MM"格式
+        self.time_str = time_str  # "HH:MM"、"HH:MM:SS"或"HH:MM:SS.mmm"格式
         self.repeat_daily = repeat_daily
         self.enabled = enabled
         self.audio_file = audio_file  # None表示使用默认音乐
         self.message = message  # 提醒内容
-        # 初始化last_triggered为当前时间的整分钟（避免立即触发）
-        now = datetime.now()
-        # 设置为当前分钟的起始（秒和微秒归零）
-        self.last_triggered = datetime(now.year, now.month, now.day, now.hour, now.minute, 0, 0)
-        # 线程锁，保护should_trigger方法的并发访问
-        self.lock = threading.RLock()
+        self.priority = priority  # 播放优先级，越大越优先
+        # 初始化上次触发时间为创建时间（默认当前时间）的整分钟（避免立即触发）
+        created = time.time() if created_at is None else created_at.timestamp()
+        self._last_triggered: Optional[float] = float(int(created) // 60 * 60)
+        # 非重复闹钟是否已经触发过
+        self.has_triggered = False
+        # 编译后的重复规则，None表示按repeat_daily每天或只触发一次
+        self.recurrence = recurrence
 
     @property
-    def time(self):
-        """解析时间字符串为datetime.time对象"""
+    def time_str(self) -> str:
+        """时间字符串（"HH:MM"、"HH:MM:SS"或"HH:MM:SS.mmm"格式）"""
+        return self._time_str
+
+    @time_str.setter
+    def time_str(self, value: str):
+        """设置时间字符串，同时解析出一天中的毫秒数"""
         try:
-            return datetime.strptime(self.time_str, "%H:%M").time()
-        except ValueError:
-            # 如果时间格式无效，返回默认时间（午夜）并记录错误
-            print(f"警告：无效的时间格式 '{self.time_str}'，使用00:00代替")
-            return datetime.strptime("00:00", "%H:%M").time()
+            ms_of_day = parse_time_of_day(value)
+        except (AttributeError, TypeError, ValueError):
+            # 如果时间格式无效，使用默认时间（午夜）并记录错误
+            print(f"警告：无效的时间格式 '{value}'，使用00:00代替")
+            ms_of_day = 0
+        self._time_str = value
+        self._ms_of_day = ms_of_day
+
+    @property
+    def time(self) -> dt_time:
+        """闹钟时间（datetime.time对象）"""
+        seconds, millisecond = divmod(self._ms_of_day, 1000)
+        return dt_time(seconds // 3600, seconds // 60 % 60, seconds % 60, millisecond * 1000)
+
+    @property
+    def minute_of_day(self) -> int:
+        """闹钟时间在一天中的分钟数（0-1439）"""
+        return self._ms_of_day // 60000
+
+    @property
+    def recurrence(self) -> Optional[str]:
+        """重复规则字符串，例如 "weekly:mon-fri"、"cron:*/15 9-17 * * *"，None表示未设置"""
+        return self._rule.spec if self._rule is not None else None
+
+    @recurrence.setter
+    def recurrence(self, value: Optional[str]):
+        """设置重复规则（编译后的规则对象按字符串共享）"""
+        rule = None
+        if value:
+            try:
+                rule = compile_rule(value)
+            except (TypeError, ValueError) as e:
+                # 规则无效时按未设置处理并记录错误
+                print(f"警告：无效的重复规则 '{value}'，已忽略: {e}")
+        self._rule = rule
+
+    @property
+    def ms_of_day(self) -> int:
+        """闹钟时间在一天中的毫秒数"""
+        return self._ms_of_day
+
+    @property
+    def precise(self) -> bool:
+        """是否精确到秒或毫秒（"HH:MM"格式的闹钟在整分钟内都算当前时间）"""
+        return self._time_str.count(":") > 1
+
+    @property
+    def lock(self) -> threading.RLock:
+        """保护闹钟状态的锁（按ID选取的共享分段锁）"""
+        return _alarm_locks[hash(self.id) % LOCK_STRIPES]
+
+    @property
+    def last_triggered(self) -> Optional[datetime]:
+        """上次触发时间"""
+        if self._last_triggered is None:
+            return None
+        return datetime.fromtimestamp(self._last_triggered)
+
+    @last_triggered.setter
+    def last_triggered(self, value: Optional[datetime]):
+        self._last_triggered = None if value is None else value.timestamp()
 
     def should_trigger(self, current_time: datetime) -> bool:
         """检查是否应该触发闹钟"""
@@ -43,35 +154,67 @@ class Alarm:
             if not self.enabled:
                 return False
 
-            current_time_only = current_time.time()
-            alarm_time = self.time
-
             # 检查时间是否匹配
-            time_matches = (current_time_only.hour == alarm_time.hour and
-                           current_time_only.minute == alarm_time.minute)
-
-            if not time_matches:
+            if current_time.hour * 60 + current_time.minute != self.minute_of_day:
                 return False
 
-            # 检查是否已经触发过
-            if self.last_triggered:
-                # 如果是非重复闹钟，只触发一次
-                if not self.repeat_daily:
-                    return False
+            # 非重复闹钟只触发一次
+            if not self.repeat_daily and self.has_triggered:
+                return False
 
-                # 重复闹钟：检查是否在同一天同一分钟已经触发过
-                if (self.last_triggered.date() == current_time.date() and
-                    self.last_triggered.hour == current_time.hour and
-                    self.last_triggered.minute == current_time.minute):
-                    return False
+            # 检查是否在同一天同一分钟已经触发过
+            if (self._last_triggered is not None and
+                    self._last_triggered // 60 == int(current_time.timestamp()) // 60):
+                return False
 
             # 记录触发时间
-            self.last_triggered = current_time
+            self.mark_triggered(current_time)
             return True
 
+    def next_trigger_time(self, now: datetime) -> Optional[datetime]:
+        """计算从now开始的下一次触发时间，不会再触发时返回None"""
+        with self.lock:
+            if not self.enabled:
+                return None
+            if self._rule is not None:
+                return self._next_rule_time(now)
+            if not self.repeat_daily and self.has_triggered:
+                return None
+
+            ms = self._ms_of_day
+            candidate = now.replace(hour=ms // 3600000, minute=ms // 60000 % 60,
+                                    second=ms // 1000 % 60, microsecond=ms % 1000 * 1000)
+            # 已经过去的时间顺延到下一天（"HH:MM"闹钟在整分钟内都算当前时间）
+            window = timedelta(0) if self.precise else timedelta(minutes=1)
+            if candidate + window <= now:
+                candidate += timedelta(days=1)
+            # 本分钟已触发过（或时钟被调回）时，顺延到上次触发之后的第一天
+            if self._last_triggered is not None:
+                behind = self._last_triggered - candidate.timestamp()
+                if behind >= 86400:
+                    candidate += timedelta(days=int(behind // 86400))
+                while candidate.timestamp() <= self._last_triggered:
+                    candidate += timedelta(days=1)
+            return max(candidate, now)
+
+    def _next_rule_time(self, now: datetime) -> Optional[datetime]:
+        """按重复规则计算下一次触发时间（调用方需持有锁）"""
+        # 与每日闹钟一致："HH:MM"闹钟在整分钟内都算当前时间，且不早于上次触发
+        after = now if self.precise else now - timedelta(minutes=1)
+        if self._last_triggered is not None:
+            after = max(after, datetime.fromtimestamp(self._last_triggered))
+        candidate = self._rule.next_after(after, self._ms_of_day)
+        return None if candidate is None else max(candidate, now)
+
+    def mark_triggered(self, current_time: datetime):
+        """记录一次触发"""
+        with self.lock:
+            self._last_triggered = current_time.timestamp()
+            self.has_triggered = True
+
     def to_dict(self) -> dict:
         """转换为字典用于序列化"""
-        return {
+        data = {
             'id': self.id,
             'time_str': self.time_str,
             'repeat_daily': self.repeat_daily,
@@ -79,87 +222,531 @@ class Alarm:
             'audio_file': self.audio_file,
             'message': self.message
         }
+        if self._rule is not None:
+            data['recurrence'] = self._rule.spec
+        if self.priority:
+            data['priority'] = self.priority
+        # 触发状态：保证一次性闹钟在重新加载或重启后不再触发
+        if self.has_triggered:
+            data['has_triggered'] = True
+            if self._last_triggered is not None:
+                data['last_triggered'] = datetime.fromtimestamp(self._last_triggered).isoformat()
+        return data
 
     @classmethod
-    def from_dict(cls, data: dict) -> 'Alarm':
-        """从字典创建Alarm实例"""
-        return cls(
+    def from_dict(cls, data: dict, created_at: Optional[datetime] = None) -> 'Alarm':
+        """从字典创建Alarm实例（恢复保存的触发状态）"""
+        alarm = cls(
             alarm_id=data.get('id', str(uuid.uuid4())),
             time_str=data['time_str'],
             repeat_daily=data.get('repeat_daily', True),
             enabled=data.get('enabled', True),
             audio_file=data.get('audio_file'),
-            message=data.get('message', '')
+            message=data.get('message', ''),
+            created_at=created_at,
+            recurrence=data.get('recurrence'),
+            priority=data.get('priority', 0)
         )
+        alarm.has_triggered = bool(data.get('has_triggered', False))
+        if data.get('last_triggered'):
+            try:
+                last_triggered = datetime.fromisoformat(data['last_triggered']).timestamp()
+            except (TypeError, ValueError):
+                print(f"警告：无效的上次触发时间 '{data['last_triggered']}'，已忽略")
+            else:
+                # 不早于创建时间所在的整分钟（加载时不立即触发）
+                alarm._last_triggered = max(alarm._last_triggered, last_triggered)
+        return alarm
+
+
+class AlarmEvent:
+    """一次闹钟触发事件：闹钟、排程的触发时间和实际触发时间"""
+
+    __slots__ = ('alarm', 'fire_time', 'fired_at')
+
+    def __init__(self, alarm: Alarm, fire_time: datetime, fired_at: datetime):
+        self.alarm = alarm
+        self.fire_time = fire_time
+        self.fired_at = fired_at
+
+    @property
+    def id(self) -> str:
+        return self.alarm.id
+
+    @property
+    def late_by(self) -> float:
+        """比排程时间晚了多少秒（时钟跳变、系统休眠后补发时大于0）"""
+        return max(0.0, (self.fired_at - self.fire_time).total_seconds())
+
+    def __repr__(self) -> str:
+        return (f"AlarmEvent({self.alarm.id!r}, {self.alarm.time_str!r}, "
+                f"{self.fired_at.isoformat()}, late_by={self.late_by:.0f})")
 
 
 class AlarmManager:
     """闹钟管理器"""
 
-    def __init__(self, config_file: str = "config/alarms.json"):
+    def __init__(self, config_file: str = "config/alarms.json", engine: str = "heap",
+                 clock=None, storage: str = "json", compact_threshold: int = 1000,
+                 writer=None, dispatcher=None, grace_seconds: float = CATCH_UP_GRACE_SECONDS,
+                 prewarm_seconds: float = PREWARM_SECONDS, metrics=None):
         self.alarms: Dict[str, Alarm] = {}
         self.config_file = config_file
+        # 时钟：默认真实时钟，测试和模拟时可注入clock.VirtualClock
+        self.clock = clock or WallClock()
         self.running = False
         self.paused = False
         self.check_thread: Optional[threading.Thread] = None
         self.on_alarm_trigger: Optional[Callable[[Alarm], None]] = None  # 回调函数
+        # 闹钟增删改后的回调，参数为变化的闹钟ID列表；批量操作只调用一次
+        self.on_alarms_changed: Optional[Callable[[List[str]], None]] = None
+        # 触发事件回调，参数为AlarmEvent（包含补发时的迟到秒数late_by）
+        self.on_alarm_event: Optional[Callable[[AlarmEvent], None]] = None
+        # 回调分发器（dispatcher.CallbackDispatcher）：为None时在调度线程中直接调用回调
+        self.dispatcher = dispatcher
         self.lock = threading.RLock()  # 可重入线程锁，保护alarms字典
+        # 调度线程在该条件变量上休眠，闹钟变化时被唤醒
+        self._wakeup = threading.Condition(self.lock)
+        # 调度引擎："heap"（最小堆）或 "wheel"（分层时间轮，适合超大闹钟集合）
+        self._scheduler = create_scheduler(engine)
+        self._scheduler.reset(self.clock.now())
+        # 分钟索引：一天中的分钟数 -> 该分钟的闹钟ID集合
+        self._minute_index: List[set] = [set() for _ in range(MINUTES_PER_DAY)]
+        self._indexed_minute: Dict[str, int] = {}  # 闹钟ID -> 所在分钟
+        # 时钟跳变检测：上次检查时的 (墙上时间, 单调时钟)
+        self._clock_mark: Optional[tuple] = None
+        # 补发窗口：时钟跳变或系统休眠期间错过的闹钟，迟到不超过该秒数时补发一次
+        self.grace_seconds = grace_seconds
+        # 最近触发的延迟（秒），用于lateness_stats
+        self._lateness = deque(maxlen=LATENESS_SAMPLES)
+        # 运行指标（metrics.py）：默认记录到全局注册表metrics.REGISTRY
+        self.metrics = metrics or REGISTRY
+        self._register_metrics(self.metrics)
+        # 音频预热回调（例如AudioPlayer.prewarm），参数为即将触发的音频文件列表（None表示默认音频）
+        self.on_prewarm: Optional[Callable[[List[Optional[str]]], None]] = None
+        self.prewarm_seconds = prewarm_seconds
+        self._prewarm_pending: set = set()  # 等待通知的音频文件
+        self._prewarm_scanned: Optional[datetime] = None  # 滚动预热已扫描到的时间
 
         # 确保配置文件目录存在
         config_dir = os.path.dirname(config_file)
         if config_dir:  # 只有当目录名非空时才创建
             os.makedirs(config_dir, exist_ok=True)
 
+        # 存储后端（storage.py）：
+        #   "json"    整体重写JSON文件，可配合后台写线程writer合并写入
+        #   "journal" 每次修改追加一条日志记录，超过compact_threshold条后在后台压缩为快照
+        #   "sqlite"  按行upsert，带分钟和启用状态索引
+        #   "memory"  不保存（分片工作进程中的闹钟副本）
+        self.storage = create_storage(storage, config_file, self.lock, self._snapshot_data,
+                                      writer=writer, compact_threshold=compact_threshold)
+
+        # 倒计时器（countdown.py）：与闹钟共用调度引擎和触发回调，
+        # 剩余时间保存在闹钟配置旁的 *.timers.json 中
+        self.timers: Dict[str, CountdownTimer] = {}
+        self.timer_file = os.path.splitext(config_file)[0] + ".timers.json"
+        self._timer_storage = JsonFileStorage(self.timer_file, self.lock, self._timer_snapshot, writer)
+
     def add_alarm(self, time_str: str, repeat_daily: bool = True,
-                  audio_file: str = None) -> str:
+                  audio_file: str = None, recurrence: str = None, priority: int = 0) -> str:
         """添加新闹钟"""
         alarm_id = str(uuid.uuid4())
-        alarm = Alarm(alarm_id, time_str, repeat_daily, True, audio_file)
+        alarm = Alarm(alarm_id, time_str, repeat_daily, True, audio_file,
+                      created_at=self.clock.now(), recurrence=recurrence, priority=priority)
         with self.lock:
             self.alarms[alarm_id] = alarm
-        self.save_alarms()
+            self._index_alarm(alarm)
+            self._schedule_alarm(alarm, self.clock.now())
+            self._persist_put(alarm)
+        self._notify_changed([alarm_id])
         return alarm_id
 
     def remove_alarm(self, alarm_id: str) -> bool:
         """删除闹钟"""
         with self.lock:
-            if alarm_id in self.alarms:
-                del self.alarms[alarm_id]
-                self.save_alarms()
-                return True
-        return False
+            if alarm_id not in self.alarms:
+                return False
+            del self.alarms[alarm_id]
+            self._unindex_alarm(alarm_id)
+            self._scheduler.cancel(alarm_id)
+            self._persist_delete(alarm_id)
+        self._notify_changed([alarm_id])
+        return True
 
     def toggle_alarm(self, alarm_id: str) -> bool:
         """切换闹钟启用状态"""
         with self.lock:
-            if alarm_id in self.alarms:
-                self.alarms[alarm_id].enabled = not self.alarms[alarm_id].enabled
-                self.save_alarms()
-                return self.alarms[alarm_id].enabled
-        return False
+            if alarm_id not in self.alarms:
+                return False
+            alarm = self.alarms[alarm_id]
+            self._apply_fields(alarm, {'enabled': not alarm.enabled})
+            self._schedule_alarm(alarm, self.clock.now())
+            self._persist_put(alarm)
+            enabled = alarm.enabled
+        self._notify_changed([alarm_id])
+        return enabled
 
     def update_alarm(self, alarm_id: str, time_str: str = None,
                      repeat_daily: bool = None, enabled: bool = None,
-                     audio_file: str = None) -> bool:
-        """更新闹钟属性"""
+                     audio_file: str = None, recurrence: str = None,
+                     priority: int = None) -> bool:
+        """更新闹钟属性（recurrence为空字符串时清除重复规则）"""
         with self.lock:
             if alarm_id not in self.alarms:
                 return False
 
             alarm = self.alarms[alarm_id]
+            fields = {'time_str': time_str, 'repeat_daily': repeat_daily, 'enabled': enabled,
+                      'audio_file': audio_file, 'recurrence': recurrence, 'priority': priority}
+            self._apply_fields(alarm, {field: value for field, value in fields.items()
+                                       if value is not None})
+
+            self._schedule_alarm(alarm, self.clock.now())
+            self._persist_put(alarm)
+
+        self._notify_changed([alarm_id])
+        return True
+
+    # === 批量操作：先校验全部输入，在一次加锁内应用，只持久化和通知一次 ===
+
+    # 批量新增/修改时允许的字段
+    ALARM_FIELDS = ('time_str', 'repeat_daily', 'enabled', 'audio_file', 'message', 'recurrence',
+                    'priority')
+
+    def add_alarms(self, items: Iterable[dict]) -> List[str]:
+        """批量添加闹钟，返回与输入顺序对应的新闹钟ID列表
+
+        每项是包含time_str（必填）以及可选repeat_daily、enabled、audio_file、
+        message、recurrence、priority的字典。任一项无效时抛出ValueError，不添加任何闹钟。
+        """
+        items = list(items)
+        for index, item in enumerate(items):
+            if 'time_str' not in item:
+                raise ValueError(f"第{index}项缺少time_str")
+            self._validate_fields(index, item)
+
+        now = self.clock.now()
+        alarms = [
+            Alarm(str(uuid.uuid4()), item['time_str'],
+                  repeat_daily=item.get('repeat_daily', True),
+                  enabled=item.get('enabled', True),
+                  audio_file=item.get('audio_file'),
+                  message=item.get('message') or "",
+                  created_at=now,
+                  recurrence=item.get('recurrence'),
+                  priority=item.get('priority', 0))
+            for item in items
+        ]
+        with self.lock:
+            for alarm in alarms:
+                self.alarms[alarm.id] = alarm
+                self._index_alarm(alarm)
+                self._schedule_alarm(alarm, now, notify=False)
+            self._persist_put_many(alarms)
+            self._schedule_changed()
+        alarm_ids = [alarm.id for alarm in alarms]
+        self._notify_changed(alarm_ids)
+        return alarm_ids
+
+    def update_alarms(self, updates: Iterable[dict]) -> List[bool]:
+        """批量更新闹钟，返回每项是否找到并更新
+
+        每项是包含id以及要修改字段（见ALARM_FIELDS）的字典。
+        任一项无效时抛出ValueError，不修改任何闹钟。
+        """
+        updates = list(updates)
+        for index, update in enumerate(updates):
+            if 'id' not in update:
+                raise ValueError(f"第{index}项缺少id")
+            self._validate_fields(index, update, allowed=self.ALARM_FIELDS + ('id',))
 
-            if time_str is not None:
-                alarm.time_str = time_str
-            if repeat_daily is not None:
-                alarm.repeat_daily = repeat_daily
-            if enabled is not None:
-                alarm.enabled = enabled
-            if audio_file is not None:
-                alarm.audio_file = audio_file
+        def apply(alarm: Alarm, update: dict):
+            self._apply_fields(alarm, {field: update[field] for field in self.ALARM_FIELDS
+                                       if field in update})
 
-        self.save_alarms()
+        return self._apply_many([(update['id'], update) for update in updates], apply)
+
+    def set_enabled_many(self, alarm_ids: Iterable[str], enabled: bool) -> List[bool]:
+        """批量启用或禁用闹钟，返回每项是否找到"""
+        def apply(alarm: Alarm, _):
+            self._apply_fields(alarm, {'enabled': enabled})
+        return self._apply_many([(alarm_id, None) for alarm_id in alarm_ids], apply)
+
+    def remove_alarms(self, alarm_ids: Iterable[str]) -> List[bool]:
+        """批量删除闹钟，返回每项是否找到并删除"""
+        results = []
+        removed = []
+        with self.lock:
+            for alarm_id in alarm_ids:
+                if alarm_id in self.alarms:
+                    del self.alarms[alarm_id]
+                    self._unindex_alarm(alarm_id)
+                    self._scheduler.cancel(alarm_id)
+                    removed.append(alarm_id)
+                    results.append(True)
+                else:
+                    results.append(False)
+            if removed:
+                self._persist_delete_many(removed)
+                self._schedule_changed()
+        if removed:
+            self._notify_changed(removed)
+        return results
+
+    def put_alarms(self, alarms: Iterable[Alarm]):
+        """新增或替换闹钟对象，保留其ID和触发状态（例如分片工作进程同步父进程的闹钟）"""
+        alarms = list(alarms)
+        now = self.clock.now()
+        with self.lock:
+            for alarm in alarms:
+                self.alarms[alarm.id] = alarm
+                self._index_alarm(alarm)
+                self._schedule_alarm(alarm, now, notify=False)
+            self._persist_put_many(alarms)
+            self._schedule_changed()
+        self._notify_changed([alarm.id for alarm in alarms])
+
+    def _apply_many(self, changes: List[tuple], apply: Callable[[Alarm, object], None]) -> List[bool]:
+        """在一次加锁内对多个闹钟应用修改，统一重新排程、持久化和通知"""
+        results = []
+        changed: Dict[str, Alarm] = {}
+        now = self.clock.now()
+        with self.lock:
+            for alarm_id, change in changes:
+                alarm = self.alarms.get(alarm_id)
+                if alarm is None:
+                    results.append(False)
+                    continue
+                apply(alarm, change)
+                changed[alarm_id] = alarm
+                results.append(True)
+            for alarm in changed.values():
+                self._schedule_alarm(alarm, now, notify=False)
+            if changed:
+                self._persist_put_many(list(changed.values()))
+                self._schedule_changed()
+        if changed:
+            self._notify_changed(list(changed))
+        return results
+
+    # 修改后一次性闹钟可以再次触发的字段（此外还有重新启用）
+    REARM_FIELDS = ('time_str', 'repeat_daily', 'recurrence')
+
+    def _apply_fields(self, alarm: Alarm, fields: dict):
+        """修改闹钟字段（调用方需持有锁）
+
+        已触发的一次性闹钟被修改时间、重复方式或重新启用后视为新的闹钟，可以再次触发；
+        只修改提醒内容、音频等不会让它再次触发。
+        """
+        rearm = False
+        for field, value in fields.items():
+            if getattr(alarm, field) == value:
+                continue
+            if field in self.REARM_FIELDS or (field == 'enabled' and value):
+                rearm = True
+            setattr(alarm, field, value)
+        if 'time_str' in fields:
+            self._index_alarm(alarm)
+        if rearm:
+            alarm.has_triggered = False
+
+    def _validate_fields(self, index: int, item: dict, allowed: tuple = ALARM_FIELDS):
+        """校验批量操作中一项的字段，无效时抛出ValueError"""
+        unknown = set(item) - set(allowed)
+        if unknown:
+            raise ValueError(f"第{index}项包含未知字段: {', '.join(sorted(unknown))}")
+        if 'time_str' in item:
+            try:
+                parse_minute_of_day(item['time_str'])
+            except (TypeError, ValueError, AttributeError):
+                raise ValueError(f"第{index}项时间格式无效: {item['time_str']!r}")
+        for field in ('repeat_daily', 'enabled'):
+            if field in item and not isinstance(item[field], bool):
+                raise ValueError(f"第{index}项{field}必须是布尔值")
+        if 'priority' in item and (isinstance(item['priority'], bool) or not isinstance(item['priority'], int)):
+            raise ValueError(f"第{index}项priority必须是整数")
+        if item.get('recurrence'):
+            try:
+                compile_rule(item['recurrence'])
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"第{index}项重复规则无效: {e}")
+
+    # === 倒计时器：截止时间基于单调时钟，到期后触发一次并自动移除 ===
+
+    # 批量添加倒计时器时允许的字段
+    TIMER_FIELDS = ('duration', 'message', 'audio_file', 'persist', 'start')
+
+    def add_timer(self, duration: float, message: str = "", audio_file: str = None,
+                  start: bool = True, persist: bool = True) -> str:
+        """添加倒计时器（时长为秒），start为True时立即开始计时，返回倒计时器ID
+
+        persist为False时不保存到文件，适合大量短期的任务超时计时器。
+        """
+        timer = CountdownTimer(str(uuid.uuid4()), duration, message, audio_file, persist)
+        with self.lock:
+            monotonic = self.clock.monotonic()
+            if start:
+                timer.start(monotonic)
+            self.timers[timer.id] = timer
+            self._schedule_countdown(timer, self.clock.now(), monotonic)
+            self._persist_timers([timer])
+        return timer.id
+
+    def add_timers(self, items: Iterable[dict]) -> List[str]:
+        """批量添加倒计时器，返回与输入顺序对应的ID列表
+
+        每项是包含duration（必填）以及可选message、audio_file、start、persist的字典。
+        任一项无效时抛出ValueError，不添加任何倒计时器。
+        """
+        timers = []
+        for index, item in enumerate(items):
+            unknown = set(item) - set(self.TIMER_FIELDS)
+            if unknown:
+                raise ValueError(f"第{index}项包含未知字段: {', '.join(sorted(unknown))}")
+            if 'duration' not in item:
+                raise ValueError(f"第{index}项缺少duration")
+            try:
+                timer = CountdownTimer(str(uuid.uuid4()), item['duration'],
+                                       message=item.get('message') or "",
+                                       audio_file=item.get('audio_file'),
+                                       persist=item.get('persist', True))
+            except ValueError as e:
+                raise ValueError(f"第{index}项无效: {e}")
+            timers.append((timer, item.get('start', True)))
+
+        with self.lock:
+            now = self.clock.now()
+            monotonic = self.clock.monotonic()
+            for timer, start in timers:
+                if start:
+                    timer.start(monotonic)
+                self.timers[timer.id] = timer
+                self._schedule_countdown(timer, now, monotonic, notify=False)
+            self._persist_timers([timer for timer, _ in timers])
+            self._schedule_changed()
+        return [timer.id for timer, _ in timers]
+
+    def start_timer(self, timer_id: str) -> bool:
+        """从完整时长重新开始计时"""
+        return self._change_timer(timer_id, CountdownTimer.start)
+
+    def pause_timer(self, timer_id: str) -> bool:
+        """暂停倒计时器，保留剩余时间"""
+        return self._change_timer(timer_id, CountdownTimer.pause)
+
+    def resume_timer(self, timer_id: str) -> bool:
+        """按剩余时间继续计时（未开始的倒计时器从完整时长开始）"""
+        return self._change_timer(timer_id, CountdownTimer.resume)
+
+    def cancel_timer(self, timer_id: str) -> bool:
+        """取消并移除倒计时器"""
+        with self.lock:
+            timer = self.timers.pop(timer_id, None)
+            if timer is None:
+                return False
+            self._scheduler.cancel(timer_id)
+            self._persist_timers([timer])
         return True
 
+    def timer_remaining(self, timer_id: str) -> Optional[float]:
+        """倒计时器的剩余秒数，不存在时返回None"""
+        with self.lock:
+            timer = self.timers.get(timer_id)
+            return timer.remaining(self.clock.monotonic()) if timer else None
+
+    def get_timer(self, timer_id: str) -> Optional[CountdownTimer]:
+        """获取指定ID的倒计时器"""
+        with self.lock:
+            return self.timers.get(timer_id)
+
+    def get_all_timers(self) -> List[CountdownTimer]:
+        """获取所有倒计时器列表"""
+        with self.lock:
+            return list(self.timers.values())
+
+    def _change_timer(self, timer_id: str, action: Callable[[CountdownTimer, float], None]) -> bool:
+        """对倒计时器执行开始/暂停/继续，并重新排程和持久化"""
+        with self.lock:
+            timer = self.timers.get(timer_id)
+            if timer is None:
+                return False
+            monotonic = self.clock.monotonic()
+            action(timer, monotonic)
+            self._schedule_countdown(timer, self.clock.now(), monotonic)
+            self._persist_timers([timer])
+        return True
+
+    def _schedule_countdown(self, timer: CountdownTimer, now: datetime, monotonic: float,
+                            notify: bool = True):
+        """把单调时钟的截止时间换算为墙上时间交给调度引擎（调用方需持有锁）"""
+        if timer.running:
+            fire_time = now + timedelta(seconds=timer.remaining(monotonic))
+            self._scheduler.schedule(timer.id, fire_time)
+            self._note_prewarm(timer, fire_time, now)
+        else:
+            self._scheduler.cancel(timer.id)
+        if notify:
+            self._schedule_changed()
+
+    def _pop_due_countdown(self, timer: CountdownTimer, fire_time: datetime,
+                           now: datetime) -> Optional[AlarmEvent]:
+        """处理调度引擎弹出的倒计时器（调用方需持有锁）
+
+        墙上时间比单调时钟走得快时（向前跳变、时钟校正）会提前弹出，
+        此时按单调时钟的剩余时间重新排程，不触发。
+        """
+        if not timer.running:
+            return None
+        monotonic = self.clock.monotonic()
+        if timer.remaining(monotonic) > COUNTDOWN_TOLERANCE:
+            self._schedule_countdown(timer, now, monotonic, notify=False)
+            return None
+        del self.timers[timer.id]
+        return AlarmEvent(timer, fire_time, now)
+
+    def _timer_snapshot(self) -> List[dict]:
+        """需要持久化的倒计时器字典列表（调用方需持有锁）"""
+        monotonic = self.clock.monotonic()
+        return [timer.to_dict(monotonic) for timer in self.timers.values() if timer.persist]
+
+    def _persist_timers(self, timers: List[CountdownTimer]):
+        """有需要持久化的倒计时器发生变化时保存"""
+        if any(timer.persist for timer in timers):
+            self.save_timers()
+
+    def save_timers(self):
+        """保存倒计时器的当前剩余时间"""
+        try:
+            if self.timers or os.path.exists(self.timer_file):
+                self._timer_storage.save_all()
+        except Exception as e:
+            print(f"保存倒计时器失败: {e}")
+
+    def load_timers(self):
+        """从文件加载倒计时器，计时中的倒计时器按保存时的剩余时间继续"""
+        try:
+            timers_data = self._timer_storage.load()
+            with self.lock:
+                monotonic = self.clock.monotonic()
+                timers = [CountdownTimer.from_dict(data, monotonic) for data in timers_data]
+        except LOAD_ERRORS as e:
+            print(f"加载倒计时器失败: {e}")
+            return
+        with self.lock:
+            now = self.clock.now()
+            for timer in timers:
+                self.timers[timer.id] = timer
+                self._schedule_countdown(timer, now, monotonic, notify=False)
+            self._schedule_changed()
+
+    def _notify_changed(self, alarm_ids: List[str]):
+        """闹钟发生变化后调用on_alarms_changed回调（在锁外调用）"""
+        if self.on_alarms_changed:
+            try:
+                self.on_alarms_changed(alarm_ids)
+            except Exception as e:
+                print(f"闹钟变化回调失败: {e}")
+
     def start(self):
         """启动闹钟检查线程"""
         if self.running:
@@ -167,62 +754,415 @@ class AlarmManager:
 
         self.running = True
         self.paused = False
+        self.reschedule()
+        self._request_prewarm()
         self.check_thread = threading.Thread(target=self._check_alarms, daemon=True)
         self.check_thread.start()
 
     def pause(self):
         """暂停闹钟检查"""
-        self.paused = True
+        with self._wakeup:
+            self.paused = True
+            self._wakeup.notify_all()
 
     def resume(self):
         """恢复闹钟检查"""
-        self.paused = False
+        with self._wakeup:
+            self.paused = False
+            # 暂停期间错过的闹钟不再补发，从当前时间重新排程
+            self.reschedule()
 
     def stop(self):
         """停止闹钟检查"""
-        self.running = False
+        with self._wakeup:
+            self.running = False
+            self._wakeup.notify_all()
         if self.check_thread:
             self.check_thread.join(timeout=2)
 
+    def reschedule(self):
+        """根据当前闹钟重建分钟索引和调度
+
+        直接修改self.alarms字典后（例如GUI批量替换闹钟）需要调用此方法。
+        """
+        now = self.clock.now()
+        with self._wakeup:
+            self._rebuild_index()
+            self._scheduler.reset(now)
+            self._prewarm_scanned = None
+            for alarm in self.alarms.values():
+                self._schedule_alarm(alarm, now, notify=False)
+            monotonic = self.clock.monotonic()
+            for timer in self.timers.values():
+                self._schedule_countdown(timer, now, monotonic, notify=False)
+            self._schedule_changed()
+
+    def get_alarms_at(self, time_str: str, enabled_only: bool = False) -> List[Alarm]:
+        """查询某一分钟（"HH:MM"）的闹钟"""
+        minute = parse_minute_of_day(time_str)
+        with self.lock:
+            return self._alarms_in_minutes([minute], enabled_only)
+
+    def get_alarms_between(self, start_str: str, end_str: str,
+                           enabled_only: bool = False) -> List[Alarm]:
+        """查询时间段内（含两端）的闹钟，按时间排序
+
+        开始时间晚于结束时间时视为跨越午夜，例如 "23:00" 到 "01:00"。
+        """
+        start = parse_minute_of_day(start_str)
+        end = parse_minute_of_day(end_str)
+        if start <= end:
+            minutes = range(start, end + 1)
+        else:
+            minutes = list(range(start, MINUTES_PER_DAY)) + list(range(0, end + 1))
+        with self.lock:
+            return self._alarms_in_minutes(minutes, enabled_only)
+
+    def _alarms_in_minutes(self, minutes, enabled_only: bool) -> List[Alarm]:
+        """按分钟顺序收集索引中的闹钟（调用方需持有锁）"""
+        result = []
+        for minute in minutes:
+            for alarm_id in self._minute_index[minute]:
+                alarm = self.alarms[alarm_id]
+                if not enabled_only or alarm.enabled:
+                    result.append(alarm)
+        return result
+
+    def _index_alarm(self, alarm: Alarm):
+        """把闹钟放入（或移动到）对应分钟的索引格（调用方需持有锁）"""
+        minute = alarm.minute_of_day
+        old_minute = self._indexed_minute.get(alarm.id)
+        if old_minute == minute:
+            return
+        if old_minute is not None:
+            self._minute_index[old_minute].discard(alarm.id)
+        self._minute_index[minute].add(alarm.id)
+        self._indexed_minute[alarm.id] = minute
+
+    def _unindex_alarm(self, alarm_id: str):
+        """从分钟索引中移除闹钟（调用方需持有锁）"""
+        minute = self._indexed_minute.pop(alarm_id, None)
+        if minute is not None:
+            self._minute_index[minute].discard(alarm_id)
+
+    def _rebuild_index(self):
+        """根据self.alarms重建分钟索引（调用方需持有锁）"""
+        for bucket in self._minute_index:
+            bucket.clear()
+        self._indexed_minute = {}
+        for alarm in self.alarms.values():
+            self._index_alarm(alarm)
+
+    def scheduled_time(self, alarm_id: str) -> Optional[datetime]:
+        """获取闹钟的下一次触发时间，未排程时返回None"""
+        with self.lock:
+            return self._scheduler.get(alarm_id)
+
+    def _schedule_alarm(self, alarm: Alarm, now: datetime, notify: bool = True):
+        """计算闹钟的下一次触发时间并交给调度引擎（调用方需持有锁）"""
+        fire_time = alarm.next_trigger_time(now)
+        if fire_time is None:
+            self._scheduler.cancel(alarm.id)
+        else:
+            self._scheduler.schedule(alarm.id, fire_time)
+            self._note_prewarm(alarm, fire_time, now)
+        if notify:
+            self._schedule_changed()
+
+    def _note_prewarm(self, alarm, fire_time: datetime, now: datetime):
+        """排程时发现闹钟在预热窗口内，记下它的音频（调用方需持有锁）"""
+        if self.on_prewarm and (fire_time - now).total_seconds() <= self.prewarm_seconds:
+            self._prewarm_pending.add(alarm.audio_file)
+
+    def _scan_prewarm(self, now: datetime):
+        """滚动预热：按分钟索引找出新进入预热窗口的闹钟（调用方需持有锁）
+
+        按整分钟扫描：每次只扫描上次扫描之后新进入窗口的分钟，
+        再用调度引擎中的触发时间过滤掉不在这几分钟内触发的闹钟。
+        """
+        if not self.on_prewarm:
+            return
+        this_minute = now.replace(second=0, microsecond=0)
+        # 窗口结束所在分钟的下一分钟（不含）
+        horizon = (now + timedelta(seconds=self.prewarm_seconds)).replace(
+            second=0, microsecond=0) + timedelta(minutes=1)
+        scanned = self._prewarm_scanned
+        if scanned is None or scanned < this_minute:
+            scanned = this_minute
+        minutes = int((horizon - scanned).total_seconds() // 60)
+        if minutes <= 0:
+            return
+        first = scanned.hour * 60 + scanned.minute
+        for offset in range(min(minutes, MINUTES_PER_DAY)):
+            for alarm_id in self._minute_index[(first + offset) % MINUTES_PER_DAY]:
+                fire_time = self._scheduler.get(alarm_id)
+                if fire_time is not None and fire_time < horizon:
+                    self._prewarm_pending.add(self.alarms[alarm_id].audio_file)
+        self._prewarm_scanned = horizon
+
+    def _take_prewarm(self) -> List[Optional[str]]:
+        """取出等待通知的音频文件（调用方需持有锁）"""
+        pending = list(self._prewarm_pending)
+        self._prewarm_pending.clear()
+        return pending
+
+    def _request_prewarm(self, audio_files: Optional[List[Optional[str]]] = None):
+        """在锁外通知on_prewarm预热音频，未指定时取出所有等待通知的音频"""
+        if audio_files is None:
+            with self.lock:
+                self._scan_prewarm(self.clock.now())
+                audio_files = self._take_prewarm()
+        if audio_files and self.on_prewarm:
+            try:
+                self.on_prewarm(audio_files)
+            except Exception as e:
+                print(f"音频预热回调失败: {e}")
+
+    def _schedule_changed(self):
+        """排程发生变化：唤醒调度线程重新计算休眠时间（调用方需持有锁）"""
+        self._wakeup.notify_all()
+
+    def _detect_clock_jump(self, now: datetime):
+        """比较墙上时间与单调时钟的进度，检测时钟跳变和系统休眠（调用方需持有锁）
+
+        向前跳变（或休眠）时，跳过的闹钟仍按原触发时间留在调度引擎中，
+        随后由_pop_due_alarms按补发窗口处理；向后跳变时从当前时间重新排程。
+        """
+        monotonic = self.clock.monotonic()
+        mark = self._clock_mark
+        self._clock_mark = (now, monotonic)
+        if mark is None:
+            return
+        drift = (now - mark[0]).total_seconds() - (monotonic - mark[1])
+        if drift > CLOCK_JUMP_SECONDS:
+            print(f"检测到时钟向前跳变或系统休眠: {drift:.0f}秒")
+        elif drift < -CLOCK_JUMP_SECONDS:
+            print(f"检测到时钟向后跳变: {-drift:.0f}秒，重新排程")
+            self.reschedule()
+
+    def _pop_due_alarms(self, now: datetime) -> List[AlarmEvent]:
+        """弹出所有到期闹钟并排程它们的下一次触发（调用方需持有锁）
+
+        迟到超过补发窗口的闹钟不再触发，只排程下一次；倒计时器不受补发窗口限制，
+        到期触发后移除。
+        """
+        started = time.perf_counter()
+        self._detect_clock_jump(now)
+        events = []
+        finished = []
+        fired_once = []
+        for alarm_id, fire_time in self._scheduler.pop_due(now):
+            alarm = self.alarms.get(alarm_id)
+            if alarm is None:
+                timer = self.timers.get(alarm_id)
+                event = self._pop_due_countdown(timer, fire_time, now) if timer else None
+                if event:
+                    events.append(event)
+                    finished.append(timer)
+                    self._record_fire(event)
+                continue
+            alarm.mark_triggered(now)
+            if not alarm.repeat_daily and alarm.recurrence is None:
+                fired_once.append(alarm)
+            event = AlarmEvent(alarm, fire_time, now)
+            if event.late_by > self.grace_seconds:
+                print(f"闹钟 {alarm.time_str} 已错过{event.late_by:.0f}秒，超过补发窗口，跳过")
+                self._m_missed.inc()
+            else:
+                events.append(event)
+                self._record_fire(event)
+            self._schedule_alarm(alarm, now, notify=False)
+        if finished:
+            self._persist_timers(finished)
+        if fired_once:
+            # 保存一次性闹钟的触发状态，重新加载或重启后不再触发
+            self._persist_put_many(fired_once)
+        self._scan_prewarm(now)
+        self._m_tick.observe(time.perf_counter() - started)
+        return events
+
+    def _record_fire(self, event: AlarmEvent):
+        """记录一次触发的迟到时间（调用方需持有锁）"""
+        self._lateness.append(event.late_by)
+        self._m_lateness.observe(event.late_by)
+
+    def _register_metrics(self, registry):
+        """注册调度和保存热路径上的指标（保存无标签序列本身，记录时少一次查找）"""
+        self._m_lateness = registry.histogram(
+            "alarm_fire_lateness_seconds",
+            "闹钟和倒计时器实际触发时间比排程时间晚的秒数（_count即触发次数）").labels()
+        self._m_missed = registry.counter(
+            "alarm_missed_total", "迟到超过补发窗口而跳过的闹钟次数").labels()
+        self._m_tick = registry.histogram(
+            "scheduler_tick_seconds", "一次调度检查（弹出到期闹钟并排程下一次触发）的耗时").labels()
+        self._m_lock_wait = registry.histogram(
+            "scheduler_lock_wait_seconds", "调度线程每次循环等待获取闹钟锁的时间").labels()
+        self._m_save = registry.histogram("alarm_save_seconds", "save_alarms整体保存的耗时").labels()
+        self._m_save_lock = registry.histogram(
+            "alarm_save_lock_hold_seconds", "保存时持有闹钟锁生成闹钟快照的时间").labels()
+
+    def _next_timeout(self, now: datetime) -> float:
+        """距离调度引擎下一次唤醒的休眠时间（调用方需持有锁）"""
+        wake_time = self._scheduler.next_fire_time()
+        if wake_time is None:
+            return MAX_SLEEP_SECONDS
+        delay = (wake_time - now).total_seconds()
+        return max(0.0, min(delay, MAX_SLEEP_SECONDS))
+
+    def lateness_stats(self) -> dict:
+        """最近触发的延迟统计（毫秒）：次数、平均值、p50、p99、最大值"""
+        with self.lock:
+            samples = sorted(self._lateness)
+        if not samples:
+            return {"count": 0}
+        count = len(samples)
+        return {
+            "count": count,
+            "mean_ms": sum(samples) / count * 1000,
+            "p50_ms": samples[(count - 1) // 2] * 1000,
+            "p99_ms": samples[min(count - 1, int(count * 0.99))] * 1000,
+            "max_ms": samples[-1] * 1000,
+        }
+
+    def next_fire_time(self) -> Optional[datetime]:
+        """调度引擎的下一次唤醒时间，没有排程时返回None"""
+        with self.lock:
+            return self._scheduler.next_fire_time()
+
+    def upcoming(self, limit: int = 10, within: Optional[float] = None) -> List[tuple]:
+        """按触发时间排序的即将触发的闹钟和倒计时器，返回 [(触发时间, 闹钟或倒计时器)]
+
+        within为秒数时只返回该时间内触发的。
+        """
+        with self.lock:
+            now = self.clock.now()
+            deadline = now + timedelta(seconds=within) if within is not None else None
+            scheduled = []
+            for items in (self.alarms, self.timers):
+                for item_id, item in items.items():
+                    fire_time = self._scheduler.get(item_id)
+                    if fire_time is not None and (deadline is None or fire_time <= deadline):
+                        scheduled.append((fire_time, item_id, item))
+        return [(fire_time, item) for fire_time, _, item in heapq.nsmallest(limit, scheduled)]
+
+    def tick(self) -> List[Alarm]:
+        """处理时钟当前时刻所有到期的闹钟并调用回调，返回触发的闹钟
+
+        不启动调度线程时使用，例如模拟运行器（simulation.py）在虚拟时间中逐步触发闹钟。
+        """
+        with self.lock:
+            events = self._pop_due_alarms(self.clock.now())
+            prewarm = self._take_prewarm()
+        self._request_prewarm(prewarm)
+        self._dispatch(events)
+        return [event.alarm for event in events]
+
+    def _dispatch(self, events: List[AlarmEvent]):
+        """在锁外调用回调，避免回调阻塞闹钟修改；有分发器时交给工作线程执行"""
+        if not self.on_alarm_trigger and not self.on_alarm_event:
+            return
+        for event in events:
+            if self.dispatcher:
+                self.dispatcher.submit(self._run_callbacks, event)
+            else:
+                try:
+                    self._run_callbacks(event)
+                except Exception as e:
+                    print(f"闹钟回调失败: {e}")
+
+    def _run_callbacks(self, event: AlarmEvent):
+        """调用闹钟触发回调和触发事件回调"""
+        if self.on_alarm_trigger:
+            self.on_alarm_trigger(event.alarm)
+        if self.on_alarm_event:
+            self.on_alarm_event(event)
+
     def _check_alarms(self):
-        """闹钟检查线程主循环"""
+        """闹钟调度线程主循环：休眠到调度引擎的下一次唤醒时间或闹钟发生变化"""
         while self.running:
-            if not self.paused:
-                current_time = datetime.now()
-                # 复制闹钟列表以避免迭代时字典被修改
-                with self.lock:
-                    alarms = list(self.alarms.values())
-                for alarm in alarms:
-                    if alarm.should_trigger(current_time):
-                        if self.on_alarm_trigger:
-                            self.on_alarm_trigger(alarm)
-            time.sleep(1)  # 每秒检查一次
+            waiting = time.perf_counter()
+            with self._wakeup:
+                self._m_lock_wait.observe(time.perf_counter() - waiting)
+                if not self.running:
+                    break
+                if self.paused:
+                    self._wakeup.wait()
+                    continue
+                now = self.clock.now()
+                events = self._pop_due_alarms(now)
+                prewarm = self._take_prewarm()
+                if not events and not prewarm:
+                    self._wakeup.wait(self._next_timeout(now))
+                    continue
+            self._request_prewarm(prewarm)
+            self._dispatch(events)
+
+    def _snapshot_data(self) -> List[dict]:
+        """当前所有闹钟的字典列表（调用方需持有锁）"""
+        started = time.perf_counter()
+        data = [alarm.to_dict() for alarm in self.alarms.values()]
+        self._m_save_lock.observe(time.perf_counter() - started)
+        return data
+
+    def _persist_put(self, alarm: Alarm):
+        """持久化新增或修改的闹钟"""
+        try:
+            self.storage.put(alarm.to_dict())
+        except Exception as e:
+            print(f"保存闹钟配置失败: {e}")
+
+    def _persist_delete(self, alarm_id: str):
+        """持久化删除的闹钟"""
+        try:
+            self.storage.delete(alarm_id)
+        except Exception as e:
+            print(f"保存闹钟配置失败: {e}")
+
+    def _persist_put_many(self, alarms: List[Alarm]):
+        """一次持久化多个新增或修改的闹钟"""
+        try:
+            self.storage.put_many([alarm.to_dict() for alarm in alarms])
+        except Exception as e:
+            print(f"保存闹钟配置失败: {e}")
+
+    def _persist_delete_many(self, alarm_ids: List[str]):
+        """一次持久化多个删除的闹钟"""
+        try:
+            self.storage.delete_many(alarm_ids)
+        except Exception as e:
+            print(f"保存闹钟配置失败: {e}")
 
     def save_alarms(self):
-        """保存闹钟到配置文件"""
-        with self.lock:
-            alarms_data = [alarm.to_dict() for alarm in self.alarms.values()]
+        """整体保存所有闹钟到存储后端"""
+        started = time.perf_counter()
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(alarms_data, f, indent=2)
+            self.storage.save_all()
         except Exception as e:
             print(f"保存闹钟配置失败: {e}")
+        self._m_save.observe(time.perf_counter() - started)
+
+    def flush(self):
+        """等待存储后端写出待保存的数据"""
+        self.storage.flush()
 
     def load_alarms(self):
-        """从配置文件加载闹钟"""
+        """从存储后端加载闹钟"""
         try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    alarms_data = json.load(f)
-                with self.lock:
-                    self.alarms = {
-                        alarm_data['id']: Alarm.from_dict(alarm_data)
-                        for alarm_data in alarms_data
-                    }
-        except (FileNotFoundError, json.JSONDecodeError) as e:
+            alarms_data = self.storage.load()
+            now = self.clock.now()
+            with self.lock:
+                self.alarms = {
+                    alarm_data['id']: Alarm.from_dict(alarm_data, created_at=now)
+                    for alarm_data in alarms_data
+                }
+                self.reschedule()
+        except LOAD_ERRORS as e:
             print(f"加载闹钟配置失败，使用空配置: {e}")
             with self.lock:
                 self.alarms = {}
+                self.reschedule()
+        self.load_timers()
+        self._request_prewarm()
 
     def get_alarm(self, alarm_id: str) -> Optional[Alarm]:
         """获取指定ID的闹钟"""
@@ -238,7 +1178,18 @@ class AlarmManager:
         """清除所有闹钟"""
         with self.lock:
             self.alarms.clear()
-        self.save_alarms()
+            self.reschedule()
+            try:
+                self.storage.clear()
+            except Exception as e:
+                print(f"保存闹钟配置失败: {e}")
+
+    def close(self):
+        """停止调度线程，保存倒计时器并关闭存储后端"""
+        self.stop()
+        self.save_timers()
+        self._timer_storage.close()
+        self.storage.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,134 @@
+# async_manager.py - asyncio版闹钟管理器：用事件循环定时器代替调度线程
+
+import asyncio
+import inspect
+import time
+from typing import AsyncIterator, List, Optional, Set
+from alarm_manager import AlarmEvent, AlarmManager
+
+
+class AsyncAlarmManager(AlarmManager):
+    """asyncio版闹钟管理器
+
+    与AlarmManager共用闹钟模型、索引、调度引擎和存储后端，但不创建线程：
+    用loop.call_at按事件循环的单调时钟在下一次触发时间唤醒。
+    on_alarm_trigger可以是普通函数或async函数；也可以通过
+    `async for event in manager.events()` 接收触发事件。
+
+    存储写入在调用线程中同步进行，在事件循环中使用时建议配合
+    writer=BackgroundWriter() 或 storage="journal"/"sqlite"。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._tasks: Set[asyncio.Task] = set()  # 保持对回调任务的引用
+
+    def start(self):
+        """在当前事件循环中启动调度（需在事件循环内调用）"""
+        if self.running:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.running = True
+        self.paused = False
+        self.reschedule()
+        self._request_prewarm()
+
+    def pause(self):
+        """暂停闹钟调度"""
+        with self.lock:
+            self.paused = True
+            self._cancel_timer()
+
+    def resume(self):
+        """恢复闹钟调度"""
+        with self.lock:
+            self.paused = False
+            # 暂停期间错过的闹钟不再补发，从当前时间重新排程
+            self.reschedule()
+
+    def stop(self):
+        """停止调度，并结束所有events()迭代"""
+        with self.lock:
+            self.running = False
+            self._cancel_timer()
+        for queue in list(self._subscribers):
+            queue.put_nowait(None)
+
+    async def events(self) -> AsyncIterator[AlarmEvent]:
+        """异步迭代闹钟触发事件，stop()后结束"""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.add(queue)
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+        finally:
+            self._subscribers.discard(queue)
+
+    async def wait_closed(self):
+        """等待所有仍在运行的异步回调完成"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _schedule_changed(self):
+        """排程发生变化：重新设置事件循环定时器（可从其他线程调用）"""
+        if not self.running or self.loop is None:
+            return
+        try:
+            in_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            in_loop = False
+        if in_loop:
+            self._arm_timer()
+        else:
+            self.loop.call_soon_threadsafe(self._arm_timer)
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _arm_timer(self):
+        """按调度引擎的下一次唤醒时间设置定时器"""
+        with self.lock:
+            self._cancel_timer()
+            if not self.running or self.paused:
+                return
+            delay = self._next_timeout(self.clock.now())
+            self._timer = self.loop.call_at(self.loop.time() + delay, self._on_timer)
+
+    def _on_timer(self):
+        """定时器到期：触发到期闹钟并重新设置定时器"""
+        waiting = time.perf_counter()
+        with self.lock:
+            self._m_lock_wait.observe(time.perf_counter() - waiting)
+            self._timer = None
+            if not self.running or self.paused:
+                return
+            events = self._pop_due_alarms(self.clock.now())
+            prewarm = self._take_prewarm()
+        self._request_prewarm(prewarm)
+        self._dispatch(events)
+        self._arm_timer()
+
+    def _dispatch(self, events: List[AlarmEvent]):
+        """调用回调（async回调作为任务运行）并把事件发送给events()订阅者"""
+        for event in events:
+            for callback, arg in ((self.on_alarm_trigger, event.alarm), (self.on_alarm_event, event)):
+                if not callback:
+                    continue
+                try:
+                    result = callback(arg)
+                    if inspect.isawaitable(result):
+                        task = asyncio.ensure_future(result, loop=self.loop)
+                        self._tasks.add(task)
+                        task.add_done_callback(self._tasks.discard)
+                except Exception as e:
+                    print(f"闹钟回调失败: {e}")
+            for queue in self._subscribers:
+                queue.put_nowait(event)
@@ -0,0 +1,128 @@
+# audio_cache.py - 解码后音频的LRU缓存：按路径缓存，文件修改时间或大小变化时失效
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Tuple
+
+# 默认缓存上限（字节）：22050Hz 16位立体声约可容纳6分钟的音频
+DEFAULT_CACHE_BYTES = 32 * 1024 * 1024
+
+
+class SoundCache:
+    """按字节数限制大小的LRU缓存
+
+    loader(path) 解码音频文件，sizer(sound) 返回解码后占用的字节数；
+    与pygame无关，AudioPlayer传入pygame.mixer.Sound的加载和大小计算。
+    缓存键为文件路径，命中时比较文件的修改时间和大小，变化后重新解码。
+    单个超过上限的音频不进入缓存，只记下文件签名，too_large()据此判断，
+    预热时跳过这类文件，避免每次都解码后丢弃。
+    """
+
+    def __init__(self, loader: Callable[[str], object], sizer: Callable[[object], int],
+                 max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.loader = loader
+        self.sizer = sizer
+        self.max_bytes = max_bytes
+        # 路径 -> (文件签名, 解码后的音频, 字节数)，按最近使用排序
+        self._entries: "OrderedDict[str, Tuple[tuple, object, int]]" = OrderedDict()
+        self._bytes = 0
+        # 路径 -> 文件签名：解码后超过上限、无法缓存的音频
+        self._oversized: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, path: str):
+        """获取解码后的音频，未缓存或文件已变化时解码并放入缓存
+
+        文件不存在时抛出OSError，解码失败时抛出loader的异常。
+        """
+        key = os.path.abspath(path)
+        signature = self._signature(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] == signature:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[1]
+                self._remove_locked(key)
+                self.stats["invalidations"] += 1
+            self.stats["misses"] += 1
+
+        # 在锁外解码，避免阻塞其他音频的命中
+        sound = self.loader(path)
+        size = self.sizer(sound)
+        with self._lock:
+            if size <= self.max_bytes:
+                if key in self._entries:
+                    self._remove_locked(key)
+                self._oversized.pop(key, None)
+                self._entries[key] = (signature, sound, size)
+                self._bytes += size
+                self._evict_locked()
+            else:
+                self._oversized[key] = signature
+        return sound
+
+    def contains(self, path: str) -> bool:
+        """音频是否已缓存且文件未变化"""
+        key = os.path.abspath(path)
+        try:
+            signature = self._signature(key)
+        except OSError:
+            return False
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and entry[0] == signature
+
+    def too_large(self, path: str) -> bool:
+        """音频解码后是否超过缓存上限（已解码过且文件未变化）"""
+        key = os.path.abspath(path)
+        try:
+            signature = self._signature(key)
+        except OSError:
+            return False
+        with self._lock:
+            return self._oversized.get(key) == signature
+
+    def clear(self):
+        """清空缓存（统计保留）"""
+        with self._lock:
+            self._entries.clear()
+            self._oversized.clear()
+            self._bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        """当前缓存占用的字节数"""
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def info(self) -> dict:
+        """命中统计和当前占用"""
+        with self._lock:
+            info = dict(self.stats)
+            info.update(entries=len(self._entries), bytes=self._bytes, max_bytes=self.max_bytes)
+        return info
+
+    @staticmethod
+    def _signature(path: str) -> tuple:
+        """文件签名：(修改时间纳秒, 大小)"""
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _remove_locked(self, key: str):
+        """移除缓存项（调用方需持有锁）"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def _evict_locked(self):
+        """淘汰最久未使用的音频直到不超过上限（调用方需持有锁）"""
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.stats["evictions"] += 1
@@ -2,38 +2,198 @@
 
 import os
 import sys
-import pygame
+import threading
+import time
 import warnings
-from typing import Optional
+from collections import deque
+from typing import Iterable, List, Optional
+from audio_cache import DEFAULT_CACHE_BYTES, SoundCache
+from channel_pool import ChannelPool
+from metrics import REGISTRY
+
+# pygame在第一次播放或预热时才导入：导入pygame并初始化mixer需要数百毫秒，不拖慢启动
+pygame = None
+
+# 播放延迟统计保留的最近样本数
+LATENCY_SAMPLES = 200
+
+# 超过流式播放阈值的音频文件用pygame.mixer.music流式播放，不整体解码到内存。
+# 不解码无法得知时长，按文件大小估计：压缩音频解码后约为原文件的10倍。
+# 默认阈值为缓存上限除以该倍数，整体解码的文件都能放进缓存
+DECODED_SIZE_RATIO = 10
+
+# 未指定键时使用的播放键：同一个键同时只播放一个声音
+DEFAULT_PLAY_KEY = "default"
 
 
 class AudioPlayer:
-    """音频播放器"""
+    """音频播放器
+
+    每次播放以键（通常是闹钟ID）标识，多个闹钟同时响铃时各占一个播放通道，
+    可以按键单独停止和淡出；通道不够时按优先级抢占（见channel_pool.py）。
+    """
 
-    def __init__(self, default_audio_path: str = "assets/default_alarm.mp3"):
+    def __init__(self, default_audio_path: str = "assets/default_alarm.mp3",
+                 cache_bytes: int = DEFAULT_CACHE_BYTES,
+                 stream_threshold: Optional[int] = None,
+                 channels: int = 8, max_channels: int = 32, steal_policy: str = "lowest",
+                 metrics=None):
         self.default_audio_path = default_audio_path
-        self.current_audio: Optional[pygame.mixer.Sound] = None
+        # 大文件流式播放：超过stream_threshold字节的文件交给pygame.mixer.music，
+        # 流只有一个，同时只能播放一个大文件
+        if stream_threshold is None:
+            stream_threshold = cache_bytes // DECODED_SIZE_RATIO
+        self.stream_threshold = stream_threshold
+        self._stream_key: Optional[str] = None  # 正在流式播放的键
+        self._stream_priority = 0
         self.volume = 0.5  # 默认音量50%
+        # mixer在第一次播放或预热时初始化（见ensure_mixer）
         self.initialized = False
-        self._init_pygame()
+        self._mixer_failed = False
+        self._mixer_lock = threading.Lock()
+        # 播放通道池，mixer初始化成功后创建
+        self.channels: Optional[ChannelPool] = None
+        self._channel_options = (channels, max_channels, steal_policy)
+        # 解码后的音频缓存，连续触发同一音频时不再重复解码
+        self.sound_cache = SoundCache(self._load_sound, self._sound_bytes, cache_bytes)
+        # 预热：后台线程提前解码即将触发的闹钟音频
+        self._prewarm_queue: List[str] = []
+        self._prewarm_cond = threading.Condition()
+        self._prewarm_thread: Optional[threading.Thread] = None
+        self._closed = False
+        # 每次播放从调用play_alarm到开始发声的耗时：(音频路径, 秒数, 方式)，
+        # 方式为 "cached"（命中缓存）、"decoded"（触发时解码）或 "stream"（流式播放）
+        self.play_latencies = deque(maxlen=LATENCY_SAMPLES)
+        # 运行指标（metrics.py）：按播放方式统计开始发声的延迟
+        registry = metrics or REGISTRY
+        self._m_play_start = registry.histogram(
+            "audio_play_start_seconds", "从调用play_alarm到开始发声的耗时", ("mode",))
+        self._m_play_fallback = registry.counter(
+            "audio_play_fallback_total", "无法用pygame播放而改用系统蜂鸣声的次数").labels()
+
+    def ensure_mixer(self) -> bool:
+        """按需导入pygame并初始化mixer，返回mixer是否可用（初始化失败后不再重试）"""
+        with self._mixer_lock:
+            if not self.initialized and not self._mixer_failed and not self._closed:
+                self._init_pygame()
+                self._mixer_failed = not self.initialized
+        return self.initialized
 
     def _init_pygame(self):
-        """初始化pygame mixer"""
+        """导入pygame并初始化mixer"""
+        global pygame
         try:
-            # 抑制pygame初始化消息
+            # 抑制pygame导入和初始化消息
+            os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
             with warnings.catch_warnings():
                 warnings.simplefilter("ignore")
+                import pygame as pygame_module
+                pygame = pygame_module
                 pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
+            channels, max_channels, steal_policy = self._channel_options
+            self.channels = ChannelPool(pygame.mixer.Channel, pygame.mixer.set_num_channels,
+                                        channels, max_channels, steal_policy)
             self.initialized = True
         except Exception as e:
             print(f"初始化pygame.mixer失败: {e}")
             self.initialized = False
 
-    def play_alarm(self, audio_file: str = None, loop: bool = True):
-        """播放闹钟音乐"""
+    @staticmethod
+    def _load_sound(audio_path: str):
+        """把音频文件整体解码为pygame.mixer.Sound"""
+        return pygame.mixer.Sound(audio_path)
+
+    @staticmethod
+    def _sound_bytes(sound) -> int:
+        """解码后音频占用的字节数（按mixer的采样率、格式和声道数计算）"""
+        frequency, sample_format, channels = pygame.mixer.get_init()
+        return int(sound.get_length() * frequency) * channels * (abs(sample_format) // 8)
+
+    def prewarm(self, audio_files: Iterable[Optional[str]]):
+        """在后台线程中提前解码音频（None表示默认音频）
+
+        已缓存、不存在或解码后超过缓存上限的文件跳过。
+        AlarmManager.on_prewarm 在闹钟即将触发前调用，触发时直接命中缓存。
+        mixer尚未初始化时也在后台线程中初始化，不阻塞调用方。
+        """
+        if self._mixer_failed:
+            return
+        paths = []
+        for audio_file in audio_files:
+            path = audio_file or self.default_audio_path
+            if path in paths or not os.path.exists(path) or self.should_stream(path):
+                continue  # 流式播放的大文件不需要预热
+            if not self.sound_cache.contains(path) and not self.sound_cache.too_large(path):
+                paths.append(path)
+        if not paths:
+            return
+        with self._prewarm_cond:
+            if self._closed:
+                return
+            for path in paths:
+                if path not in self._prewarm_queue:
+                    self._prewarm_queue.append(path)
+            if self._prewarm_thread is None:
+                self._prewarm_thread = threading.Thread(target=self._prewarm_worker, daemon=True,
+                                                        name="audio-prewarm")
+                self._prewarm_thread.start()
+            self._prewarm_cond.notify()
+
+    def _prewarm_worker(self):
+        """预热线程主循环"""
+        while True:
+            with self._prewarm_cond:
+                while not self._prewarm_queue and not self._closed:
+                    self._prewarm_cond.wait()
+                if self._closed:
+                    break
+                path = self._prewarm_queue.pop(0)
+            if not self.ensure_mixer():
+                continue
+            try:
+                self.sound_cache.get(path)
+            except Exception as e:
+                print(f"预热音频失败 {path}: {e}")
+
+    def should_stream(self, audio_path: str) -> bool:
+        """音频文件是否超过流式播放阈值"""
         try:
-            # 停止当前播放
-            self.stop()
+            return os.path.getsize(audio_path) > self.stream_threshold
+        except OSError:
+            return False
+
+    def play_latency_stats(self) -> dict:
+        """最近播放的延迟统计（毫秒），按播放方式（cached/decoded/stream）分别统计"""
+        samples = list(self.play_latencies)
+        stats = {"count": len(samples)}
+        for name in ("cached", "decoded", "stream"):
+            values = sorted(seconds for _, seconds, mode in samples if mode == name)
+            if values:
+                stats[name] = {
+                    "count": len(values),
+                    "mean_ms": sum(values) / len(values) * 1000,
+                    "p50_ms": values[(len(values) - 1) // 2] * 1000,
+                    "max_ms": values[-1] * 1000,
+                }
+        return stats
+
+    @property
+    def streaming(self) -> bool:
+        """是否正在流式播放"""
+        return self._stream_key is not None
+
+    def play_alarm(self, audio_file: str = None, loop: bool = True,
+                   key: str = None, priority: int = 0):
+        """播放闹钟音乐
+
+        key标识这次播放（通常是闹钟ID），同一个键正在播放的声音会被替换，
+        其他键的声音继续播放；priority决定通道不够时能否抢占其他声音。
+        """
+        started = time.perf_counter()
+        key = key or DEFAULT_PLAY_KEY
+        try:
+            # 停止同一个键的上一次播放
+            self.stop(key)
 
             # 确定音频文件路径
             audio_path = audio_file if audio_file else self.default_audio_path
@@ -49,21 +209,29 @@ class AudioPlayer:
                     self._play_system_beep()
                     return
 
-            if not self.initialized:
+            if not self.ensure_mixer():
                 self._play_system_beep()
                 return
 
             # 加载并播放音频
             try:
-                self.current_audio = pygame.mixer.Sound(audio_path)
-                self.current_audio.set_volume(self.volume)
-
-                if loop:
-                    self.current_audio.play(loops=-1)  # -1表示无限循环
+                loops = -1 if loop else 0  # -1表示无限循环
+                if self.should_stream(audio_path):
+                    played = self._play_stream(key, audio_path, loops, priority)
+                    mode = "stream"
                 else:
-                    self.current_audio.play()
+                    mode = "cached" if self.sound_cache.contains(audio_path) else "decoded"
+                    sound = self.sound_cache.get(audio_path)
+                    played = self.channels.play(key, sound, loops=loops, volume=self.volume,
+                                                priority=priority)
+                if not played:
+                    print(f"没有可用的播放通道（优先级{priority}），闹钟声音未播放: {audio_path}")
+                    return
+                latency = time.perf_counter() - started
+                self.play_latencies.append((audio_path, latency, mode))
+                self._m_play_start.labels(mode).observe(latency)
 
-            except pygame.error as e:
+            except (pygame.error, OSError) as e:
                 print(f"加载音频文件失败 {audio_path}: {e}")
                 self._play_system_beep()
 
@@ -71,8 +239,25 @@ class AudioPlayer:
             print(f"播放音频失败: {e}")
             self._play_system_beep()
 
+    def _play_stream(self, key: str, audio_path: str, loops: int, priority: int) -> bool:
+        """用pygame.mixer.music边解码边播放大文件
+
+        流只有一个：正在流式播放的声音优先级更高时不替换，返回False。
+        """
+        if self._stream_key is not None and pygame.mixer.music.get_busy():
+            if priority < self._stream_priority:
+                return False
+            self.stop(self._stream_key)
+        pygame.mixer.music.load(audio_path)
+        pygame.mixer.music.set_volume(self.volume)
+        pygame.mixer.music.play(loops=loops)
+        self._stream_key = key
+        self._stream_priority = priority
+        return True
+
     def _play_system_beep(self):
         """播放系统蜂鸣声（后备方案）"""
+        self._m_play_fallback.inc()
         try:
             if sys.platform == "win32":
                 import winsound
@@ -83,49 +268,73 @@ class AudioPlayer:
         except Exception as e:
             print(f"播放系统蜂鸣声也失败: {e}")
 
-    def stop(self):
-        """停止播放"""
-        if self.current_audio:
+    def stop(self, key: str = None):
+        """停止播放：key为None时停止所有声音，否则只停止该键的声音"""
+        if self._stream_key is not None and key in (None, self._stream_key):
             try:
-                self.current_audio.stop()
+                pygame.mixer.music.stop()
+                pygame.mixer.music.unload()  # 释放文件句柄
+            except Exception as e:
+                print(f"停止音频播放失败: {e}")
+            self._stream_key = None
+        if self.channels:
+            try:
+                if key is None:
+                    self.channels.stop_all()
+                else:
+                    self.channels.stop(key)
             except Exception as e:
                 print(f"停止音频播放失败: {e}")
-        elif self.initialized:
-            # 停止所有pygame音频
-            pygame.mixer.stop()
 
     def set_volume(self, volume: float):
-        """设置音量 (0.0 - 1.0)"""
+        """设置音量 (0.0 - 1.0)，对正在播放的所有声音生效"""
         self.volume = max(0.0, min(1.0, volume))
-        if self.current_audio:
-            try:
-                self.current_audio.set_volume(self.volume)
-            except Exception as e:
-                print(f"设置音量失败: {e}")
+        try:
+            if self._stream_key is not None:
+                pygame.mixer.music.set_volume(self.volume)
+            if self.channels:
+                self.channels.set_volume(self.volume)
+        except Exception as e:
+            print(f"设置音量失败: {e}")
 
     def get_volume(self) -> float:
         """获取当前音量"""
         return self.volume
 
-    def is_playing(self) -> bool:
-        """检查是否正在播放"""
+    def is_playing(self, key: str = None) -> bool:
+        """检查是否正在播放（key为None时检查任意声音）"""
         if not self.initialized:
             return False
-        return pygame.mixer.get_busy()
+        if self._stream_key is not None and key in (None, self._stream_key) \
+                and pygame.mixer.music.get_busy():
+            return True
+        return self.channels.is_playing(key)
 
-    def fadeout(self, duration: int = 1000):
-        """淡出停止播放"""
-        if self.current_audio:
-            try:
-                self.current_audio.fadeout(duration)
-            except Exception as e:
-                print(f"淡出音频失败: {e}")
-        elif self.initialized:
-            pygame.mixer.fadeout(duration)
+    def fadeout(self, duration: int = 1000, key: str = None):
+        """淡出停止播放（毫秒）：key为None时淡出所有声音"""
+        try:
+            if self._stream_key is not None and key in (None, self._stream_key):
+                pygame.mixer.music.fadeout(duration)
+            if self.channels:
+                if key is None:
+                    self.channels.fadeout_all(duration)
+                else:
+                    self.channels.fadeout(key, duration)
+        except Exception as e:
+            print(f"淡出音频失败: {e}")
 
     def cleanup(self):
         """清理资源"""
         self.stop()
+        with self._prewarm_cond:
+            self._closed = True
+            self._prewarm_queue.clear()
+            self._prewarm_cond.notify_all()
+        if self._prewarm_thread:
+            self._prewarm_thread.join(timeout=2)
+        # mixer关闭后缓存的音频和通道不能再使用
+        self.channels = None
+        self.sound_cache.clear()
         if self.initialized:
             try:
                 pygame.mixer.quit()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# bench_core.py - 闹钟核心基准测试：add/update/save/load/tick/触发分发，输出JSON便于跨提交比较
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from alarm_manager import Alarm, AlarmManager
+from clock import VirtualClock
+from simulation import arm_alarms
+
+DEFAULT_SIZES = "10,1000,100000,1000000"
+START = datetime(2026, 1, 1, 8, 0, 30)
+
+
+def populate(manager: AlarmManager, count: int, seed: int = 0) -> list:
+    """直接向管理器填充count个闹钟（不触发保存），返回闹钟ID列表"""
+    rnd = random.Random(seed)
+    with manager.lock:
+        for i in range(count):
+            minute_of_day = rnd.randrange(1440)
+            alarm_id = f"bench-{i}"
+            manager.alarms[alarm_id] = Alarm(
+                alarm_id, f"{minute_of_day // 60:02d}:{minute_of_day % 60:02d}",
+                created_at=manager.clock.now())
+    arm_alarms(manager, manager.clock.now())
+    return list(manager.alarms)
+
+
+def timed(func, repeat: int) -> float:
+    """平均每次调用耗时（微秒）"""
+    begin = time.perf_counter()
+    for i in range(repeat):
+        func(i)
+    return (time.perf_counter() - begin) / repeat * 1e6
+
+
+def bench_size(count: int, workdir: str, max_repeat: int, dispatch_wakeups: int) -> dict:
+    """在count个闹钟规模下测量各热点路径"""
+    config_file = os.path.join(workdir, f"alarms_{count}.json")
+    clock = VirtualClock(START)
+    manager = AlarmManager(config_file, clock=clock)
+    manager.on_alarm_trigger = lambda alarm: None
+    alarm_ids = populate(manager, count)
+    # 规模越大重复次数越少，保证整体运行时间可控
+    repeat = max(1, min(max_repeat, 100000 // count))
+    result = {"n": count, "repeat": repeat}
+
+    result["add_alarm_us"] = timed(lambda i: manager.add_alarm("12:00"), repeat)
+    result["update_alarm_us"] = timed(
+        lambda i: manager.update_alarm(alarm_ids[i % len(alarm_ids)], time_str="13:00"), repeat)
+    result["save_alarms_us"] = timed(lambda i: manager.save_alarms(), repeat)
+    result["file_bytes"] = os.path.getsize(config_file)
+
+    def load(i):
+        AlarmManager(config_file, clock=clock).load_alarms()
+    result["load_alarms_us"] = timed(load, repeat)
+
+    # 空闲tick：当前没有到期闹钟
+    result["tick_idle_us"] = timed(lambda i: manager.tick(), max_repeat * 10)
+
+    # 触发分发：跳到接下来若干个唤醒时间点，统计每个触发闹钟的平均耗时
+    fired = 0
+    elapsed = 0.0
+    for _ in range(dispatch_wakeups):
+        wake_time = manager.next_fire_time()
+        if wake_time is None:
+            break
+        clock.advance_to(wake_time)
+        begin = time.perf_counter()
+        fired += len(manager.tick())
+        elapsed += time.perf_counter() - begin
+    result["dispatch_fired"] = fired
+    result["dispatch_per_alarm_us"] = elapsed / fired * 1e6 if fired else None
+    return result
+
+
+def git_revision() -> str:
+    """当前提交，无法获取时返回空字符串"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="闹钟核心基准测试")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"闹钟数量列表，默认 {DEFAULT_SIZES}")
+    parser.add_argument("--max-repeat", type=int, default=100, help="每项测量的最大重复次数")
+    parser.add_argument("--dispatch-wakeups", type=int, default=60, help="触发分发测量的唤醒次数")
+    parser.add_argument("-o", "--output", help="JSON结果输出文件，默认标准输出")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in (int(s) for s in args.sizes.split(",")):
+            print(f"测量 {size} 个闹钟...", file=sys.stderr)
+            report["results"].append(
+                bench_size(size, workdir, args.max_repeat, args.dispatch_wakeups))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
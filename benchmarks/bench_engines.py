@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# bench_engines.py - 调度引擎基准测试：最小堆 vs 时间轮 vs 逐个should_trigger扫描
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alarm_manager import Alarm
+from scheduler import SCHEDULER_ENGINES
+
+
+def make_alarms(count: int, seed: int = 0) -> list:
+    """生成均匀分布在一天内的每日闹钟"""
+    rnd = random.Random(seed)
+    alarms = []
+    for i in range(count):
+        minute_of_day = rnd.randrange(1440)
+        alarm = Alarm(f"alarm-{i}", f"{minute_of_day // 60:02d}:{minute_of_day % 60:02d}")
+        alarm.last_triggered = None  # 模拟时间与真实时间无关
+        alarms.append(alarm)
+    return alarms
+
+
+def bench_scan(alarms: list, start: datetime, ticks: int) -> dict:
+    """原有方式：每秒对所有闹钟调用should_trigger"""
+    fired = 0
+    begin = time.perf_counter()
+    for i in range(ticks):
+        current_time = start + timedelta(seconds=i)
+        for alarm in alarms:
+            if alarm.should_trigger(current_time):
+                fired += 1
+    elapsed = time.perf_counter() - begin
+    return {"tick_us": elapsed / ticks * 1e6, "fired": fired}
+
+
+def bench_engine(engine: str, alarms: list, start: datetime, ticks: int) -> dict:
+    """调度引擎：插入、取消和按秒推进"""
+    scheduler = SCHEDULER_ENGINES[engine]()
+    scheduler.reset(start)
+    fire_times = [(alarm.id, alarm.next_trigger_time(start)) for alarm in alarms]
+
+    begin = time.perf_counter()
+    for alarm_id, fire_time in fire_times:
+        scheduler.schedule(alarm_id, fire_time)
+    insert_us = (time.perf_counter() - begin) / len(alarms) * 1e6
+
+    # 取消并重新插入十分之一的闹钟
+    sample = fire_times[::10]
+    begin = time.perf_counter()
+    for alarm_id, _ in sample:
+        scheduler.cancel(alarm_id)
+    cancel_us = (time.perf_counter() - begin) / max(1, len(sample)) * 1e6
+    for alarm_id, fire_time in sample:
+        scheduler.schedule(alarm_id, fire_time)
+
+    fired = 0
+    begin = time.perf_counter()
+    for i in range(1, ticks + 1):
+        fired += len(scheduler.pop_due(start + timedelta(seconds=i)))
+    tick_us = (time.perf_counter() - begin) / ticks * 1e6
+
+    return {"insert_us": insert_us, "cancel_us": cancel_us, "tick_us": tick_us, "fired": fired}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="调度引擎基准测试")
+    parser.add_argument("-n", "--count", type=int, default=100000, help="闹钟数量")
+    parser.add_argument("--ticks", type=int, default=3600, help="引擎模拟的秒数")
+    parser.add_argument("--scan-ticks", type=int, default=5, help="逐个扫描方式模拟的秒数")
+    args = parser.parse_args()
+
+    start = datetime(2026, 1, 1, 8, 0, 0)
+    print(f"闹钟数量: {args.count}")
+
+    result = bench_scan(make_alarms(args.count), start, args.scan_ticks)
+    print(f"  scan   每秒: {result['tick_us']:10.1f} us")
+
+    for engine in SCHEDULER_ENGINES:
+        result = bench_engine(engine, make_alarms(args.count), start, args.ticks)
+        print(f"  {engine:6} 每秒: {result['tick_us']:10.1f} us  "
+              f"插入: {result['insert_us']:.2f} us  取消: {result['cancel_us']:.2f} us  "
+              f"触发: {result['fired']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# bench_latency.py - 触发延迟基准测试：真实时钟下毫秒级闹钟的实际触发延迟分布
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from alarm_manager import Alarm, AlarmManager
+
+# p99目标（毫秒）
+TARGET_P99_MS = 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description="闹钟触发延迟基准测试")
+    parser.add_argument("-n", "--count", type=int, default=200, help="测量的闹钟数量")
+    parser.add_argument("--interval", type=float, default=0.05, help="相邻闹钟的间隔（秒）")
+    parser.add_argument("--engine", default="heap", help="调度引擎：heap 或 wheel")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        manager = AlarmManager(os.path.join(workdir, "alarms.json"), engine=args.engine)
+        fired = []
+        manager.on_alarm_trigger = fired.append
+
+        # 从1秒后开始，每隔interval秒一个毫秒精度的闹钟
+        first = datetime.now() + timedelta(seconds=1)
+        with manager.lock:
+            for i in range(args.count):
+                fire_time = first + timedelta(seconds=i * args.interval)
+                alarm_id = f"latency-{i}"
+                manager.alarms[alarm_id] = Alarm(
+                    alarm_id, fire_time.strftime("%H:%M:%S.") + f"{fire_time.microsecond // 1000:03d}",
+                    repeat_daily=False)
+        manager.start()
+
+        deadline = time.monotonic() + 2 + args.count * args.interval
+        while len(fired) < args.count and time.monotonic() < deadline:
+            time.sleep(0.1)
+        manager.stop()
+
+    stats = manager.lateness_stats()
+    print(f"调度引擎: {args.engine}  触发: {stats['count']}/{args.count}")
+    if stats["count"]:
+        print(f"延迟 平均: {stats['mean_ms']:.2f} ms  p50: {stats['p50_ms']:.2f} ms  "
+              f"p99: {stats['p99_ms']:.2f} ms  最大: {stats['max_ms']:.2f} ms")
+        print(f"p99目标 {TARGET_P99_MS} ms: {'达到' if stats['p99_ms'] < TARGET_P99_MS else '未达到'}")
+
+
+if __name__ == "__main__":
+    main()
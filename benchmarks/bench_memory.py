@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# bench_memory.py - Alarm内存占用基准测试：每个闹钟占用的字节数
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alarm_manager import Alarm
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alarm内存占用基准测试")
+    parser.add_argument("-n", "--count", type=int, default=1000000, help="闹钟数量")
+    args = parser.parse_args()
+
+    # 预先生成ID和时间字符串，只统计Alarm对象本身
+    ids = [f"{i:036d}" for i in range(args.count)]
+    times = [f"{(i // 60) % 24:02d}:{i % 60:02d}" for i in range(1440)]
+
+    gc.collect()
+    tracemalloc.start()
+    begin = time.perf_counter()
+    alarms = [Alarm(ids[i], times[i % 1440]) for i in range(args.count)]
+    elapsed = time.perf_counter() - begin
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"闹钟数量: {len(alarms)}")
+    print(f"  每个闹钟: {current / args.count:.1f} 字节（含列表指针）")
+    print(f"  每个闹钟: {sys.getsizeof(alarms[0])} 字节（对象本身）")
+    print(f"  创建耗时: {elapsed / args.count * 1e6:.2f} us/个")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# bench_prewarm.py - 音频预热基准测试：比较未预热（触发时解码）与预热后的播放延迟
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import wave
+
+# 添加项目根目录到Python路径
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 没有声卡时使用SDL的空音频驱动
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from audio_player import AudioPlayer
+
+
+def write_wav(path: str, seconds: float, frequency: int = 44100):
+    """生成指定时长的16位立体声WAV文件"""
+    frames = int(seconds * frequency)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(frequency)
+        f.writeframes(bytes(frames * 4))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="音频预热基准测试")
+    parser.add_argument("-n", "--count", type=int, default=20, help="每种情况的播放次数")
+    parser.add_argument("--seconds", type=float, default=30, help="测试音频时长（秒）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = [os.path.join(workdir, f"alarm_{i}.wav") for i in range(args.count)]
+        for path in paths:
+            write_wav(path, args.seconds)
+
+        # 缓存放得下全部音频，且都整体解码（不流式播放）
+        cache_bytes = 2 * args.count * int(args.seconds * 22050) * 4
+        player = AudioPlayer(default_audio_path=paths[0], cache_bytes=cache_bytes,
+                             stream_threshold=cache_bytes)
+        if not player.ensure_mixer():
+            print("pygame.mixer不可用，无法测试")
+            return
+
+        # 未预热：每次触发时解码
+        for path in paths:
+            player.play_alarm(path, loop=False)
+            player.stop()
+        cold = player.play_latency_stats()
+
+        # 预热：触发前在后台解码，触发时命中缓存
+        player.sound_cache.clear()
+        player.play_latencies.clear()
+        player.prewarm(paths)
+        deadline = time.monotonic() + 30
+        while not all(player.sound_cache.contains(path) for path in paths) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        for path in paths:
+            player.play_alarm(path, loop=False)
+            player.stop()
+        warm = player.play_latency_stats()
+        player.cleanup()
+
+    print(f"音频时长: {args.seconds:.0f} 秒  播放次数: {args.count}")
+    for name, stats in (("未预热", cold.get("decoded")), ("预热后", warm.get("cached"))):
+        if stats:
+            print(f"  {name}: 平均 {stats['mean_ms']:.2f} ms  p50 {stats['p50_ms']:.2f} ms  "
+                  f"最大 {stats['max_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
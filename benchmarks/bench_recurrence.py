@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# bench_recurrence.py - 重复规则基准测试：编译与下一次触发时间计算
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from recurrence import WEEKDAY_NAMES, compile_rule
+
+START = datetime(2026, 1, 1, 8, 0, 30)
+
+
+def random_spec(rnd: random.Random) -> str:
+    """随机生成一条重复规则"""
+    kind = rnd.randrange(4)
+    if kind == 0:
+        days = rnd.sample(WEEKDAY_NAMES, rnd.randint(1, 7))
+        return "weekly:" + ",".join(days)
+    if kind == 1:
+        return f"every:{rnd.randint(1, 240)}m"
+    if kind == 2:
+        return f"monthly:{rnd.choice([1, 2, 3, 4, 5, -1, -2])}{rnd.choice(WEEKDAY_NAMES)}"
+    minute = rnd.choice(["*", f"*/{rnd.randint(2, 30)}", str(rnd.randrange(60))])
+    hour = rnd.choice(["*", f"{rnd.randrange(12)}-{rnd.randrange(12, 24)}", str(rnd.randrange(24))])
+    day = rnd.choice(["*", "*", str(rnd.randint(1, 31)), "1,15"])
+    month = rnd.choice(["*", "*", "*", "jan,apr,jul,oct", str(rnd.randint(1, 12))])
+    weekday = rnd.choice(["*", "*", "mon-fri", "sat,sun", str(rnd.randrange(7))])
+    return f"cron:{minute} {hour} {day} {month} {weekday}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重复规则基准测试")
+    parser.add_argument("-n", "--count", type=int, default=1000000, help="规则数量")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    specs = [random_spec(rnd) for _ in range(args.count)]
+    offsets = [rnd.randrange(86400) * 1000 for _ in range(args.count)]
+    afters = [START + timedelta(seconds=rnd.randrange(86400 * 365)) for _ in range(args.count)]
+
+    begin = time.perf_counter()
+    rules = [compile_rule(spec) for spec in specs]
+    compile_us = (time.perf_counter() - begin) / args.count * 1e6
+    info = compile_rule.cache_info()
+
+    totals = {}
+    counts = {}
+    for rule, ms_of_day, after in zip(rules, offsets, afters):
+        kind = type(rule).__name__
+        begin = time.perf_counter()
+        rule.next_after(after, ms_of_day)
+        totals[kind] = totals.get(kind, 0.0) + time.perf_counter() - begin
+        counts[kind] = counts.get(kind, 0) + 1
+
+    print(f"规则数量: {args.count}  不同规则: {len(set(specs))}")
+    print(f"编译(含缓存命中): {compile_us:.2f} us/条  缓存命中: {info.hits}  未命中: {info.misses}")
+    total = sum(totals.values())
+    for kind in sorted(totals):
+        print(f"  {kind:20s} {counts[kind]:8d} 条  下一次触发: {totals[kind] / counts[kind] * 1e6:6.2f} us/条")
+    print(f"  全部{'':16s} {args.count:8d} 条  下一次触发: {total / args.count * 1e6:6.2f} us/条  合计 {total:.2f} 秒")
+
+
+if __name__ == "__main__":
+    main()
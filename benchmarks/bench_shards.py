@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# bench_shards.py - 分片基准测试：触发钩子耗CPU时，触发吞吐量随工作进程数的变化
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+# 添加项目根目录到Python路径
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from alarm_manager import AlarmManager
+from sharded_manager import ShardedAlarmManager
+
+# 每次触发钩子的计算量（循环次数），约1毫秒
+HOOK_WORK = 20000
+
+
+def cpu_hook(alarm: dict) -> int:
+    """模拟耗CPU的触发钩子（模块级函数，可以pickle到工作进程）"""
+    total = 0
+    for i in range(HOOK_WORK):
+        total += i * i
+    return total
+
+
+def run(shards: int, count: int, lead: float) -> float:
+    """count个闹钟在同一时刻触发，返回每秒处理的触发次数；shards为0时不分片"""
+    with tempfile.TemporaryDirectory() as workdir:
+        config = os.path.join(workdir, "alarms.json")
+        if shards:
+            manager = ShardedAlarmManager(config, storage="memory", shards=shards,
+                                          trigger_hook=cpu_hook)
+        else:
+            # 不分片：钩子在调度线程中执行
+            manager = AlarmManager(config, storage="memory")
+        received = [0]
+        finished = threading.Event()
+        last = [0.0]
+
+        def on_event(event):
+            if not shards:
+                cpu_hook(event.alarm.to_dict())
+            received[0] += 1
+            last[0] = time.time()
+            if received[0] == count:
+                finished.set()
+
+        manager.on_alarm_event = on_event
+        manager.start()
+        fire_at = datetime.now() + timedelta(seconds=lead)
+        manager.add_alarms([{"time_str": fire_at.strftime("%H:%M:%S.%f")[:12]}] * count)
+        finished.wait(lead + 600)
+        manager.stop()
+        elapsed = last[0] - fire_at.timestamp()
+        return received[0] / elapsed if elapsed > 0 else float("inf")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分片触发吞吐量基准测试")
+    parser.add_argument("-n", "--count", type=int, default=4000, help="同时触发的闹钟数量")
+    parser.add_argument("--shards", default=None,
+                        help="要测试的工作进程数，逗号分隔（默认 0,1,2,4,... 直到CPU核数）")
+    parser.add_argument("--lead", type=float, default=3, help="闹钟在启动后多少秒触发")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    if args.shards:
+        counts = [int(value) for value in args.shards.split(",")]
+    else:
+        counts = [0, 1]
+        while counts[-1] * 2 <= cpus:
+            counts.append(counts[-1] * 2)
+
+    print(f"CPU核数: {cpus}  闹钟数: {args.count}  钩子计算量: {HOOK_WORK} 次循环")
+    baseline = None
+    for shards in counts:
+        throughput = run(shards, args.count, args.lead)
+        name = f"{shards} 个工作进程" if shards else "不分片"
+        if baseline is None:
+            baseline = throughput
+        print(f"  {name:<10s} {throughput:10.0f} 次/秒  ({throughput / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
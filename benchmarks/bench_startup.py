@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# bench_startup.py - 启动基准测试：比较无界面模式与GUI模式的启动时间和内存占用（RSS）
+
+import argparse
+import os
+import shutil
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# 项目根目录
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+
+# 各模式的命令行参数和启动完成时输出的标志
+MODES = {
+    "headless": (["--headless"], "无界面模式已启动"),
+    "headless-no-audio": (["--headless", "--no-audio"], "无界面模式已启动"),
+    "gui": ([], "应用程序已启动"),
+}
+
+
+def measure(mode: str, workdir: str, timeout: float) -> dict:
+    """启动一次应用，返回到启动完成的耗时和退出前的峰值RSS"""
+    extra, ready_mark = MODES[mode]
+    config = os.path.join(workdir, "config", "alarms.json")
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, MAIN, "--config", config] + extra, cwd=workdir,
+                               stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=env)
+    ready = None
+    output = []
+    deadline = started + timeout
+    for line in process.stdout:
+        output.append(line)
+        if ready_mark in line:
+            ready = time.perf_counter() - started
+            break
+        if time.perf_counter() > deadline:
+            break
+    # 无界面模式按SIGTERM正常退出；GUI模式没有信号处理，直接结束进程
+    process.send_signal(signal.SIGTERM if ready and mode != "gui" else signal.SIGKILL)
+    process.stdout.read()
+    _, _, usage = os.wait4(process.pid, 0)
+    process.returncode = 0  # 已由wait4回收
+    # ru_maxrss在Linux上是KB，macOS上是字节
+    rss_kb = usage.ru_maxrss / 1024 if sys.platform == "darwin" else usage.ru_maxrss
+    return {"ready": ready, "rss_kb": rss_kb, "output": "".join(output)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动基准测试（无界面模式 vs GUI模式）")
+    parser.add_argument("-n", "--count", type=int, default=5, help="每种模式的启动次数")
+    parser.add_argument("--modes", default=",".join(MODES), help="要测试的模式，逗号分隔")
+    parser.add_argument("--timeout", type=float, default=20, help="等待启动完成的秒数")
+    args = parser.parse_args()
+
+    if not hasattr(os, "wait4"):
+        print("需要os.wait4（Linux/macOS）统计子进程的峰值RSS")
+        return
+
+    print(f"每种模式启动 {args.count} 次")
+    for mode in args.modes.split(","):
+        workdir = tempfile.mkdtemp()
+        try:
+            results = [measure(mode, workdir, args.timeout) for _ in range(args.count)]
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        ready = [r["ready"] for r in results if r["ready"] is not None]
+        if not ready:
+            last_line = results[-1]["output"].strip().splitlines()[-1:] or ["无输出"]
+            print(f"  {mode:<18s} 启动失败: {last_line[0]}")
+            continue
+        rss = [r["rss_kb"] / 1024 for r in results if r["ready"] is not None]
+        print(f"  {mode:<18s} 启动 中位数 {statistics.median(ready) * 1000:7.1f} ms  "
+              f"峰值RSS 中位数 {statistics.median(rss):6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
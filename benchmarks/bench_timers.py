@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# bench_timers.py - 倒计时器基准测试：大量并发倒计时器的添加、内存占用与到期处理
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+# 添加项目根目录到Python路径
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from alarm_manager import AlarmManager
+from clock import VirtualClock
+
+
+def main():
+    parser = argparse.ArgumentParser(description="倒计时器基准测试")
+    parser.add_argument("-n", "--count", type=int, default=500000, help="倒计时器数量")
+    parser.add_argument("--max-duration", type=int, default=3600, help="最长时长（秒）")
+    parser.add_argument("--engine", default="heap", help="调度引擎：heap 或 wheel")
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    items = [{"duration": rnd.randint(1, args.max_duration), "persist": False}
+             for _ in range(args.count)]
+    clock = VirtualClock(datetime(2026, 1, 1, 8, 0, 0))
+
+    with tempfile.TemporaryDirectory() as workdir:
+        manager = AlarmManager(os.path.join(workdir, "alarms.json"), engine=args.engine, clock=clock)
+        fired = [0]
+
+        def on_timer(timer):
+            fired[0] += 1
+        manager.on_alarm_trigger = on_timer
+
+        begin = time.perf_counter()
+        manager.add_timers(items)
+        add_seconds = time.perf_counter() - begin
+
+        # 内存占用单独测量（tracemalloc会显著拖慢添加）
+        probe = AlarmManager(os.path.join(workdir, "probe.json"), engine=args.engine, clock=clock)
+        tracemalloc.start()
+        probe.add_timers(items)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        probe.close()
+
+        # 每秒推进一次虚拟时间，直到全部到期
+        begin = time.perf_counter()
+        for _ in range(args.max_duration):
+            clock.advance(1)
+            manager.tick()
+        tick_seconds = time.perf_counter() - begin
+        manager.close()
+
+    print(f"调度引擎: {args.engine}  倒计时器: {args.count}  触发: {fired[0]}")
+    print(f"批量添加: {add_seconds:.2f} 秒（{add_seconds / args.count * 1e6:.2f} us/个）")
+    print(f"内存占用: {memory / args.count:.0f} 字节/个")
+    print(f"到期处理: {tick_seconds:.2f} 秒（{tick_seconds / max(fired[0], 1) * 1e6:.2f} us/个）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+# channel_pool.py - 播放通道池：多个闹钟同时发声，按优先级抢占通道
+
+import itertools
+import threading
+from typing import Callable, Dict, List, Optional
+
+# 没有空闲通道时的抢占策略
+#   "lowest"  抢占优先级最低的声音（同优先级时最早开始的），其优先级不能高于新声音
+#   "oldest"  抢占最早开始的声音，其优先级不能高于新声音
+#   "none"    不抢占，新声音不播放
+STEAL_POLICIES = ("lowest", "oldest", "none")
+
+
+class ChannelPool:
+    """播放通道池
+
+    每个正在播放的声音（voice）以键（通常是闹钟ID）标识，占用一个通道，
+    可以单独停止、淡出；同一个键再次播放时替换原来的声音。
+    没有空闲通道时先扩容（最多max_channels个，通过resize调整mixer的通道数，
+    不重新初始化mixer），仍然不够时按策略抢占。
+    channel_factory(i) 返回第i个通道对象，需提供pygame.mixer.Channel的
+    play / stop / fadeout / set_volume / get_busy 方法。
+    """
+
+    def __init__(self, channel_factory: Callable[[int], object],
+                 resize: Optional[Callable[[int], None]] = None,
+                 channels: int = 8, max_channels: int = 32, policy: str = "lowest"):
+        if policy not in STEAL_POLICIES:
+            raise ValueError(f"未知的抢占策略: {policy}，可选: {', '.join(STEAL_POLICIES)}")
+        if not 0 < channels <= max_channels:
+            raise ValueError("通道数必须大于0且不超过max_channels")
+        self.channel_factory = channel_factory
+        self.resize = resize
+        self.max_channels = max_channels
+        self.policy = policy
+        self._channels: List[object] = []
+        # 键 -> (通道下标, 优先级, 开始序号)
+        self._voices: Dict[str, tuple] = {}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self.stats = {"played": 0, "stolen": 0, "rejected": 0}
+        self._grow(channels)
+
+    def __len__(self) -> int:
+        """通道数"""
+        return len(self._channels)
+
+    def play(self, key: str, sound, loops: int = 0, volume: float = 1.0, priority: int = 0) -> bool:
+        """在空闲（或抢占来的）通道上播放声音，没有可用通道时返回False"""
+        with self._lock:
+            self._stop_locked(key)
+            self._reap_locked()
+            index = self._free_channel_locked()
+            if index is None:
+                victim = self._pick_victim_locked(priority)
+                if victim is None:
+                    self.stats["rejected"] += 1
+                    return False
+                index = self._voices[victim][0]
+                self._stop_locked(victim)
+                self.stats["stolen"] += 1
+            channel = self._channels[index]
+            channel.set_volume(volume)
+            channel.play(sound, loops=loops)
+            self._voices[key] = (index, priority, next(self._sequence))
+            self.stats["played"] += 1
+            return True
+
+    def stop(self, key: str):
+        """停止指定键的声音"""
+        with self._lock:
+            self._stop_locked(key)
+
+    def fadeout(self, key: str, duration: int):
+        """淡出指定键的声音（毫秒），通道在淡出结束后空闲"""
+        with self._lock:
+            voice = self._voices.get(key)
+            if voice is not None:
+                self._channels[voice[0]].fadeout(duration)
+
+    def stop_all(self):
+        """停止所有声音"""
+        with self._lock:
+            for key in list(self._voices):
+                self._stop_locked(key)
+
+    def fadeout_all(self, duration: int):
+        """淡出所有声音（毫秒）"""
+        with self._lock:
+            for index, _, _ in self._voices.values():
+                self._channels[index].fadeout(duration)
+
+    def set_volume(self, volume: float, key: Optional[str] = None):
+        """设置指定键（None表示所有声音）的音量"""
+        with self._lock:
+            for voice_key, (index, _, _) in self._voices.items():
+                if key is None or voice_key == key:
+                    self._channels[index].set_volume(volume)
+
+    def is_playing(self, key: Optional[str] = None) -> bool:
+        """指定键（None表示任意声音）是否正在播放"""
+        with self._lock:
+            self._reap_locked()
+            return key in self._voices if key is not None else bool(self._voices)
+
+    def active_keys(self) -> List[str]:
+        """正在播放的声音的键"""
+        with self._lock:
+            self._reap_locked()
+            return list(self._voices)
+
+    def _grow(self, count: int):
+        """扩容到count个通道（调用方需持有锁或在构造时调用）"""
+        if self.resize:
+            self.resize(count)
+        while len(self._channels) < count:
+            self._channels.append(self.channel_factory(len(self._channels)))
+
+    def _stop_locked(self, key: str):
+        """停止并移除声音（调用方需持有锁）"""
+        voice = self._voices.pop(key, None)
+        if voice is not None:
+            self._channels[voice[0]].stop()
+
+    def _reap_locked(self):
+        """移除已经播放结束的声音（调用方需持有锁）"""
+        finished = [key for key, (index, _, _) in self._voices.items()
+                    if not self._channels[index].get_busy()]
+        for key in finished:
+            del self._voices[key]
+
+    def _free_channel_locked(self) -> Optional[int]:
+        """找一个空闲通道，都在使用时尝试扩容（调用方需持有锁）"""
+        used = {index for index, _, _ in self._voices.values()}
+        for index, channel in enumerate(self._channels):
+            if index not in used and not channel.get_busy():
+                return index
+        if len(self._channels) < self.max_channels:
+            index = len(self._channels)
+            self._grow(min(self.max_channels, len(self._channels) * 2))
+            return index
+        return None
+
+    def _pick_victim_locked(self, priority: int) -> Optional[str]:
+        """按抢占策略选出被抢占的声音，优先级高于新声音的不会被抢占（调用方需持有锁）"""
+        if self.policy == "none":
+            return None
+        candidates = [(p, seq, key) for key, (_, p, seq) in self._voices.items() if p <= priority]
+        if not candidates:
+            return None
+        if self.policy == "lowest":
+            return min(candidates)[2]
+        return min(candidates, key=lambda item: item[1])[2]
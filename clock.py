@@ -0,0 +1,61 @@
+# clock.py - 时钟抽象：真实时钟与可推进的虚拟时钟
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Union
+
+
+class WallClock:
+    """真实系统时钟"""
+
+    def now(self) -> datetime:
+        """当前墙上时间"""
+        return datetime.now()
+
+    def monotonic(self) -> float:
+        """单调时钟（秒）"""
+        return time.monotonic()
+
+
+class VirtualClock:
+    """虚拟时钟，用于测试和模拟：时间只在调用advance/advance_to时前进"""
+
+    def __init__(self, start: Optional[datetime] = None):
+        self._now = start or datetime.now().replace(microsecond=0)
+        self._monotonic = 0.0
+        self._lock = threading.Lock()
+
+    def now(self) -> datetime:
+        """当前虚拟时间"""
+        with self._lock:
+            return self._now
+
+    def monotonic(self) -> float:
+        """虚拟单调时钟（秒，从创建时开始计）"""
+        with self._lock:
+            return self._monotonic
+
+    def advance(self, delta: Union[float, timedelta]):
+        """时间前进delta（秒或timedelta）"""
+        if not isinstance(delta, timedelta):
+            delta = timedelta(seconds=delta)
+        if delta < timedelta(0):
+            raise ValueError("虚拟时钟不能倒退")
+        with self._lock:
+            self._now += delta
+            self._monotonic += delta.total_seconds()
+
+    def advance_to(self, target: datetime):
+        """时间前进到target（早于当前时间时不变）"""
+        with self._lock:
+            delta = target - self._now
+        if delta > timedelta(0):
+            self.advance(delta)
+
+    def jump(self, delta: Union[float, timedelta]):
+        """只调整墙上时间（可以倒退），单调时钟不变，模拟系统时间被修改或系统休眠"""
+        if not isinstance(delta, timedelta):
+            delta = timedelta(seconds=delta)
+        with self._lock:
+            self._now += delta
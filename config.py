@@ -2,14 +2,17 @@
 
 import json
 import os
+from persistence import write_json_atomic
 
 
 class AppConfig:
     """应用配置管理器"""
 
-    def __init__(self, config_file: str = "config/app_config.json"):
+    def __init__(self, config_file: str = "config/app_config.json", writer=None):
         self.config_file = config_file
         self.config = self._load_default_config()
+        # 后台写线程（persistence.BackgroundWriter），为None时同步写入
+        self.writer = writer
 
         # 确保配置文件目录存在
         config_dir = os.path.dirname(config_file)
@@ -41,13 +44,20 @@ class AppConfig:
             print(f"加载应用配置失败，使用默认配置: {e}")
 
     def save(self):
-        """保存配置文件"""
+        """保存配置文件（设置了后台写线程时合并写入）"""
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2)
+            if self.writer:
+                self.writer.submit(self.config_file, lambda: dict(self.config))
+            else:
+                write_json_atomic(self.config_file, self.config)
         except Exception as e:
             print(f"保存应用配置失败: {e}")
 
+    def flush(self):
+        """等待后台写线程写出待保存的配置"""
+        if self.writer:
+            self.writer.flush()
+
     def get(self, key: str, default=None):
         """获取配置项"""
         return self.config.get(key, default)
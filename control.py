@@ -0,0 +1,351 @@
+# control.py - 本地控制接口：通过Unix域套接字以JSON行协议管理运行中的闹钟
+
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import threading
+from typing import Iterable, List, Optional
+from countdown import CountdownTimer
+
+# 默认套接字路径（main.py --control-socket 不带路径时使用）
+DEFAULT_SOCKET_PATH = "config/control.sock"
+
+# 单个请求行的最大字节数（批量操作一次可以提交数万项）
+MAX_LINE_BYTES = 64 * 1024 * 1024
+
+
+class ControlServer:
+    """本地控制服务
+
+    在Unix域套接字上监听，每个连接发送若干行JSON请求，每行一个对象，
+    例如 {"op": "add", "time_str": "07:30"}；服务按顺序对每行返回一行
+    {"ok": true, "result": ...} 或 {"ok": false, "error": "..."}。
+    请求直接作用于运行中的AlarmManager，修改经由它的存储后端保存，
+    不会与应用自身的写入竞争；批量操作（add_many等）只加锁、保存和通知一次。
+    支持的操作见OPERATIONS。套接字文件权限为0600，只有当前用户可以连接。
+    """
+
+    OPERATIONS = ('ping', 'status', 'list', 'get', 'add', 'update', 'remove', 'toggle',
+                  'add_many', 'update_many', 'remove_many', 'set_enabled_many',
+                  'pause', 'resume', 'upcoming', 'metrics')
+
+    def __init__(self, alarm_manager, socket_path: str = DEFAULT_SOCKET_PATH):
+        if not hasattr(socket, "AF_UNIX"):
+            raise OSError("当前平台不支持Unix域套接字")
+        self.alarm_manager = alarm_manager
+        self.socket_path = socket_path
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """绑定套接字并在后台线程中处理连接"""
+        if self._server:
+            return
+        self._remove_stale_socket()
+        socket_dir = os.path.dirname(self.socket_path)
+        if socket_dir:
+            os.makedirs(socket_dir, exist_ok=True)
+
+        control = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                control._handle_connection(self.rfile, self.wfile)
+
+        # 绑定后、开始监听前把套接字权限改为0600：监听之前无法连接，
+        # 不修改进程的umask（其他线程此时可能正在创建文件）
+        server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler,
+                                                        bind_and_activate=False)
+        try:
+            server.server_bind()
+        except OSError:
+            server.server_close()
+            raise
+        try:
+            os.chmod(self.socket_path, 0o600)
+            server.server_activate()
+        except OSError:
+            server.server_close()
+            os.unlink(self.socket_path)
+            raise
+        server.daemon_threads = True
+        self._server = server
+        self._thread = threading.Thread(target=server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止监听并删除套接字文件"""
+        server, self._server = self._server, None
+        if not server:
+            return
+        server.shutdown()
+        server.server_close()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+    def _remove_stale_socket(self):
+        """删除上次异常退出留下的套接字文件；已有进程在监听时抛出OSError"""
+        try:
+            mode = os.stat(self.socket_path).st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise OSError(f"控制接口路径已存在且不是套接字: {self.socket_path}")
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.unlink(self.socket_path)
+        else:
+            raise OSError(f"已有进程在监听控制接口: {self.socket_path}")
+        finally:
+            probe.close()
+
+    def _handle_connection(self, rfile, wfile):
+        """逐行读取请求并写回响应，直到对方关闭连接"""
+        while True:
+            line = rfile.readline(MAX_LINE_BYTES)
+            if not line:
+                break
+            if len(line) == MAX_LINE_BYTES and not line.endswith(b"\n"):
+                # 超长的请求：丢弃到下一个换行符，只返回一个错误响应，保持请求与响应一一对应
+                while line and not line.endswith(b"\n"):
+                    line = rfile.readline(MAX_LINE_BYTES)
+                response = json.dumps({"ok": False, "error": f"请求超过{MAX_LINE_BYTES}字节"},
+                                      ensure_ascii=False)
+            elif not line.strip():
+                continue
+            else:
+                response = self.handle_line(line)
+            try:
+                wfile.write(response.encode("utf-8") + b"\n")
+            except OSError:
+                break
+
+    def handle_line(self, line) -> str:
+        """处理一行JSON请求，返回一行JSON响应（不含换行符）"""
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return json.dumps({"ok": False, "error": f"请求不是有效的JSON: {e}"}, ensure_ascii=False)
+        return json.dumps(self.handle(request), ensure_ascii=False)
+
+    def handle(self, request) -> dict:
+        """处理一个请求对象，返回响应对象"""
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "请求必须是JSON对象"}
+        params = dict(request)
+        op = params.pop("op", None)
+        if op not in self.OPERATIONS:
+            return {"ok": False, "error": f"未知的操作: {op!r}，可选: {', '.join(self.OPERATIONS)}"}
+        try:
+            return {"ok": True, "result": getattr(self, f"_op_{op}")(**params)}
+        except TypeError as e:
+            return {"ok": False, "error": f"{op}参数错误: {e}"}
+        except (KeyError, ValueError) as e:
+            return {"ok": False, "error": str(e.args[0]) if e.args else repr(e)}
+        except Exception as e:
+            print(f"控制接口处理{op}失败: {e}")
+            return {"ok": False, "error": f"{op}失败: {e}"}
+
+    # === 操作：参数即请求对象中除op以外的字段 ===
+
+    def _op_ping(self):
+        return "pong"
+
+    def _op_status(self):
+        manager = self.alarm_manager
+        next_fire = manager.next_fire_time()
+        return {
+            "running": manager.running,
+            "paused": manager.paused,
+            "alarms": len(manager.alarms),
+            "timers": len(manager.timers),
+            "next_fire": next_fire.isoformat() if next_fire else None,
+        }
+
+    def _op_list(self, enabled_only: bool = False):
+        return [self._alarm_dict(alarm) for alarm in self.alarm_manager.get_all_alarms()
+                if alarm.enabled or not enabled_only]
+
+    def _op_get(self, id: str):
+        return self._alarm_dict(self._require(id))
+
+    def _op_add(self, **fields):
+        return self.alarm_manager.add_alarms([fields])[0]
+
+    def _op_update(self, id: str, **fields):
+        self._require(id)
+        if not self.alarm_manager.update_alarms([dict(fields, id=id)])[0]:
+            raise KeyError(f"闹钟不存在: {id}")
+        return True
+
+    def _op_remove(self, id: str):
+        if not self.alarm_manager.remove_alarm(id):
+            raise KeyError(f"闹钟不存在: {id}")
+        return True
+
+    def _op_toggle(self, id: str):
+        self._require(id)
+        # 返回切换后的启用状态
+        return self.alarm_manager.toggle_alarm(id)
+
+    def _op_add_many(self, items: List[dict]):
+        return self.alarm_manager.add_alarms(self._list_of_dicts(items, "items"))
+
+    def _op_update_many(self, updates: List[dict]):
+        return self.alarm_manager.update_alarms(self._list_of_dicts(updates, "updates"))
+
+    def _op_remove_many(self, ids: List[str]):
+        return self.alarm_manager.remove_alarms(self._list_of_ids(ids))
+
+    def _op_set_enabled_many(self, ids: List[str], enabled: bool):
+        if not isinstance(enabled, bool):
+            raise ValueError("enabled必须是布尔值")
+        return self.alarm_manager.set_enabled_many(self._list_of_ids(ids), enabled)
+
+    def _op_pause(self):
+        self.alarm_manager.pause()
+        return True
+
+    def _op_resume(self):
+        self.alarm_manager.resume()
+        return True
+
+    def _op_upcoming(self, limit: int = 10, within: Optional[float] = None):
+        if isinstance(limit, bool) or not isinstance(limit, int) or limit < 0:
+            raise ValueError("limit必须是非负整数")
+        if within is not None and (isinstance(within, bool) or not isinstance(within, (int, float))):
+            raise ValueError("within必须是秒数")
+        return [
+            {
+                "id": item.id,
+                "type": "timer" if isinstance(item, CountdownTimer) else "alarm",
+                "time_str": item.time_str,
+                "message": item.message,
+                "fire_time": fire_time.isoformat(),
+            }
+            for fire_time, item in self.alarm_manager.upcoming(limit, within)
+        ]
+
+    def _op_metrics(self, format: str = "json"):
+        registry = self.alarm_manager.metrics
+        if format == "prometheus":
+            return registry.to_prometheus()
+        if format != "json":
+            raise ValueError("format必须是 json 或 prometheus")
+        return registry.snapshot()
+
+    def _require(self, alarm_id: str):
+        """获取闹钟，不存在时抛出KeyError"""
+        alarm = self.alarm_manager.get_alarm(alarm_id)
+        if alarm is None:
+            raise KeyError(f"闹钟不存在: {alarm_id}")
+        return alarm
+
+    def _alarm_dict(self, alarm) -> dict:
+        """闹钟的字典表示，附带下一次触发时间"""
+        data = alarm.to_dict()
+        fire_time = self.alarm_manager.scheduled_time(alarm.id)
+        data['next_fire'] = fire_time.isoformat() if fire_time else None
+        return data
+
+    @staticmethod
+    def _list_of_dicts(items, name: str) -> List[dict]:
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise ValueError(f"{name}必须是对象列表")
+        return items
+
+    @staticmethod
+    def _list_of_ids(ids) -> List[str]:
+        if not isinstance(ids, list) or not all(isinstance(alarm_id, str) for alarm_id in ids):
+            raise ValueError("ids必须是字符串列表")
+        return ids
+
+
+class ControlClient:
+    """本地控制接口客户端，供脚本使用
+
+        with ControlClient() as client:
+            alarm_id = client.call("add", time_str="07:30")
+            client.call("toggle", id=alarm_id)
+
+    call()失败时抛出RuntimeError；pipeline()一次发送多个请求再依次读取响应。
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, timeout: Optional[float] = 30):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path)
+        self._rfile = self.sock.makefile("rb")
+
+    def call(self, op: str, **params):
+        """发送一个请求并返回结果"""
+        response = self.pipeline([dict(params, op=op)])[0]
+        if not response.get("ok"):
+            raise RuntimeError(response.get("error"))
+        return response.get("result")
+
+    def pipeline(self, requests: Iterable[dict]) -> List[dict]:
+        """依次发送多个请求，返回对应的响应对象列表（失败的请求不抛出异常）"""
+        payload = b"".join(json.dumps(request, ensure_ascii=False).encode("utf-8") + b"\n"
+                           for request in requests)
+        count = payload.count(b"\n")
+        # 边发送边读取，避免大量请求时双方的缓冲区都写满
+        sender = threading.Thread(target=self.sock.sendall, args=(payload,), daemon=True)
+        sender.start()
+        responses = []
+        for _ in range(count):
+            line = self._rfile.readline()
+            if not line:
+                raise ConnectionError("控制接口连接已关闭")
+            responses.append(json.loads(line))
+        sender.join()
+        return responses
+
+    def close(self):
+        self._rfile.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    """命令行：python control.py [--socket PATH] OP [JSON参数]
+
+    OP为 "-" 时从标准输入逐行读取JSON请求，按顺序输出响应行。
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description="简单计时器本地控制接口")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="控制接口套接字路径")
+    parser.add_argument("op", help=f"操作（{', '.join(ControlServer.OPERATIONS)}），或 - 从标准输入读取请求")
+    parser.add_argument("params", nargs="?", default="{}", help="JSON对象形式的参数")
+    args = parser.parse_args(argv)
+
+    with ControlClient(args.socket) as client:
+        if args.op == "-":
+            requests = [json.loads(line) for line in sys.stdin if line.strip()]
+            for response in client.pipeline(requests):
+                print(json.dumps(response, ensure_ascii=False))
+            return 0
+        response = client.pipeline([dict(json.loads(args.params), op=args.op)])[0]
+    if response.get("ok") and isinstance(response.get("result"), str):
+        # 文本结果（如 metrics 的Prometheus格式）原样输出
+        print(response["result"], end="" if response["result"].endswith("\n") else "\n")
+    else:
+        print(json.dumps(response.get("result") if response.get("ok") else response,
+                         ensure_ascii=False, indent=2))
+    return 0 if response.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
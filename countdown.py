@@ -0,0 +1,106 @@
+# countdown.py - 倒计时器：基于单调时钟的截止时间，可暂停、恢复和持久化剩余时间
+
+from typing import Optional
+
+# 倒计时器状态
+TIMER_IDLE = "idle"        # 已创建，尚未开始
+TIMER_RUNNING = "running"  # 计时中
+TIMER_PAUSED = "paused"    # 已暂停，保留剩余时间
+TIMER_STATES = (TIMER_IDLE, TIMER_RUNNING, TIMER_PAUSED)
+
+
+class CountdownTimer:
+    """单个倒计时器
+
+    截止时间按单调时钟（秒）保存，不受系统时间修改影响；暂停时只保存剩余秒数。
+    所有方法都传入当前的单调时钟读数，由AlarmManager统一提供（测试时为虚拟时钟）。
+    提供与Alarm相同的id、time_str、audio_file、message属性，
+    到期时和闹钟一样通过on_alarm_trigger回调，可以直接交给提醒窗口显示。
+    persist为False时不写入存储（例如大量的任务超时计时器）。
+    """
+
+    __slots__ = ('id', 'duration', 'message', 'audio_file', 'persist',
+                 'state', '_deadline', '_remaining')
+
+    # 播放优先级：倒计时器使用默认优先级
+    priority = 0
+
+    def __init__(self, timer_id: str, duration: float, message: str = "",
+                 audio_file: str = None, persist: bool = True):
+        if isinstance(duration, bool) or not isinstance(duration, (int, float)) or not duration > 0:
+            raise ValueError(f"倒计时时长必须是正数秒: {duration!r}")
+        self.id = timer_id  # UUID
+        self.duration = float(duration)  # 总时长（秒）
+        self.message = message  # 提醒内容
+        self.audio_file = audio_file  # None表示使用默认音乐
+        self.persist = persist
+        self.state = TIMER_IDLE
+        self._deadline: Optional[float] = None  # 计时中的截止时间（单调时钟）
+        self._remaining = self.duration  # 未计时时的剩余秒数
+
+    @property
+    def time_str(self) -> str:
+        """时长的显示文本，"MM:SS"或"H:MM:SS" """
+        total = int(round(self.duration))
+        hours, rest = divmod(total, 3600)
+        minutes, seconds = divmod(rest, 60)
+        if hours:
+            return f"{hours}:{minutes:02d}:{seconds:02d}"
+        return f"{minutes:02d}:{seconds:02d}"
+
+    @property
+    def running(self) -> bool:
+        return self.state == TIMER_RUNNING
+
+    def remaining(self, monotonic: float) -> float:
+        """剩余秒数（不小于0）"""
+        if self._deadline is not None:
+            return max(0.0, self._deadline - monotonic)
+        return self._remaining
+
+    def start(self, monotonic: float):
+        """从完整时长开始（或重新开始）计时"""
+        self._remaining = self.duration
+        self._deadline = monotonic + self.duration
+        self.state = TIMER_RUNNING
+
+    def pause(self, monotonic: float):
+        """暂停计时，保存剩余时间"""
+        if self.state != TIMER_RUNNING:
+            return
+        self._remaining = self.remaining(monotonic)
+        self._deadline = None
+        self.state = TIMER_PAUSED
+
+    def resume(self, monotonic: float):
+        """按剩余时间继续计时"""
+        if self.state == TIMER_RUNNING:
+            return
+        self._deadline = monotonic + self._remaining
+        self.state = TIMER_RUNNING
+
+    def to_dict(self, monotonic: float) -> dict:
+        """转换为字典，保存的是当前的剩余时间（单调时钟不能跨进程保存）"""
+        return {
+            'id': self.id,
+            'duration': self.duration,
+            'remaining': self.remaining(monotonic),
+            'state': self.state,
+            'message': self.message,
+            'audio_file': self.audio_file,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, monotonic: float) -> 'CountdownTimer':
+        """从字典创建，计时中的倒计时器从monotonic起按剩余时间继续"""
+        timer = cls(data['id'], data['duration'], data.get('message', ""),
+                    data.get('audio_file'))
+        state = data.get('state', TIMER_IDLE)
+        if state not in TIMER_STATES:
+            raise ValueError(f"未知的倒计时状态: {state!r}")
+        timer._remaining = min(timer.duration, max(0.0, float(data.get('remaining', timer.duration))))
+        if state == TIMER_RUNNING:
+            timer.resume(monotonic)
+        else:
+            timer.state = state
+        return timer
@@ -0,0 +1,248 @@
+# daemon.py - 无界面守护进程模式：只运行闹钟调度和音频播放，不导入tkinter、PIL和pystray
+
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from alarm_manager import AlarmEvent, AlarmManager
+from dispatcher import CallbackDispatcher
+from metrics import DEFAULT_DUMP_INTERVAL, MetricsDumper
+from persistence import BackgroundWriter
+from startup import StartupProfiler
+
+# 无界面时没有提醒窗口来停止响铃，响铃持续该秒数后自动停止
+DEFAULT_RING_SECONDS = 60
+
+
+class NullAudioPlayer:
+    """无声音频接收器：提供AudioPlayer的接口，不播放任何声音（--no-audio）"""
+
+    def prewarm(self, audio_files):
+        pass
+
+    def play_alarm(self, audio_file: str = None, loop: bool = True,
+                   key: str = None, priority: int = 0):
+        pass
+
+    def stop(self, key: str = None):
+        pass
+
+    def cleanup(self):
+        pass
+
+
+class AlarmDaemon:
+    """无界面闹钟守护进程
+
+    把AlarmManager接到音频播放器（或无声接收器），触发时写日志并响铃ring_seconds秒。
+    SIGTERM / SIGINT 保存倒计时器、写出待保存的配置后退出；
+    SIGHUP 重新加载闹钟配置（例如在外部修改了alarms.json之后）。
+    信号处理函数只设置标志，加载和退出在run()所在的主线程中完成。
+    """
+
+    def __init__(self, config_file: str = "config/alarms.json", audio_player=None,
+                 ring_seconds: float = DEFAULT_RING_SECONDS, storage: str = "json", clock=None,
+                 control_socket: Optional[str] = None, shards: int = 0, trigger_hook=None,
+                 metrics_file: Optional[str] = None, metrics_interval: float = DEFAULT_DUMP_INTERVAL):
+        self.config_file = config_file
+        self.ring_seconds = ring_seconds
+        self.audio_player = audio_player if audio_player is not None else NullAudioPlayer()
+        # 后台写线程和回调分发器，与GUI模式相同
+        self.writer = BackgroundWriter()
+        self.dispatcher = CallbackDispatcher()
+        if shards:
+            # 多进程分片：闹钟在shards个工作进程中调度，trigger_hook在工作进程中执行
+            from sharded_manager import ShardedAlarmManager
+            self.alarm_manager = ShardedAlarmManager(config_file, storage=storage, clock=clock,
+                                                     writer=self.writer, dispatcher=self.dispatcher,
+                                                     shards=shards, trigger_hook=trigger_hook)
+        else:
+            self.alarm_manager = AlarmManager(config_file, storage=storage, clock=clock,
+                                              writer=self.writer, dispatcher=self.dispatcher)
+        self.alarm_manager.on_prewarm = self.audio_player.prewarm
+        self.alarm_manager.on_alarm_event = self._on_alarm_event
+        # 响铃自动停止的定时器：播放键 -> threading.Timer
+        self._ring_timers: Dict[str, threading.Timer] = {}
+        self._ring_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_requested = False
+        self._reload_requested = False
+        # 本地控制接口（control.py），control_socket为None时不开启
+        self.control_socket = control_socket
+        self.control_server = None
+        # 运行指标定期写入的Prometheus文本文件，metrics_file为None时不写
+        self.metrics_dumper = None
+        if metrics_file:
+            self.metrics_dumper = MetricsDumper(self.alarm_manager.metrics, metrics_file,
+                                                metrics_interval)
+
+    def log(self, message: str):
+        """带时间戳输出日志（立即刷新，便于systemd等收集）"""
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+
+    def start(self):
+        """加载闹钟并启动调度线程"""
+        self.alarm_manager.load_alarms()
+        self.alarm_manager.start()
+        if self.control_socket:
+            from control import ControlServer
+            try:
+                server = ControlServer(self.alarm_manager, self.control_socket)
+                server.start()
+                self.control_server = server
+                self.log(f"本地控制接口: {self.control_socket}")
+            except OSError as e:
+                self.log(f"启动控制接口失败: {e}")
+        if self.metrics_dumper:
+            self.metrics_dumper.start()
+            self.log(f"运行指标文件: {self.metrics_dumper.path}（每{self.metrics_dumper.interval:g}秒更新）")
+        self.log(f"无界面模式已启动（pid {os.getpid()}），"
+                 f"{len(self.alarm_manager.alarms)} 个闹钟，{len(self.alarm_manager.timers)} 个倒计时器")
+
+    def reload(self):
+        """重新加载闹钟配置：先保存倒计时器的剩余时间，再从存储重新加载"""
+        self.alarm_manager.save_timers()
+        self.writer.flush()
+        self.alarm_manager.load_alarms()
+        self.log(f"已重新加载闹钟配置：{len(self.alarm_manager.alarms)} 个闹钟")
+
+    def request_stop(self):
+        """请求退出（可在信号处理函数或其他线程中调用）"""
+        self._stop_requested = True
+        self._wakeup.set()
+
+    def request_reload(self):
+        """请求重新加载闹钟配置（可在信号处理函数或其他线程中调用）"""
+        self._reload_requested = True
+        self._wakeup.set()
+
+    def install_signal_handlers(self):
+        """注册SIGTERM、SIGINT、SIGHUP处理函数（只能在主线程中调用；Windows没有SIGHUP）"""
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.request_stop())
+        signal.signal(signal.SIGINT, lambda signum, frame: self.request_stop())
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, lambda signum, frame: self.request_reload())
+
+    def run(self):
+        """注册信号处理函数、启动并等待信号，直到请求退出"""
+        self.install_signal_handlers()
+        self.start()
+        self.serve()
+
+    def serve(self):
+        """等待信号并处理重新加载请求，直到请求退出，退出前调用shutdown()"""
+        try:
+            while not self._stop_requested:
+                # 带超时等待，Windows上Ctrl+C也能及时处理
+                self._wakeup.wait(1.0)
+                self._wakeup.clear()
+                if self._reload_requested and not self._stop_requested:
+                    self._reload_requested = False
+                    try:
+                        self.reload()
+                    except Exception as e:
+                        self.log(f"重新加载闹钟配置失败: {e}")
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        """停止调度，保存倒计时器和待写出的配置，停止播放"""
+        self.log("正在退出...")
+        if self.control_server:
+            try:
+                self.control_server.stop()
+            except Exception as e:
+                self.log(f"停止控制接口失败: {e}")
+        try:
+            self.alarm_manager.stop()
+        except Exception as e:
+            self.log(f"停止闹钟管理器失败: {e}")
+
+        # 保存倒计时器的剩余时间
+        self.alarm_manager.save_timers()
+
+        try:
+            self.dispatcher.shutdown()
+        except Exception as e:
+            self.log(f"停止回调分发器失败: {e}")
+
+        # 写出尚未保存的闹钟
+        try:
+            if not self.writer.flush():
+                self.log("等待保存闹钟配置超时")
+        except Exception as e:
+            self.log(f"保存闹钟配置失败: {e}")
+
+        with self._ring_lock:
+            timers = list(self._ring_timers.values())
+            self._ring_timers.clear()
+        for timer in timers:
+            timer.cancel()
+        try:
+            self.audio_player.stop()
+            self.audio_player.cleanup()
+        except Exception as e:
+            self.log(f"停止音频播放器失败: {e}")
+        if self.metrics_dumper:
+            # 退出前写入最终的指标
+            self.metrics_dumper.stop()
+        self.log("已退出")
+
+    def _on_alarm_event(self, event: AlarmEvent):
+        """闹钟或倒计时器触发：写日志并响铃（在回调分发器的工作线程中调用）"""
+        alarm = event.alarm
+        late = f"，迟到 {event.late_by:.1f} 秒" if event.late_by >= 1 else ""
+        message = getattr(alarm, "message", "")
+        self.log(f"闹钟触发: {alarm.time_str} {alarm.id}{late}" + (f" {message}" if message else ""))
+        self.audio_player.play_alarm(alarm.audio_file, key=alarm.id, priority=alarm.priority)
+        if self.ring_seconds > 0:
+            self._schedule_ring_stop(alarm.id)
+
+    def _schedule_ring_stop(self, key: str):
+        """ring_seconds秒后停止该键的响铃；同一个闹钟再次触发时重新计时"""
+        timer = threading.Timer(self.ring_seconds, self._stop_ring, args=(key,))
+        timer.daemon = True
+        with self._ring_lock:
+            previous = self._ring_timers.pop(key, None)
+            self._ring_timers[key] = timer
+        if previous:
+            previous.cancel()
+        timer.start()
+
+    def _stop_ring(self, key: str):
+        """响铃时间到，停止该键的声音（在threading.Timer线程中调用）"""
+        with self._ring_lock:
+            # 已被再次触发替换或已在退出时取消的定时器不再停止声音
+            if self._ring_timers.get(key) is not threading.current_thread():
+                return
+            del self._ring_timers[key]
+        self.audio_player.stop(key)
+
+
+def run_headless(config_file: str = "config/alarms.json", audio: bool = True,
+                 ring_seconds: float = DEFAULT_RING_SECONDS, control_socket: Optional[str] = None,
+                 shards: int = 0, trigger_hook=None, metrics_file: Optional[str] = None,
+                 metrics_interval: float = DEFAULT_DUMP_INTERVAL,
+                 profiler: Optional[StartupProfiler] = None) -> int:
+    """无界面模式入口（main.py --headless），返回退出码"""
+    profiler = profiler or StartupProfiler()
+    audio_player = None
+    if audio:
+        with profiler.phase("导入 audio_player"):
+            # pygame在第一次预热或播放时才导入
+            from audio_player import AudioPlayer
+            audio_player = AudioPlayer()
+    with profiler.phase("初始化守护进程"):
+        daemon = AlarmDaemon(config_file, audio_player, ring_seconds,
+                             control_socket=control_socket, shards=shards,
+                             trigger_hook=trigger_hook, metrics_file=metrics_file,
+                             metrics_interval=metrics_interval)
+    with profiler.phase("加载闹钟并启动调度"):
+        daemon.install_signal_handlers()
+        daemon.start()
+    profiler.report()
+    daemon.log(f"启动耗时 {(time.perf_counter() - profiler.started) * 1000:.1f} ms")
+    daemon.serve()
+    return 0
@@ -0,0 +1,160 @@
+# dispatcher.py - 闹钟回调分发：工作线程池 + 有界队列，调度线程只负责入队
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+# 队列满时的处理策略
+#   "block"        等待队列空出位置，最多等待block_timeout秒，超时丢弃新事件
+#   "drop_oldest"  丢弃队列中最早的事件
+#   "coalesce"     同一闹钟已在排队时不重复入队；队列满时丢弃最早的事件
+DISPATCH_POLICIES = ("block", "drop_oldest", "coalesce")
+
+
+class CallbackDispatcher:
+    """闹钟回调分发器
+
+    AlarmManager(dispatcher=...) 在调度线程中只调用submit把触发事件放入有界队列，
+    回调由工作线程执行，慢回调（例如访问Tk或做IO）不会推迟同一时刻的其他闹钟。
+    执行时间超过slow_threshold秒的回调会连同闹钟ID报告给on_slow_callback。
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 256, policy: str = "drop_oldest",
+                 slow_threshold: float = 1.0, block_timeout: float = 1.0):
+        if policy not in DISPATCH_POLICIES:
+            raise ValueError(f"未知的分发策略: {policy}，可选: {', '.join(DISPATCH_POLICIES)}")
+        if workers < 1 or max_queue < 1:
+            raise ValueError("工作线程数和队列长度必须大于0")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.policy = policy
+        self.slow_threshold = slow_threshold
+        self.block_timeout = block_timeout
+        # 慢回调报告，参数为 (闹钟ID, 耗时秒数)；为None时打印警告
+        self.on_slow_callback: Optional[Callable[[str, float], None]] = None
+        # 队列元素为 (回调, 闹钟)
+        self._queue: Deque[tuple] = deque()
+        self._queued_ids: Dict[str, int] = {}  # 闹钟ID -> 排队中的事件数
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._active = 0  # 正在执行的回调数
+        self._closed = False
+        self.stats = {"submitted": 0, "completed": 0, "dropped": 0,
+                      "coalesced": 0, "slow": 0, "errors": 0}
+
+    def submit(self, callback: Callable, alarm) -> bool:
+        """把一次闹钟触发放入队列，返回是否入队（被丢弃或合并时返回False）"""
+        with self._cond:
+            if self._closed:
+                return False
+            self.stats["submitted"] += 1
+            if self.policy == "coalesce" and self._queued_ids.get(alarm.id):
+                self.stats["coalesced"] += 1
+                return False
+            if len(self._queue) >= self.max_queue:
+                if self.policy == "block":
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self._queue) >= self.max_queue and not self._closed:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                    if len(self._queue) >= self.max_queue or self._closed:
+                        self.stats["dropped"] += 1
+                        print(f"闹钟回调队列已满，丢弃闹钟 {alarm.id}")
+                        return False
+                else:
+                    self._pop_locked()
+                    self.stats["dropped"] += 1
+            self._queue.append((callback, alarm))
+            self._queued_ids[alarm.id] = self._queued_ids.get(alarm.id, 0) + 1
+            self._start_workers()
+            self._cond.notify_all()
+            return True
+
+    def pending(self) -> int:
+        """排队中和正在执行的回调数"""
+        with self._cond:
+            return len(self._queue) + self._active
+
+    def join(self, timeout: Optional[float] = 5.0) -> bool:
+        """等待队列中的回调全部执行完，超时返回False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue or self._active:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def shutdown(self, timeout: float = 2.0):
+        """停止接收新事件，执行完已排队的回调后结束工作线程"""
+        self.join(timeout)
+        with self._cond:
+            self._closed = True
+            self._queue.clear()
+            self._queued_ids.clear()
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+
+    def _pop_locked(self) -> tuple:
+        """取出队首事件（调用方需持有锁）"""
+        callback, alarm = self._queue.popleft()
+        count = self._queued_ids.get(alarm.id, 0) - 1
+        if count > 0:
+            self._queued_ids[alarm.id] = count
+        else:
+            self._queued_ids.pop(alarm.id, None)
+        return callback, alarm
+
+    def _start_workers(self):
+        """按需启动工作线程（调用方需持有锁）"""
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, daemon=True,
+                                      name=f"alarm-callback-{len(self._threads)}")
+            self._threads.append(thread)
+            thread.start()
+
+    def _worker(self):
+        """工作线程主循环"""
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    break
+                callback, alarm = self._pop_locked()
+                self._active += 1
+                # 队列空出位置，唤醒"block"策略下等待的调度线程
+                self._cond.notify_all()
+
+            started = time.monotonic()
+            try:
+                callback(alarm)
+            except Exception as e:
+                print(f"闹钟回调失败 {alarm.id}: {e}")
+                with self._cond:
+                    self.stats["errors"] += 1
+            elapsed = time.monotonic() - started
+            if elapsed > self.slow_threshold:
+                self._report_slow(alarm.id, elapsed)
+
+            with self._cond:
+                self._active -= 1
+                self.stats["completed"] += 1
+                self._cond.notify_all()
+
+    def _report_slow(self, alarm_id: str, elapsed: float):
+        """报告执行时间超过阈值的回调"""
+        with self._cond:
+            self.stats["slow"] += 1
+        if self.on_slow_callback:
+            try:
+                self.on_slow_callback(alarm_id, elapsed)
+            except Exception as e:
+                print(f"慢回调报告失败: {e}")
+        else:
+            print(f"闹钟回调过慢 {alarm_id}: {elapsed:.2f}秒")
@@ -1,12 +1,17 @@
 # gui.py - Tkinter GUI界面
 
 import os
+import threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from typing import List, Dict, Optional
 from alarm_manager import Alarm, AlarmManager
 from audio_player import AudioPlayer
 from alarm_dialog import AlarmDialog
+from utils import validate_time_format
+
+# 闹钟在界面之外被修改后，延迟该毫秒数刷新闹钟列表（合并短时间内的大量修改）
+EXTERNAL_REFRESH_DELAY_MS = 200
 
 
 class TimerGUI:
@@ -21,6 +26,9 @@ class TimerGUI:
 
         # 设置闹钟触发回调
         self.alarm_manager.on_alarm_trigger = self._on_alarm_trigger
+        # 闹钟在界面之外（例如本地控制接口）被修改时刷新列表
+        self.alarm_manager.on_alarms_changed = self._on_alarms_changed
+        self._refresh_pending = False
 
     def create_gui(self):
         """创建主GUI窗口"""
@@ -201,7 +209,8 @@ class TimerGUI:
 
     def _add_alarm_input(self, time_str: str = "", repeat_daily: bool = True,
                          enabled: bool = True, alarm_id: str = None,
-                         audio_file: str = "", message: str = ""):
+                         audio_file: str = "", message: str = "", recurrence: str = "",
+                         priority: int = 0):
         """添加闹钟输入行"""
         # 如果没有提供参数且已有闹钟，复制上一个闹钟的设置
         if not time_str and not alarm_id and self.alarm_frames:
@@ -219,12 +228,14 @@ class TimerGUI:
         row.pack(fill=tk.X)
 
         # 解析时间字符串
+        # 秒为"--"表示整分钟闹钟；带毫秒时秒显示为"SS.mmm"
         if time_str:
             parts = time_str.split(":")
             hour = parts[0] if len(parts) > 0 else "00"
             minute = parts[1] if len(parts) > 1 else "00"
+            second = parts[2] if len(parts) > 2 else "--"
         else:
-            hour, minute = "00", "00"
+            hour, minute, second = "00", "00", "--"
 
         # 时间选择框架
         time_frame = ttk.Frame(row)
@@ -261,20 +272,48 @@ class TimerGUI:
         minute_combo.pack(side=tk.LEFT)
         minute_combo.bind("<MouseWheel>", block_scroll)
 
+        ttk.Label(time_frame, text=":", font=("Arial", 12)).pack(side=tk.LEFT)
+
+        # 秒下拉框（可选）
+        second_var = tk.StringVar(value=second)
+        second_combo = ttk.Combobox(
+            time_frame,
+            textvariable=second_var,
+            values=["--"] + [f"{i:02d}" for i in range(60)],
+            width=6 if "." in second else 3,
+            state="readonly"
+        )
+        second_combo.pack(side=tk.LEFT)
+        second_combo.bind("<MouseWheel>", block_scroll)
+
         # 创建组合时间变量
-        time_var = tk.StringVar(value=f"{hour}:{minute}")
+        def compose_time() -> str:
+            time_text = f"{hour_var.get()}:{minute_var.get()}"
+            if second_var.get() != "--":
+                time_text += f":{second_var.get()}"
+            return time_text
+
+        time_var = tk.StringVar(value=compose_time())
 
         def update_time_var(*args):
-            time_var.set(f"{hour_var.get()}:{minute_var.get()}")
+            time_var.set(compose_time())
 
         hour_var.trace_add("write", update_time_var)
         minute_var.trace_add("write", update_time_var)
+        second_var.trace_add("write", update_time_var)
 
         # 重复复选框
         repeat_var = tk.BooleanVar(value=repeat_daily)
         repeat_check = ttk.Checkbutton(row, text="重复", variable=repeat_var)
         repeat_check.pack(side=tk.LEFT, padx=(0, 5))
 
+        # 重复规则（通过API设置，界面只显示并在保存时保留）
+        if recurrence:
+            ttk.Label(row, text=f"规则: {recurrence}", foreground="gray").pack(side=tk.LEFT, padx=(0, 5))
+        # 播放优先级（通过API设置，界面只显示并在保存时保留）
+        if priority:
+            ttk.Label(row, text=f"优先级: {priority}", foreground="gray").pack(side=tk.LEFT, padx=(0, 5))
+
         # 启用复选框
         enabled_var = tk.BooleanVar(value=enabled)
         enabled_check = ttk.Checkbutton(row, text="启用", variable=enabled_var)
@@ -334,6 +373,8 @@ class TimerGUI:
             'enabled_var': enabled_var,
             'audio_var': audio_var,
             'message_var': message_var,
+            'recurrence': recurrence or None,
+            'priority': priority,
             'alarm_id': alarm_id
         }
 
@@ -381,68 +422,84 @@ class TimerGUI:
 
     def _load_existing_alarms(self):
         """加载现有闹钟到GUI"""
-        for alarm in self.alarm_manager.alarms.values():
+        for alarm in self.alarm_manager.get_all_alarms():
             self._add_alarm_input(
                 time_str=alarm.time_str,
                 repeat_daily=alarm.repeat_daily,
                 enabled=alarm.enabled,
                 alarm_id=alarm.id,
                 audio_file=alarm.audio_file or "",
-                message=alarm.message or ""
+                message=alarm.message or "",
+                recurrence=alarm.recurrence or "",
+                priority=alarm.priority
             )
 
+    def _on_alarms_changed(self, alarm_ids: List[str]):
+        """闹钟变化回调：只处理其他线程（控制接口）的修改，界面自身的修改已反映在列表中"""
+        if self.root is None or threading.current_thread() is threading.main_thread():
+            return
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            self.root.after(EXTERNAL_REFRESH_DELAY_MS, self._refresh_alarm_list)
+
+    def _refresh_alarm_list(self):
+        """按闹钟管理器中的闹钟重建闹钟列表"""
+        self._refresh_pending = False
+        for alarm_data in self.alarm_frames:
+            alarm_data['frame'].destroy()
+        self.alarm_frames.clear()
+        self._load_existing_alarms()
+        self.root.after(100, self._check_scroll_needed)
+
     def _validate_time_format(self, time_str: str) -> bool:
-        """验证时间格式（HH:MM）"""
-        try:
-            from datetime import datetime
-            datetime.strptime(time_str, "%H:%M")
-            return True
-        except ValueError:
-            return False
+        """验证时间格式（HH:MM，可带秒HH:MM:SS和毫秒HH:MM:SS.mmm）"""
+        return validate_time_format(time_str)
 
     def _save_all_alarms(self):
-        """保存所有闹钟设置"""
+        """保存所有闹钟设置
+
+        已有的闹钟只更新有变化的字段（保留ID和触发状态，已触发的一次性闹钟不会再次触发），
+        新增的输入行作为新闹钟添加。
+        """
         # 占位符文本（不应保存）
         placeholder_text = "请输入提醒内容"
 
-        # 在锁内更新闹钟管理器中的闹钟
-        with self.alarm_manager.lock:
-            # 清除所有现有闹钟
-            self.alarm_manager.alarms.clear()
-
-            # 重新添加所有GUI中的闹钟
-            for alarm_data in self.alarm_frames:
-                time_str = alarm_data['time_var'].get()
-                repeat_daily = alarm_data['repeat_var'].get()
-                enabled = alarm_data['enabled_var'].get()
-                audio_file = alarm_data['audio_var'].get() or None
-                message = alarm_data['message_var'].get() or ""
-
-                # 如果是占位符文本，清空
-                if message == placeholder_text:
-                    message = ""
-
-                # 验证时间格式
-                if not self._validate_time_format(time_str):
-                    continue  # 跳过无效的时间
-
-                # 使用现有ID或生成新ID
-                alarm_id = alarm_data['alarm_id']
-                if not alarm_id:
-                    import uuid
-                    alarm_id = str(uuid.uuid4())
-                    alarm_data['alarm_id'] = alarm_id
-
-                # 创建闹钟对象
-                alarm = Alarm(
-                    alarm_id=alarm_id,
-                    time_str=time_str,
-                    repeat_daily=repeat_daily,
-                    enabled=enabled,
-                    audio_file=audio_file,
-                    message=message
-                )
-                self.alarm_manager.alarms[alarm_id] = alarm
+        updates = []
+        new_rows = []
+        for alarm_data in self.alarm_frames:
+            message = alarm_data['message_var'].get() or ""
+            # 如果是占位符文本，清空
+            if message == placeholder_text:
+                message = ""
+            fields = {
+                'time_str': alarm_data['time_var'].get(),
+                'repeat_daily': bool(alarm_data['repeat_var'].get()),
+                'enabled': bool(alarm_data['enabled_var'].get()),
+                'audio_file': alarm_data['audio_var'].get() or None,
+                'message': message,
+            }
+
+            # 验证时间格式
+            if not self._validate_time_format(fields['time_str']):
+                continue  # 跳过无效的时间
+
+            alarm = self.alarm_manager.get_alarm(alarm_data['alarm_id']) if alarm_data['alarm_id'] else None
+            if alarm is None:
+                fields['recurrence'] = alarm_data['recurrence']
+                fields['priority'] = alarm_data['priority']
+                new_rows.append((alarm_data, fields))
+                continue
+            changed = {field: value for field, value in fields.items()
+                       if getattr(alarm, field) != value}
+            if changed:
+                updates.append(dict(changed, id=alarm.id))
+
+        if updates:
+            self.alarm_manager.update_alarms(updates)
+        if new_rows:
+            alarm_ids = self.alarm_manager.add_alarms([fields for _, fields in new_rows])
+            for (alarm_data, _), alarm_id in zip(new_rows, alarm_ids):
+                alarm_data['alarm_id'] = alarm_id
 
         self.alarm_manager.save_alarms()
 
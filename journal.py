@@ -0,0 +1,177 @@
+# journal.py - 闹钟修改日志：追加写入单条修改记录，后台压缩为快照
+
+import json
+import os
+import threading
+from typing import Callable, List, Optional
+from persistence import write_json_atomic, write_text_atomic
+
+
+class AlarmJournal:
+    """闹钟快照 + 追加日志
+
+    快照文件与普通模式的alarms.json格式相同；每次修改只在日志文件
+    （快照文件名加.journal）末尾追加一行JSON记录：
+      {"op": "put", "alarm": {...}}   新增或修改闹钟
+      {"op": "delete", "id": "..."}   删除闹钟
+      {"op": "clear"}                 清空所有闹钟
+    启动时先读快照再按顺序重放日志。日志记录数超过阈值时，后台线程把
+    当前完整状态原子写入快照，并丢弃已包含在快照中的日志。
+    """
+
+    def __init__(self, snapshot_file: str, lock: threading.RLock,
+                 snapshot_provider: Callable[[], List[dict]],
+                 compact_threshold: int = 1000):
+        self.snapshot_file = snapshot_file
+        self.journal_file = snapshot_file + ".journal"
+        self.compact_threshold = compact_threshold
+        # 与AlarmManager共用的锁：保证快照内容与日志位置一致
+        self.lock = lock
+        self._snapshot_provider = snapshot_provider
+        self._file = None
+        self._records = 0  # 当前日志中的记录数
+        # 串行化压缩：后台压缩线程与save_all()不能同时写快照和截断日志
+        self._compact_lock = threading.Lock()
+        self._compact_event = threading.Event()
+        self._compactor: Optional[threading.Thread] = None
+        self._closed = False
+
+    def load(self) -> List[dict]:
+        """读取快照并重放日志，返回闹钟字典列表"""
+        alarms = {}
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                for alarm_data in json.load(f):
+                    alarms[alarm_data['id']] = alarm_data
+
+        records = 0
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 写入中途崩溃留下的不完整记录，忽略
+                        print(f"忽略损坏的日志记录: {line.strip()[:80]}")
+                        continue
+                    self._apply(alarms, record)
+                    records += 1
+        with self.lock:
+            self._records = records
+        return list(alarms.values())
+
+    @staticmethod
+    def _apply(alarms: dict, record: dict):
+        """把一条日志记录应用到闹钟字典"""
+        op = record.get('op')
+        if op == 'put':
+            alarms[record['alarm']['id']] = record['alarm']
+        elif op == 'delete':
+            alarms.pop(record['id'], None)
+        elif op == 'clear':
+            alarms.clear()
+
+    def put(self, alarm_data: dict):
+        """记录新增或修改的闹钟"""
+        self._append({'op': 'put', 'alarm': alarm_data})
+
+    def delete(self, alarm_id: str):
+        """记录删除的闹钟"""
+        self._append({'op': 'delete', 'id': alarm_id})
+
+    def clear(self):
+        """记录清空所有闹钟"""
+        self._append({'op': 'clear'})
+
+    def put_many(self, alarms_data: List[dict]):
+        """一次写入多条新增或修改记录"""
+        self._append_many([{'op': 'put', 'alarm': data} for data in alarms_data])
+
+    def delete_many(self, alarm_ids: List[str]):
+        """一次写入多条删除记录"""
+        self._append_many([{'op': 'delete', 'id': alarm_id} for alarm_id in alarm_ids])
+
+    def save_all(self):
+        """整体保存：立即压缩为快照"""
+        self.compact()
+
+    def flush(self):
+        """每条记录追加后都已写入文件，无需等待"""
+
+    def _append(self, record: dict):
+        """在日志末尾追加一条记录"""
+        self._append_many([record])
+
+    def _append_many(self, records: List[dict]):
+        """在日志末尾追加多条记录，超过阈值时唤醒后台压缩线程"""
+        if not records:
+            return
+        text = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with self.lock:
+            if self._file is None:
+                self._file = open(self.journal_file, 'a', encoding='utf-8')
+            self._file.write(text)
+            self._file.flush()
+            self._records += len(records)
+            if self._records >= self.compact_threshold:
+                self._start_compactor()
+                self._compact_event.set()
+
+    def _start_compactor(self):
+        """按需启动后台压缩线程（调用方需持有锁）"""
+        if self._compactor is None and not self._closed:
+            self._compactor = threading.Thread(target=self._compact_loop, daemon=True)
+            self._compactor.start()
+
+    def _compact_loop(self):
+        """后台压缩线程主循环"""
+        while True:
+            self._compact_event.wait()
+            self._compact_event.clear()
+            if self._closed:
+                break
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"压缩闹钟日志失败: {e}")
+
+    def compact(self):
+        """把当前完整状态写入快照，并只保留快照之后追加的日志
+
+        整个过程持有压缩锁，同一时间只有一次压缩：否则较旧的快照可能覆盖较新的快照，
+        或按已过期的位置截取已被截断的日志。调用方不能持有self.lock
+        （加锁顺序为先压缩锁、后self.lock）。
+        """
+        with self._compact_lock:
+            # 在锁内取得一致的状态和对应的日志位置
+            with self.lock:
+                alarms_data = self._snapshot_provider()
+                if self._file is not None:
+                    self._file.flush()
+                offset = os.path.getsize(self.journal_file) if os.path.exists(self.journal_file) else 0
+
+            # 写快照耗时最长，在锁外进行，期间的修改继续追加到日志
+            write_json_atomic(self.snapshot_file, alarms_data)
+
+            with self.lock:
+                tail = ""
+                if os.path.exists(self.journal_file):
+                    with open(self.journal_file, 'r', encoding='utf-8') as f:
+                        f.seek(offset)
+                        tail = f.read()
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                write_text_atomic(self.journal_file, tail)
+                self._records = tail.count("\n")
+
+    def close(self):
+        """停止后台压缩线程并关闭日志文件"""
+        with self.lock:
+            self._closed = True
+            self._compact_event.set()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if self._compactor:
+            self._compactor.join(timeout=2)
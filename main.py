@@ -1,42 +1,151 @@
 # main.py - 简单计时器应用入口
 
+import argparse
 import os
 import sys
 import threading
-from alarm_manager import AlarmManager
-from audio_player import AudioPlayer
-from gui import TimerGUI
-from tray_icon import TrayIcon
+from startup import StartupProfiler
 
+# 其余模块在main()中按需导入：窗口和闹钟列表先显示，
+# 系统托盘（PIL、pystray）在窗口首次绘制后初始化，pygame在第一次播放或预热时导入
 
-def main():
+
+def main(argv=None):
     """应用主入口"""
+    parser = argparse.ArgumentParser(description="简单计时器")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="打印模块导入和各启动阶段的耗时")
+    parser.add_argument("--headless", action="store_true",
+                        help="无界面模式：只运行闹钟调度，不导入tkinter、PIL和pystray")
+    parser.add_argument("--no-audio", action="store_true",
+                        help="无界面模式下不播放声音，只记录触发日志")
+    parser.add_argument("--config", default="config/alarms.json",
+                        help="闹钟配置文件（默认 config/alarms.json）")
+    parser.add_argument("--control-socket", nargs="?", const="config/control.sock", default=None,
+                        metavar="PATH",
+                        help="开启本地控制接口（Unix域套接字，默认 config/control.sock）")
+    parser.add_argument("--shards", type=int, default=0, metavar="N",
+                        help="在N个工作进程中分片调度闹钟并执行触发钩子（0表示不分片）")
+    parser.add_argument("--trigger-hook", metavar="MODULE:FUNCTION",
+                        help="闹钟触发时在工作进程中执行的函数，参数为闹钟字典（需配合--shards）")
+    parser.add_argument("--metrics-file", metavar="PATH",
+                        help="定期把运行指标以Prometheus文本格式写入该文件")
+    parser.add_argument("--metrics-interval", type=float, default=15, metavar="SECONDS",
+                        help="运行指标文件的更新间隔秒数（默认15）")
+    parser.add_argument("--ring-seconds", type=float, default=60,
+                        help="无界面模式下每次响铃的秒数，0表示不自动停止（默认60）")
+    args = parser.parse_args(argv)
+    if args.trigger_hook and not args.shards:
+        parser.error("--trigger-hook 需要配合 --shards 使用")
+    if args.metrics_interval <= 0:
+        parser.error("--metrics-interval 必须大于0")
+    profiler = StartupProfiler(args.profile_startup)
+
     print("启动简单计时器...")
 
     # 创建必要的目录
     os.makedirs("assets", exist_ok=True)
     os.makedirs("config", exist_ok=True)
 
-    # 初始化管理器
-    alarm_manager = AlarmManager("config/alarms.json")
-    alarm_manager.load_alarms()
-
-    # 初始化音频播放器
-    audio_player = AudioPlayer()
-
-    # 初始化GUI
-    gui = TimerGUI(alarm_manager, audio_player)
-    root = gui.create_gui()
-
-    # 初始化系统托盘
-    tray_icon = TrayIcon("简单计时器", "assets/icon.ico")
-    tray_icon.on_show = gui.show_window
-    tray_icon.on_quit = lambda: _quit_app(root, alarm_manager, audio_player, tray_icon)
-    tray_icon.create_icon()
+    trigger_hook = None
+    if args.trigger_hook:
+        from sharded_manager import load_trigger_hook
+        try:
+            trigger_hook = load_trigger_hook(args.trigger_hook)
+        except (ImportError, AttributeError, ValueError) as e:
+            parser.error(f"无法加载触发钩子 {args.trigger_hook}: {e}")
+
+    if args.headless:
+        with profiler.phase("导入 daemon"):
+            from daemon import run_headless
+        return run_headless(args.config, audio=not args.no_audio,
+                            ring_seconds=args.ring_seconds, control_socket=args.control_socket,
+                            shards=args.shards, trigger_hook=trigger_hook,
+                            metrics_file=args.metrics_file, metrics_interval=args.metrics_interval,
+                            profiler=profiler)
+
+    with profiler.phase("导入 alarm_manager"):
+        from alarm_manager import AlarmManager
+    with profiler.phase("导入 persistence、dispatcher"):
+        from dispatcher import CallbackDispatcher
+        from persistence import BackgroundWriter
+    with profiler.phase("导入 gui（tkinter）"):
+        from audio_player import AudioPlayer
+        from gui import TimerGUI
+
+    with profiler.phase("初始化后台线程和音频播放器"):
+        # 后台写线程：合并保存请求并原子写入，避免磁盘IO阻塞界面
+        writer = BackgroundWriter()
+
+        # 回调分发器：闹钟回调在工作线程中执行，不阻塞调度线程
+        dispatcher = CallbackDispatcher()
+
+        # 音频播放器：mixer在第一次播放或预热时才初始化
+        audio_player = AudioPlayer()
+
+    with profiler.phase("加载闹钟"):
+        # 初始化管理器；即将触发的闹钟音频提前在后台解码
+        if args.shards:
+            # 多进程分片：闹钟在工作进程中调度，触发钩子不占用界面进程的GIL
+            from sharded_manager import ShardedAlarmManager
+            alarm_manager = ShardedAlarmManager(args.config, writer=writer, dispatcher=dispatcher,
+                                                shards=args.shards, trigger_hook=trigger_hook)
+        else:
+            alarm_manager = AlarmManager(args.config, writer=writer, dispatcher=dispatcher)
+        alarm_manager.on_prewarm = audio_player.prewarm
+        alarm_manager.load_alarms()
+
+    with profiler.phase("创建GUI"):
+        gui = TimerGUI(alarm_manager, audio_player)
+        root = gui.create_gui()
+
+    # 系统托盘在窗口首次绘制之后创建
+    components = {"tray_icon": None, "control_server": None, "metrics_dumper": None}
+
+    # 本地控制接口：脚本通过它修改闹钟，界面随之刷新
+    if args.control_socket:
+        try:
+            from control import ControlServer
+            control_server = ControlServer(alarm_manager, args.control_socket)
+            control_server.start()
+            components["control_server"] = control_server
+            print(f"本地控制接口: {args.control_socket}")
+        except OSError as e:
+            print(f"启动控制接口失败: {e}")
+
+    # 运行指标：定期写入Prometheus文本文件（可交给node_exporter的textfile收集器）
+    if args.metrics_file:
+        from metrics import MetricsDumper
+        metrics_dumper = MetricsDumper(alarm_manager.metrics, args.metrics_file, args.metrics_interval)
+        metrics_dumper.start()
+        components["metrics_dumper"] = metrics_dumper
+        print(f"运行指标文件: {args.metrics_file}")
+
+    def quit_app():
+        _quit_app(root, alarm_manager, audio_player, components["tray_icon"], writer, dispatcher,
+                  components["control_server"], components["metrics_dumper"])
+
+    def start_tray_icon():
+        profiler.mark("窗口首次绘制")
+        try:
+            with profiler.phase("导入 tray_icon（PIL、pystray）"):
+                from tray_icon import TrayIcon
+            with profiler.phase("初始化系统托盘"):
+                tray_icon = TrayIcon("简单计时器", "assets/icon.ico")
+                tray_icon.on_show = gui.show_window
+                tray_icon.on_quit = quit_app
+                tray_icon.create_icon()
+
+                # 启动系统托盘（在单独线程中）
+                tray_thread = threading.Thread(target=tray_icon.run, daemon=True)
+                tray_thread.start()
+            components["tray_icon"] = tray_icon
+        except Exception as e:
+            print(f"初始化系统托盘失败: {e}")
+        profiler.report()
 
-    # 启动系统托盘（在单独线程中）
-    tray_thread = threading.Thread(target=tray_icon.run, daemon=True)
-    tray_thread.start()
+    # Tk在空闲回调中绘制窗口，排在其后的回调运行时窗口已经显示
+    root.after_idle(lambda: root.after(0, start_tray_icon))
 
     # 设置窗口关闭事件（最小化到托盘）
     def on_window_close():
@@ -48,7 +157,8 @@ def main():
         root.withdraw()
 
         # 显示托盘通知
-        tray_icon.notify("简单计时器", "程序已最小化到系统托盘")
+        if components["tray_icon"]:
+            components["tray_icon"].notify("简单计时器", "程序已最小化到系统托盘")
 
     root.protocol("WM_DELETE_WINDOW", on_window_close)
 
@@ -58,32 +168,59 @@ def main():
         root.mainloop()
     except KeyboardInterrupt:
         print("收到中断信号，退出应用...")
-        _quit_app(root, alarm_manager, audio_player, tray_icon)
+        quit_app()
     except Exception as e:
         print(f"应用程序错误: {e}")
-        _quit_app(root, alarm_manager, audio_player, tray_icon)
+        quit_app()
 
 
-def _quit_app(root, alarm_manager, audio_player, tray_icon):
+def _quit_app(root, alarm_manager, audio_player, tray_icon, writer, dispatcher, control_server=None,
+              metrics_dumper=None):
     """退出应用"""
     print("正在退出应用...")
 
+    if control_server:
+        try:
+            control_server.stop()
+        except Exception as e:
+            print(f"停止控制接口失败: {e}")
+
     # 停止所有组件
     try:
         alarm_manager.stop()
     except Exception as e:
         print(f"停止闹钟管理器失败: {e}")
 
+    # 保存倒计时器的剩余时间
+    alarm_manager.save_timers()
+
+    try:
+        dispatcher.shutdown()
+    except Exception as e:
+        print(f"停止回调分发器失败: {e}")
+
+    # 写出尚未保存的闹钟
+    try:
+        if not writer.flush():
+            print("等待保存闹钟配置超时")
+    except Exception as e:
+        print(f"保存闹钟配置失败: {e}")
+
     try:
         audio_player.stop()
         audio_player.cleanup()
     except Exception as e:
         print(f"停止音频播放器失败: {e}")
 
-    try:
-        tray_icon.stop()
-    except Exception as e:
-        print(f"停止系统托盘失败: {e}")
+    if tray_icon:
+        try:
+            tray_icon.stop()
+        except Exception as e:
+            print(f"停止系统托盘失败: {e}")
+
+    # 写入最终的运行指标
+    if metrics_dumper:
+        metrics_dumper.stop()
 
     # 销毁窗口
     if root:
@@ -97,4 +234,4 @@ def _quit_app(root, alarm_manager, audio_player, tray_icon):
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
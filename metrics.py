@@ -0,0 +1,261 @@
+# metrics.py - 运行指标：计数器和固定分桶直方图，可导出为Prometheus文本格式
+
+import bisect
+import math
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+from persistence import write_text_atomic
+
+# 默认直方图分桶上界（秒）：覆盖从亚毫秒的调度开销到补发窗口内的迟到
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 300.0)
+
+# 定期导出的默认间隔（秒）
+DEFAULT_DUMP_INTERVAL = 15.0
+
+
+class Counter:
+    """只增不减的计数器"""
+
+    __slots__ = ('_value', '_lock')
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def snapshot(self) -> float:
+        return self._value
+
+
+class Histogram:
+    """固定分桶直方图：observe只做一次二分查找和两次加法"""
+
+    __slots__ = ('buckets', '_counts', '_sum', '_lock')
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # 最后一格是+Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    def snapshot(self) -> dict:
+        """累积分桶计数（与Prometheus一致，每个上界包含更小的桶）、总数和总和"""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = []
+        running = 0
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            running += count
+            cumulative.append((bound, running))
+        return {"buckets": cumulative, "count": running, "sum": total}
+
+    def quantile(self, q: float) -> Optional[float]:
+        """按分桶估计分位数（返回所在桶的上界），没有样本时返回None"""
+        snapshot = self.snapshot()
+        if not snapshot["count"]:
+            return None
+        rank = q * snapshot["count"]
+        for bound, cumulative in snapshot["buckets"]:
+            if cumulative >= rank:
+                return bound
+        return math.inf
+
+
+class Metric:
+    """一个指标：名称、说明、类型，可按标签值分成多个序列"""
+
+    def __init__(self, name: str, help_text: str, kind: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.kind = kind  # "counter" 或 "histogram"
+        self.labelnames = tuple(labelnames)
+        self._buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values: str):
+        """取（或创建）指定标签值的序列"""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"指标{self.name}需要标签: {', '.join(self.labelnames) or '无'}")
+        series = self._series.get(values)
+        if series is None:
+            with self._lock:
+                series = self._series.get(values)
+                if series is None:
+                    series = Counter() if self.kind == "counter" else Histogram(self._buckets)
+                    self._series[values] = series
+        return series
+
+    def inc(self, amount: float = 1.0):
+        """无标签计数器加一"""
+        self._default.inc(amount)
+
+    def observe(self, value: float):
+        """无标签直方图记录一个样本"""
+        self._default.observe(value)
+
+    def series(self) -> List[tuple]:
+        """[(标签值, 序列)]"""
+        with self._lock:
+            return list(self._series.items())
+
+
+class MetricsRegistry:
+    """指标注册表
+
+    同名指标只注册一次，重复注册返回已有的指标，因此多个AlarmManager、
+    AudioPlayer共用一个注册表时数据会合并。snapshot()以字典形式读取，
+    to_prometheus()生成Prometheus文本格式（可交给node_exporter的textfile收集器）。
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Metric:
+        return self._register(name, help_text, "counter", labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Metric:
+        return self._register(name, help_text, "histogram", labelnames, buckets)
+
+    def _register(self, name: str, help_text: str, kind: str, labelnames: Sequence[str],
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = Metric(name, help_text, kind, tuple(labelnames), buckets)
+                self._metrics[name] = metric
+            elif metric.kind != kind or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"指标{name}已注册为不同的类型或标签")
+            return metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def snapshot(self) -> dict:
+        """所有指标的当前值：{名称: {"type", "help", "series": [{"labels", "value"}]}}
+
+        直方图的value为{"buckets": {上界: 累积计数}, "count", "sum"}，上界用
+        Prometheus的写法（如 "0.005"、"+Inf"），结果可以直接序列化为JSON。
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        result = {}
+        for metric in metrics:
+            series_list = []
+            for values, series in metric.series():
+                value = series.snapshot()
+                if metric.kind == "histogram":
+                    value["buckets"] = {_format_value(bound): cumulative
+                                        for bound, cumulative in value["buckets"]}
+                series_list.append({"labels": dict(zip(metric.labelnames, values)), "value": value})
+            result[metric.name] = {"type": metric.kind, "help": metric.help, "series": series_list}
+        return result
+
+    def to_prometheus(self) -> str:
+        """Prometheus文本格式（0.0.4）"""
+        lines = []
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for values, series in sorted(metric.series()):
+                labels = list(zip(metric.labelnames, values))
+                if metric.kind == "counter":
+                    lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(series.value)}")
+                    continue
+                snapshot = series.snapshot()
+                for bound, cumulative in snapshot["buckets"]:
+                    bucket_labels = labels + [("le", _format_value(bound))]
+                    lines.append(f"{metric.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(snapshot['sum'])}")
+                lines.append(f"{metric.name}_count{_format_labels(labels)} {snapshot['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """原子写入Prometheus文本格式文件"""
+        write_text_atomic(path, self.to_prometheus())
+
+
+class MetricsDumper:
+    """后台线程：每隔interval秒把注册表写入Prometheus文本文件，stop()时再写一次"""
+
+    def __init__(self, registry: MetricsRegistry, path: str, interval: float = DEFAULT_DUMP_INTERVAL):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=2)
+        self._thread = None
+        self.dump()
+
+    def dump(self):
+        try:
+            self.registry.write_prometheus(self.path)
+        except OSError as e:
+            print(f"写入指标文件失败: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.dump()
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: List[tuple]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(str(value))}"' for name, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+# 默认注册表：AlarmManager、AudioPlayer未指定metrics时使用
+REGISTRY = MetricsRegistry()
+
@@ -0,0 +1,144 @@
+# persistence.py - 文件持久化：原子写入与合并写入的后台写线程
+
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+def write_json_atomic(path: str, data, indent: Optional[int] = 2):
+    """原子写入JSON：先写临时文件并fsync，再重命名覆盖目标文件"""
+    _write_atomic(path, lambda f: json.dump(data, f, indent=indent))
+
+
+def write_text_atomic(path: str, text: str):
+    """原子写入文本文件：先写临时文件并fsync，再重命名覆盖目标文件"""
+    _write_atomic(path, lambda f: f.write(text))
+
+
+def _write_atomic(path: str, write: Callable):
+    """在目标文件所在目录创建唯一的临时文件，写入、fsync后重命名覆盖目标文件
+
+    临时文件名每次不同，同时写同一个文件的多个线程不会互相覆盖或删除对方的临时文件
+    （最后完成重命名的写入生效）；失败时删除临时文件。
+    """
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=f".{name}.", suffix=".tmp")
+    try:
+        # mkstemp创建的文件权限为0600：沿用目标文件的权限，新文件按umask
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(tmp_path, mode)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            fd = None
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if fd is not None:
+            os.close(fd)
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _read_umask() -> int:
+    """读取进程的umask（Linux从/proc读取，不临时修改umask；其他平台按022）"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0o022
+
+
+_UMASK = _read_umask()
+
+
+class BackgroundWriter:
+    """后台写线程：把短时间内对同一文件的多次保存合并为一次原子写入
+
+    submit只登记"需要保存"，真正的数据在写入时才通过producer获取，
+    因此连续多次修改只会写出最后的状态。最后一次提交后空闲delay秒写入，
+    持续修改时最迟max_delay秒写入一次。
+    """
+
+    def __init__(self, delay: float = 0.2, max_delay: float = 2.0):
+        self.delay = delay
+        self.max_delay = max_delay
+        self._pending: Dict[str, tuple] = {}  # 文件路径 -> (producer, indent)
+        self._first_submit: Optional[float] = None
+        self._last_submit: Optional[float] = None
+        self._writing = False
+        self._flush_requested = False
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, path: str, producer: Callable[[], object], indent: Optional[int] = 2):
+        """登记一次保存，producer在写线程中调用并返回要写入的数据"""
+        with self._cond:
+            now = time.monotonic()
+            if not self._pending:
+                self._first_submit = now
+            self._last_submit = now
+            self._pending[path] = (producer, indent)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """立即写出所有待保存的文件并等待完成，超时返回False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._pending or self._writing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def _due_time(self) -> float:
+        """下一次写入的时间点（调用方需持有锁）"""
+        if self._flush_requested:
+            return 0.0
+        return min(self._last_submit + self.delay, self._first_submit + self.max_delay)
+
+    def _run(self):
+        """写线程主循环"""
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._flush_requested = False
+                    self._cond.wait()
+                remaining = self._due_time() - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                batch = self._pending
+                self._pending = {}
+                self._writing = True
+
+            for path, (producer, indent) in batch.items():
+                try:
+                    write_json_atomic(path, producer(), indent)
+                except Exception as e:
+                    print(f"后台保存文件失败 {path}: {e}")
+
+            with self._cond:
+                self._writing = False
+                if not self._pending:
+                    self._flush_requested = False
+                self._cond.notify_all()
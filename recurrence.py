@@ -0,0 +1,274 @@
+# recurrence.py - 闹钟重复规则：星期、固定间隔、每月第N个星期几、cron表达式
+
+import bisect
+import calendar
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# 星期名称，下标与datetime.weekday()一致（周一为0）
+WEEKDAY_NAMES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+MONTH_NAMES = ('jan', 'feb', 'mar', 'apr', 'may', 'jun',
+               'jul', 'aug', 'sep', 'oct', 'nov', 'dec')
+INTERVAL_UNITS = {'s': 1, 'm': 60, 'h': 3600}
+
+# cron的简写
+CRON_ALIASES = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *',
+}
+
+
+def _midnight(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class WeekdayRule:
+    """每周指定的几天，在闹钟时间触发，例如 "weekly:mon-fri" """
+
+    __slots__ = ('spec', 'mask')
+
+    def __init__(self, spec: str, mask: int):
+        self.spec = spec
+        self.mask = mask  # 第i位表示weekday()==i的那天
+
+    def next_after(self, after: datetime, ms_of_day: int) -> Optional[datetime]:
+        """after之后（不含）的第一次触发时间"""
+        offset = timedelta(milliseconds=ms_of_day)
+        day = _midnight(after)
+        weekday = day.weekday()
+        # 最多检查8天：今天时间已过时，下周的同一天也在范围内
+        for days in range(8):
+            if self.mask >> ((weekday + days) % 7) & 1:
+                candidate = day + timedelta(days=days) + offset
+                if candidate > after:
+                    return candidate
+        return None
+
+
+class IntervalRule:
+    """从闹钟时间开始每隔固定时间触发一次，到当天结束，例如 "every:15m" """
+
+    __slots__ = ('spec', 'step')
+
+    def __init__(self, spec: str, seconds: int):
+        self.spec = spec
+        self.step = timedelta(seconds=seconds)
+
+    def next_after(self, after: datetime, ms_of_day: int) -> Optional[datetime]:
+        """after之后（不含）的第一次触发时间"""
+        day = _midnight(after)
+        start = day + timedelta(milliseconds=ms_of_day)
+        if after < start:
+            return start
+        candidate = start + ((after - start) // self.step + 1) * self.step
+        if candidate < day + timedelta(days=1):
+            return candidate
+        return start + timedelta(days=1)
+
+
+class MonthlyWeekdayRule:
+    """每月第N个星期几（N为负数时从月末倒数），例如 "monthly:2mon"、"monthly:-1fri" """
+
+    __slots__ = ('spec', 'nth', 'weekday')
+
+    def __init__(self, spec: str, nth: int, weekday: int):
+        self.spec = spec
+        self.nth = nth
+        self.weekday = weekday
+
+    def day_in_month(self, year: int, month: int) -> Optional[int]:
+        """该月符合规则的日期，不存在时（例如没有第5个周一）返回None"""
+        first_weekday, days = calendar.monthrange(year, month)
+        if self.nth > 0:
+            day = 1 + (self.weekday - first_weekday) % 7 + (self.nth - 1) * 7
+        else:
+            last_weekday = (first_weekday + days - 1) % 7
+            day = days - (last_weekday - self.weekday) % 7 + (self.nth + 1) * 7
+        return day if 1 <= day <= days else None
+
+    def next_after(self, after: datetime, ms_of_day: int) -> Optional[datetime]:
+        """after之后（不含）的第一次触发时间"""
+        offset = timedelta(milliseconds=ms_of_day)
+        year, month = after.year, after.month
+        # 第5个星期几每年至少出现4次，连续14个月内一定能找到
+        for _ in range(14):
+            day = self.day_in_month(year, month)
+            if day is not None:
+                candidate = datetime(year, month, day) + offset
+                if candidate > after:
+                    return candidate
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return None
+
+
+class CronRule:
+    """5字段cron表达式（分 时 日 月 星期），例如 "cron:*/15 9-17 * * mon-fri"
+
+    每个字段编译为有序的取值列表，下一次触发时间按 月 -> 日 -> 时 -> 分
+    逐级二分查找，不逐分钟迭代。日和星期都不以*开头时满足其一即可（与cron一致）。
+    cron规则在整分钟触发，不使用闹钟时间。
+    """
+
+    __slots__ = ('spec', 'minutes', 'hours', 'days', 'months', 'weekdays',
+                 'any_day', 'any_weekday')
+
+    # 向后查找的最大年数（例如2月29日最多间隔8年）
+    MAX_YEARS = 8
+
+    def __init__(self, spec: str, expression: str):
+        self.spec = spec
+        expression = CRON_ALIASES.get(expression.strip().lower(), expression)
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron表达式需要5个字段: {expression!r}")
+        self.minutes = _parse_cron_field(fields[0], 0, 59)
+        self.hours = _parse_cron_field(fields[1], 0, 23)
+        self.days = frozenset(_parse_cron_field(fields[2], 1, 31))
+        self.months = _parse_cron_field(fields[3], 1, 12, MONTH_NAMES, 1)
+        # cron的星期以周日为0（7也表示周日），转换为weekday()编号
+        self.weekdays = frozenset((value - 1) % 7 for value in
+                                  _parse_cron_field(fields[4], 0, 7, WEEKDAY_NAMES[-1:] + WEEKDAY_NAMES[:-1], 0))
+        self.any_day = fields[2].startswith('*')
+        self.any_weekday = fields[4].startswith('*')
+
+    def _day_matches(self, day: int, weekday: int) -> bool:
+        # 任一字段以*开头（含*/N）时两者都要满足；都受限时满足其一即可
+        if self.any_day or self.any_weekday:
+            return day in self.days and weekday in self.weekdays
+        return day in self.days or weekday in self.weekdays
+
+    def next_after(self, after: datetime, ms_of_day: int = 0) -> Optional[datetime]:
+        """after之后（不含）的第一次触发时间"""
+        start = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        year, month, day, hour, minute = start.year, start.month, start.day, start.hour, start.minute
+        last_year = year + self.MAX_YEARS
+        while year <= last_year:
+            if month > 12 or month not in self.months:
+                index = bisect.bisect_left(self.months, month)
+                if index == len(self.months):
+                    year, month = year + 1, self.months[0]
+                else:
+                    month = self.months[index]
+                day, hour, minute = 1, 0, 0
+                continue
+
+            first_weekday, days_in_month = calendar.monthrange(year, month)
+            found = None
+            for candidate_day in range(day, days_in_month + 1):
+                if self._day_matches(candidate_day, (first_weekday + candidate_day - 1) % 7):
+                    found = candidate_day
+                    break
+            if found is None:
+                month, day, hour, minute = month + 1, 1, 0, 0
+                continue
+            if found != day:
+                day, hour, minute = found, 0, 0
+
+            index = bisect.bisect_left(self.hours, hour)
+            if index == len(self.hours):
+                day, hour, minute = day + 1, 0, 0
+                continue
+            if self.hours[index] != hour:
+                hour, minute = self.hours[index], 0
+
+            index = bisect.bisect_left(self.minutes, minute)
+            if index == len(self.minutes):
+                hour, minute = hour + 1, 0
+                continue
+            return datetime(year, month, day, hour, self.minutes[index])
+        return None
+
+
+def _parse_name(text: str, names: Optional[tuple], base: int) -> int:
+    """解析数字或名称（jan、mon等）"""
+    text = text.strip().lower()
+    if names and text in names:
+        return names.index(text) + base
+    if not text.isdigit():
+        raise ValueError(f"无效的取值: {text!r}")
+    return int(text)
+
+
+def _parse_cron_field(text: str, low: int, high: int,
+                      names: Optional[tuple] = None, base: int = 0) -> List[int]:
+    """解析cron字段（* a a-b 及 /步长，逗号分隔）为有序取值列表"""
+    values = set()
+    for part in text.split(','):
+        range_text, slash, step_text = part.partition('/')
+        step = int(step_text) if slash and step_text.isdigit() else (0 if slash else 1)
+        if step <= 0:
+            raise ValueError(f"无效的步长: {part!r}")
+        if range_text == '*':
+            start, end = low, high
+        else:
+            first, dash, last = range_text.partition('-')
+            start = _parse_name(first, names, base)
+            end = _parse_name(last, names, base) if dash else (high if slash else start)
+        if not low <= start <= end <= high:
+            raise ValueError(f"取值超出范围{low}-{high}: {part!r}")
+        values.update(range(start, end + 1, step))
+    return sorted(values)
+
+
+def _parse_weekdays(text: str) -> int:
+    """解析 "mon,wed,fri" 或 "mon-fri" 为星期位掩码"""
+    mask = 0
+    for part in text.split(','):
+        first, dash, last = part.strip().lower().partition('-')
+        if first not in WEEKDAY_NAMES or (dash and last not in WEEKDAY_NAMES):
+            raise ValueError(f"无效的星期: {part!r}")
+        start = WEEKDAY_NAMES.index(first)
+        end = WEEKDAY_NAMES.index(last) if dash else start
+        for offset in range((end - start) % 7 + 1):
+            mask |= 1 << ((start + offset) % 7)
+    return mask
+
+
+def _parse_nth_weekday(text: str) -> Tuple[int, int]:
+    """解析 "2mon"、"-1fri" 为 (第几个, 星期)"""
+    text = text.strip().lower()
+    nth_text, weekday_text = text[:-3], text[-3:]
+    if weekday_text not in WEEKDAY_NAMES or nth_text.lstrip('-') not in ('1', '2', '3', '4', '5'):
+        raise ValueError(f"无效的每月规则: {text!r}")
+    return int(nth_text), WEEKDAY_NAMES.index(weekday_text)
+
+
+@lru_cache(maxsize=4096)
+def compile_rule(spec: str):
+    """把重复规则字符串编译为规则对象（相同字符串共享同一个对象）
+
+    支持的格式：
+      weekly:mon,wed,fri   每周指定几天（也可写作 mon-fri）
+      every:15m            从闹钟时间起每隔N秒/分钟/小时（s/m/h）到当天结束
+      monthly:2mon         每月第N个星期几，-1表示最后一个
+      cron:0 9 * * 1-5     5字段cron表达式（或@daily等简写）
+    格式无效时抛出ValueError。
+    """
+    if not isinstance(spec, str):
+        raise ValueError(f"重复规则必须是字符串: {spec!r}")
+    kind, sep, body = spec.partition(':')
+    kind = kind.strip().lower()
+    if not sep or not body.strip():
+        raise ValueError(f"无效的重复规则: {spec!r}")
+    if kind == 'weekly':
+        return WeekdayRule(spec, _parse_weekdays(body))
+    if kind == 'every':
+        body = body.strip().lower()
+        unit = INTERVAL_UNITS.get(body[-1:])
+        if unit is None or not body[:-1].isdigit():
+            raise ValueError(f"无效的间隔: {body!r}")
+        seconds = int(body[:-1]) * unit
+        if not 0 < seconds <= 86400:
+            raise ValueError(f"间隔必须在1秒到1天之间: {body!r}")
+        return IntervalRule(spec, seconds)
+    if kind == 'monthly':
+        return MonthlyWeekdayRule(spec, *_parse_nth_weekday(body))
+    if kind == 'cron':
+        return CronRule(spec, body)
+    raise ValueError(f"未知的重复规则类型: {kind!r}")
@@ -0,0 +1,259 @@
+# scheduler.py - 闹钟调度引擎
+
+import heapq
+import itertools
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class HeapScheduler:
+    """最小堆调度引擎：插入/到期 O(log n)，取消为惰性删除"""
+
+    def __init__(self):
+        # 堆元素为 (触发时间, 序号, 闹钟ID)
+        self._heap: List[tuple] = []
+        # 每个闹钟当前有效的堆元素，堆中其他同ID元素视为已失效
+        self._entries: Dict[str, tuple] = {}
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, alarm_id: str) -> bool:
+        return alarm_id in self._entries
+
+    def get(self, alarm_id: str) -> Optional[datetime]:
+        """获取闹钟已排程的触发时间"""
+        entry = self._entries.get(alarm_id)
+        return entry[0] if entry else None
+
+    def schedule(self, alarm_id: str, fire_time: datetime):
+        """排程（或重新排程）闹钟"""
+        entry = (fire_time, next(self._sequence), alarm_id)
+        self._entries[alarm_id] = entry
+        heapq.heappush(self._heap, entry)
+        self._compact()
+
+    def cancel(self, alarm_id: str):
+        """取消闹钟排程"""
+        self._entries.pop(alarm_id, None)
+
+    def reset(self, now: datetime):
+        """清空所有排程"""
+        self._heap = []
+        self._entries = {}
+
+    def pop_due(self, now: datetime) -> List[Tuple[str, datetime]]:
+        """弹出所有到期的闹钟，返回 [(闹钟ID, 排程的触发时间), ...]"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            alarm_id = entry[2]
+            if self._entries.get(alarm_id) is not entry:
+                continue  # 已失效的元素
+            del self._entries[alarm_id]
+            due.append((alarm_id, entry[0]))
+        return due
+
+    def next_fire_time(self) -> Optional[datetime]:
+        """最早的触发时间，没有排程时返回None"""
+        while self._heap and self._entries.get(self._heap[0][2]) is not self._heap[0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def _compact(self):
+        """失效元素过多时重建堆，避免频繁修改导致堆无限增长"""
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = list(self._entries.values())
+            heapq.heapify(self._heap)
+
+
+class TimingWheelScheduler:
+    """分层时间轮调度引擎：插入/取消 O(1)，到期为均摊 O(1)
+
+    时间以整秒为刻度，依次是秒轮（60格×1秒）、分钟轮（60格×1分钟）、
+    小时轮（24格×1小时）和天轮（366格×1天）。高层时间轮的格子到期时，
+    其中的闹钟被重新放入更低层的时间轮（级联）。
+    秒轮格子到期时，触发时间带毫秒、尚未到达的闹钟留在就绪集合中，
+    按精确的触发时间弹出。
+    """
+
+    # 每层时间轮的 (每格秒数, 格数)
+    LEVELS = ((1, 60), (60, 60), (3600, 24), (86400, 366))
+
+    def __init__(self):
+        self._wheels: List[List[Set[str]]] = [
+            [set() for _ in range(size)] for _, size in self.LEVELS
+        ]
+        # 闹钟ID -> (触发时间, 到期秒, 层, 格)，用于 O(1) 取消
+        self._entries: Dict[str, tuple] = {}
+        # 插入时已经到期、等待下一次pop_due返回的闹钟
+        self._ready: Set[str] = set()
+        self._current: Optional[int] = None  # 当前已推进到的秒
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, alarm_id: str) -> bool:
+        return alarm_id in self._entries
+
+    def get(self, alarm_id: str) -> Optional[datetime]:
+        """获取闹钟已排程的触发时间"""
+        entry = self._entries.get(alarm_id)
+        return entry[0] if entry else None
+
+    def schedule(self, alarm_id: str, fire_time: datetime):
+        """排程（或重新排程）闹钟"""
+        self.cancel(alarm_id)
+        if self._current is None:
+            # 未调用reset时从第一个触发时间开始（不读取系统时钟，虚拟时钟下同样正确）；
+            # 之后pop_due的时间更早时会重建时间轮
+            self._current = int(fire_time.timestamp())
+        self._insert(alarm_id, fire_time, int(fire_time.timestamp()))
+
+    def cancel(self, alarm_id: str):
+        """取消闹钟排程"""
+        entry = self._entries.pop(alarm_id, None)
+        if entry is None:
+            return
+        _, _, level, slot = entry
+        if level < 0:
+            self._ready.discard(alarm_id)
+        else:
+            self._wheels[level][slot].discard(alarm_id)
+
+    def reset(self, now: datetime):
+        """清空所有排程，并把时间轮的当前时间设为now"""
+        for wheel in self._wheels:
+            for slot in wheel:
+                slot.clear()
+        self._entries = {}
+        self._ready = set()
+        self._current = int(now.timestamp())
+
+    def pop_due(self, now: datetime) -> List[Tuple[str, datetime]]:
+        """推进时间轮到now，弹出所有到期的闹钟，返回 [(闹钟ID, 排程的触发时间), ...]"""
+        target = int(now.timestamp())
+        if self._current is None:
+            self._current = target
+        elif target < self._current:
+            # 墙上时间后退（小于时钟跳变阈值的回调不会触发重新排程）：
+            # 按新的当前时间重建时间轮，使各格子与时间一致
+            self._rebuild(target)
+        due = list(self._ready)
+        self._ready = set()
+        while self._entries:
+            # 直接跳到下一个有闹钟的秒格或级联时间点，不逐秒走过空格子
+            tick = self._next_tick(target)
+            if tick is None:
+                break
+            self._current = tick
+            self._cascade()
+            if self._ready:
+                # 级联时恰好到期的闹钟
+                due.extend(self._ready)
+                self._ready = set()
+            slot = self._wheels[0][self._current % self.LEVELS[0][1]]
+            if slot:
+                due.extend(slot)
+                slot.clear()
+        # 没有排程时直接跳到目标时间
+        self._current = target
+        result = []
+        for alarm_id in due:
+            fire_time, deadline, _, _ = self._entries[alarm_id]
+            if fire_time > now:
+                # 所在的秒已到，但毫秒部分还没到
+                self._ready.add(alarm_id)
+                self._entries[alarm_id] = (fire_time, deadline, -1, -1)
+            else:
+                del self._entries[alarm_id]
+                result.append((alarm_id, fire_time))
+        return result
+
+    def next_fire_time(self) -> Optional[datetime]:
+        """下一次需要唤醒的时间（可能是级联时间点，不晚于最早的触发时间）"""
+        if not self._entries:
+            return None
+        if self._ready:
+            return min(self._entries[alarm_id][0] for alarm_id in self._ready)
+        earliest = self._next_tick()
+        return datetime.fromtimestamp(earliest) if earliest is not None else None
+
+    def _next_tick(self, limit: Optional[int] = None) -> Optional[int]:
+        """当前秒之后第一个非空秒格或非空高层格子的级联时间点（秒）
+
+        没有时（或晚于limit时）返回None。
+        """
+        earliest = None if limit is None else limit + 1
+        for level, (tick, size) in enumerate(self.LEVELS):
+            wheel = self._wheels[level]
+            base = self._current // tick
+            for offset in range(1, size + 1):
+                wake = (base + offset) * tick
+                if earliest is not None and wake >= earliest:
+                    break
+                if wheel[(base + offset) % size]:
+                    earliest = wake
+                    break
+        if limit is not None and earliest > limit:
+            return None
+        return earliest
+
+    def _rebuild(self, current: int):
+        """把当前时间设为current，并按新的当前时间重新放入所有闹钟"""
+        entries = self._entries
+        for wheel in self._wheels:
+            for slot in wheel:
+                slot.clear()
+        self._entries = {}
+        self._ready = set()
+        self._current = current
+        for alarm_id, (fire_time, deadline, _, _) in entries.items():
+            self._insert(alarm_id, fire_time, deadline)
+
+    def _insert(self, alarm_id: str, fire_time: datetime, deadline: int):
+        """按剩余时间放入合适层级的时间轮"""
+        if deadline <= self._current:
+            self._ready.add(alarm_id)
+            self._entries[alarm_id] = (fire_time, deadline, -1, -1)
+            return
+        last = len(self.LEVELS) - 1
+        for level, (tick, size) in enumerate(self.LEVELS):
+            distance = deadline // tick - self._current // tick
+            if distance < size or level == last:
+                # 超出最高层范围时放在最远的格子，到期后再级联
+                slot = (self._current // tick + min(distance, size - 1)) % size
+                self._wheels[level][slot].add(alarm_id)
+                self._entries[alarm_id] = (fire_time, deadline, level, slot)
+                return
+
+    def _cascade(self):
+        """当前秒跨越高层格子边界时，把该格闹钟下放到低层时间轮"""
+        for level in range(1, len(self.LEVELS)):
+            tick, size = self.LEVELS[level]
+            if self._current % tick:
+                break
+            slot = self._wheels[level][(self._current // tick) % size]
+            if not slot:
+                continue
+            moved = list(slot)
+            slot.clear()
+            for alarm_id in moved:
+                fire_time, deadline, _, _ = self._entries[alarm_id]
+                self._insert(alarm_id, fire_time, deadline)
+
+
+# 可在AlarmManager构造时选择的调度引擎
+SCHEDULER_ENGINES = {
+    "heap": HeapScheduler,
+    "wheel": TimingWheelScheduler,
+}
+
+
+def create_scheduler(engine: str):
+    """按名称创建调度引擎"""
+    try:
+        return SCHEDULER_ENGINES[engine]()
+    except KeyError:
+        raise ValueError(f"未知的调度引擎: {engine}，可选: {', '.join(SCHEDULER_ENGINES)}")
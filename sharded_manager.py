@@ -0,0 +1,269 @@
+# sharded_manager.py - 多进程分片版闹钟管理器：按闹钟ID哈希分到多个工作进程调度和执行触发钩子
+
+import importlib
+import multiprocessing
+import os
+import queue
+import threading
+import zlib
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from alarm_manager import Alarm, AlarmEvent, AlarmManager
+from countdown import CountdownTimer
+
+# 工作进程等待命令的最长时间（秒），超时后检查父进程是否还在
+WORKER_POLL_SECONDS = 1.0
+
+
+def shard_of(alarm_id: str, shards: int) -> int:
+    """闹钟所属的分片（跨进程稳定的哈希，不受PYTHONHASHSEED影响）"""
+    return zlib.crc32(alarm_id.encode("utf-8")) % shards
+
+
+class ShardEvent(AlarmEvent):
+    """分片工作进程返回的触发事件：附带触发钩子的返回值或错误"""
+
+    __slots__ = ('shard', 'result', 'error')
+
+    def __init__(self, alarm: Alarm, fire_time: datetime, fired_at: datetime,
+                 shard: int, result=None, error: Optional[str] = None):
+        super().__init__(alarm, fire_time, fired_at)
+        self.shard = shard  # 执行触发钩子的分片
+        self.result = result  # trigger_hook的返回值
+        self.error = error  # trigger_hook抛出的异常，None表示成功
+
+
+def load_trigger_hook(spec: str) -> Callable[[dict], object]:
+    """按 "模块:函数" 导入触发钩子（main.py --trigger-hook）"""
+    module_name, sep, function_name = spec.partition(":")
+    if not sep or not module_name or not function_name:
+        raise ValueError(f"触发钩子格式应为 模块:函数: {spec!r}")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _alarm_state(alarm: Alarm) -> tuple:
+    """发给工作进程的闹钟数据：字典加触发状态（避免重复触发已触发过的闹钟）"""
+    return alarm.to_dict(), alarm.last_triggered, alarm.has_triggered
+
+
+def _shard_worker(shard: int, commands, events, trigger_hook, engine: str,
+                  grace_seconds: float):
+    """工作进程主函数：在闹钟副本上运行调度线程，触发时执行钩子并把结果发回父进程
+
+    命令：("put", [闹钟数据]) / ("delete", [闹钟ID]) / ("reset",) / ("pause",) /
+    ("resume",) / ("stop",)。副本使用内存存储，持久化由父进程负责。
+    """
+    manager = AlarmManager("", engine=engine, storage="memory", grace_seconds=grace_seconds)
+
+    def on_event(event: AlarmEvent):
+        result = error = None
+        if trigger_hook:
+            try:
+                result = trigger_hook(event.alarm.to_dict())
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        events.put((event.alarm.id, event.fire_time, event.fired_at, shard, result, error))
+
+    manager.on_alarm_event = on_event
+    manager.start()
+    parent = os.getppid()
+    try:
+        while True:
+            try:
+                command = commands.get(timeout=WORKER_POLL_SECONDS)
+            except queue.Empty:
+                # 父进程异常退出时结束
+                if os.getppid() != parent:
+                    break
+                continue
+            op = command[0]
+            if op == "put":
+                alarms = []
+                for data, last_triggered, has_triggered in command[1]:
+                    alarm = Alarm.from_dict(data)
+                    alarm.last_triggered = last_triggered
+                    alarm.has_triggered = has_triggered
+                    alarms.append(alarm)
+                manager.put_alarms(alarms)
+            elif op == "delete":
+                manager.remove_alarms(command[1])
+            elif op == "reset":
+                manager.clear_all()
+            elif op == "pause":
+                manager.pause()
+            elif op == "resume":
+                manager.resume()
+            elif op == "stop":
+                break
+    finally:
+        manager.stop()
+
+
+class ShardedAlarmManager(AlarmManager):
+    """多进程分片版闹钟管理器
+
+    父进程保留全部闹钟、分钟索引、存储后端和倒计时器，GUI和控制接口照常使用；
+    start()后按闹钟ID的哈希把闹钟分到shards个工作进程，每个进程在自己的分片上
+    运行调度线程，触发时在该进程中执行trigger_hook(闹钟字典)，
+    再通过multiprocessing队列把ShardEvent（含钩子的返回值）发回父进程，
+    由父进程调用on_alarm_trigger / on_alarm_event。这样耗CPU的触发钩子
+    可以使用多个核心，不受父进程GIL限制。
+
+    trigger_hook必须是可pickle的模块级函数，返回值也必须可pickle。
+    父进程的调度引擎继续为闹钟排程（用于查询下一次触发时间、音频预热和同步触发状态），
+    但不触发闹钟；倒计时器仍在父进程中触发。工作进程使用spawn方式启动。
+    """
+
+    def __init__(self, *args, shards: int = None, trigger_hook: Callable[[dict], object] = None,
+                 **kwargs):
+        self.shards = shards or os.cpu_count() or 1
+        self.trigger_hook = trigger_hook
+        self._engine = kwargs.get("engine", "heap")
+        self._processes: List[multiprocessing.Process] = []
+        self._commands: List = []
+        self._events = None
+        self._collector: Optional[threading.Thread] = None
+        # 等待发给工作进程的修改：分片 -> {闹钟ID: 闹钟对象或None（删除）}
+        self._pending: List[Dict[str, Optional[Alarm]]] = []
+        # 父进程调度线程弹出到期闹钟时同步触发状态，不转发给工作进程
+        self._mirroring = False
+        super().__init__(*args, **kwargs)
+
+    def start(self):
+        """启动工作进程、结果收集线程和父进程的调度线程"""
+        if self.running:
+            return
+        context = multiprocessing.get_context("spawn")
+        self._events = context.Queue()
+        self._commands = [context.Queue() for _ in range(self.shards)]
+        self._pending = [{} for _ in range(self.shards)]
+        self._processes = [
+            context.Process(target=_shard_worker, name=f"alarm-shard-{shard}", daemon=True,
+                            args=(shard, self._commands[shard], self._events, self.trigger_hook,
+                                  self._engine, self.grace_seconds))
+            for shard in range(self.shards)
+        ]
+        for process in self._processes:
+            process.start()
+        self._collector = threading.Thread(target=self._collect_events, daemon=True)
+        self._collector.start()
+        # 父进程的reschedule把全部闹钟同步给工作进程
+        super().start()
+
+    def stop(self):
+        """停止父进程调度线程和所有工作进程"""
+        super().stop()
+        if not self._processes:
+            return
+        for commands in self._commands:
+            commands.put(("stop",))
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._events.put(None)
+        if self._collector:
+            self._collector.join(timeout=2)
+        self._processes = []
+        self._commands = []
+
+    def pause(self):
+        """暂停父进程和工作进程的调度"""
+        super().pause()
+        self._send_all(("pause",))
+
+    def resume(self):
+        """恢复调度，工作进程与父进程一样从当前时间重新排程"""
+        with self.lock:
+            super().resume()
+            self._send_all(("resume",))
+
+    @property
+    def sharded(self) -> bool:
+        """工作进程是否在运行"""
+        return bool(self._processes)
+
+    def shard_sizes(self) -> List[int]:
+        """每个分片的闹钟数"""
+        sizes = [0] * self.shards
+        with self.lock:
+            for alarm_id in self.alarms:
+                sizes[shard_of(alarm_id, self.shards)] += 1
+        return sizes
+
+    # === 把闹钟修改同步给工作进程 ===
+
+    def reschedule(self):
+        """重建调度，并让工作进程按当前全部闹钟重建分片"""
+        with self.lock:
+            super().reschedule()
+            if self.sharded and not self._mirroring:
+                self._pending = [{} for _ in range(self.shards)]
+                self._send_all(("reset",))
+                for alarm in self.alarms.values():
+                    self._pending[shard_of(alarm.id, self.shards)][alarm.id] = alarm
+                self._flush_pending()
+
+    def _schedule_alarm(self, alarm: Alarm, now: datetime, notify: bool = True):
+        """排程闹钟，并记录需要同步给工作进程的修改（调用方需持有锁）"""
+        super()._schedule_alarm(alarm, now, notify)
+        if self.sharded and not self._mirroring:
+            self._pending[shard_of(alarm.id, self.shards)][alarm.id] = alarm
+
+    def _unindex_alarm(self, alarm_id: str):
+        """从索引中移除闹钟，并记录需要在工作进程中删除（调用方需持有锁）"""
+        super()._unindex_alarm(alarm_id)
+        if self.sharded:
+            self._pending[shard_of(alarm_id, self.shards)][alarm_id] = None
+
+    def _notify_changed(self, alarm_ids: List[str]):
+        """每次修改后把积累的修改发给工作进程，再通知on_alarms_changed"""
+        with self.lock:
+            self._flush_pending()
+        super()._notify_changed(alarm_ids)
+
+    def _flush_pending(self):
+        """把积累的修改按分片打包发送（调用方需持有锁）"""
+        if not self.sharded:
+            return
+        for shard, pending in enumerate(self._pending):
+            if not pending:
+                continue
+            puts = [_alarm_state(alarm) for alarm in pending.values() if alarm is not None]
+            deletes = [alarm_id for alarm_id, alarm in pending.items() if alarm is None]
+            if deletes:
+                self._commands[shard].put(("delete", deletes))
+            if puts:
+                self._commands[shard].put(("put", puts))
+            pending.clear()
+
+    def _send_all(self, command: tuple):
+        for commands in self._commands:
+            commands.put(command)
+
+    # === 触发 ===
+
+    def _pop_due_alarms(self, now: datetime) -> List[AlarmEvent]:
+        """父进程只同步到期闹钟的触发状态，闹钟由工作进程触发；倒计时器照常触发"""
+        if not self.sharded:
+            return super()._pop_due_alarms(now)
+        self._mirroring = True
+        try:
+            events = super()._pop_due_alarms(now)
+        finally:
+            self._mirroring = False
+        return [event for event in events if isinstance(event.alarm, CountdownTimer)]
+
+    def _collect_events(self):
+        """结果收集线程：把工作进程发回的触发事件交给回调"""
+        while True:
+            item = self._events.get()
+            if item is None:
+                break
+            alarm_id, fire_time, fired_at, shard, result, error = item
+            alarm = self.get_alarm(alarm_id)
+            if alarm is None:
+                continue  # 已在父进程中删除
+            if error:
+                print(f"分片{shard}触发钩子失败（闹钟 {alarm.time_str}）: {error}")
+            self._dispatch([ShardEvent(alarm, fire_time, fired_at, shard, result, error)])
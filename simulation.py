@@ -0,0 +1,99 @@
+# simulation.py - 虚拟时间模拟运行器：快速回放闹钟在一段时间内的触发序列
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from alarm_manager import Alarm, AlarmManager
+from clock import VirtualClock
+from storage import JsonFileStorage
+
+
+def simulate(manager: AlarmManager, clock: VirtualClock, until: datetime) -> List[tuple]:
+    """在虚拟时间中运行到until，返回触发序列 [(触发时间, 闹钟ID, 闹钟时间), ...]
+
+    时钟直接跳到调度引擎的下一次唤醒时间，不需要逐秒推进。
+    """
+    fired = []
+    while True:
+        wake_time = manager.next_fire_time()
+        if wake_time is None or wake_time > until:
+            break
+        clock.advance_to(wake_time)
+        for alarm in manager.tick():
+            fired.append((clock.now(), alarm.id, alarm.time_str))
+    clock.advance_to(until)
+    return fired
+
+
+def arm_alarms(manager: AlarmManager, start: datetime):
+    """把所有闹钟的上次触发时间设为模拟开始的整分钟，并重建调度"""
+    start_minute = start.replace(second=0, microsecond=0)
+    with manager.lock:
+        for alarm in manager.alarms.values():
+            alarm.last_triggered = start_minute
+            alarm.has_triggered = False
+    manager.reschedule()
+
+
+def generate_alarms(manager: AlarmManager, count: int, seed: int = 0):
+    """随机生成count个闹钟（约十分之一为一次性闹钟），不写入配置文件"""
+    rnd = random.Random(seed)
+    with manager.lock:
+        for i in range(count):
+            minute_of_day = rnd.randrange(1440)
+            alarm_id = f"sim-{i}"
+            manager.alarms[alarm_id] = Alarm(
+                alarm_id, f"{minute_of_day // 60:02d}:{minute_of_day % 60:02d}",
+                repeat_daily=rnd.random() >= 0.1,
+                created_at=manager.clock.now()
+            )
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="虚拟时间闹钟模拟")
+    parser.add_argument("config", nargs="?", help="闹钟配置文件（不指定时使用--generate生成）")
+    parser.add_argument("--generate", type=int, default=0, help="随机生成的闹钟数量")
+    parser.add_argument("--days", type=float, default=7, help="模拟天数")
+    parser.add_argument("--start", help="模拟开始时间，ISO格式，默认当前时间")
+    parser.add_argument("--engine", default="heap", help="调度引擎：heap 或 wheel")
+    parser.add_argument("-o", "--output", help="触发序列输出文件（JSON Lines），默认标准输出")
+    args = parser.parse_args(argv)
+
+    start = datetime.fromisoformat(args.start) if args.start else datetime.now().replace(microsecond=0)
+    clock = VirtualClock(start)
+    # 内存存储：模拟中的触发状态不写回配置文件
+    manager = AlarmManager(args.config or "", engine=args.engine, clock=clock, storage="memory")
+    if args.config:
+        alarms_data = JsonFileStorage(args.config, manager.lock, list).load()
+        manager.put_alarms([Alarm.from_dict(data, created_at=start) for data in alarms_data])
+    if args.generate:
+        generate_alarms(manager, args.generate)
+    arm_alarms(manager, start)
+
+    begin = time.perf_counter()
+    fired = simulate(manager, clock, start + timedelta(days=args.days))
+    elapsed = time.perf_counter() - begin
+
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for fire_time, alarm_id, time_str in fired:
+            output.write(json.dumps({
+                "fired_at": fire_time.isoformat(),
+                "id": alarm_id,
+                "time_str": time_str
+            }, ensure_ascii=False) + "\n")
+    finally:
+        if args.output:
+            output.close()
+
+    print(f"模拟 {len(manager.alarms)} 个闹钟 {args.days} 天：触发 {len(fired)} 次，"
+          f"耗时 {elapsed:.2f} 秒", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
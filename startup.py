@@ -0,0 +1,47 @@
+# startup.py - 启动耗时分析：记录模块导入和各启动阶段的耗时（main.py --profile-startup）
+
+import time
+from contextlib import contextmanager
+from typing import List, Tuple
+
+
+class StartupProfiler:
+    """启动耗时记录器
+
+    phase() 包住一段代码（模块导入或初始化步骤）记录其耗时，mark() 记录从上一段
+    结束到现在的耗时（例如等待窗口首次绘制）。enabled为False时只执行代码，不记录。
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.records: List[Tuple[str, float, float]] = []  # (名称, 耗时秒, 结束时距启动的秒数)
+
+    @contextmanager
+    def phase(self, name: str):
+        """记录with块内代码的耗时"""
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, begin)
+
+    def mark(self, name: str):
+        """记录从上一段结束到现在的耗时"""
+        self._record(name, self._last)
+
+    def _record(self, name: str, begin: float):
+        end = time.perf_counter()
+        if self.enabled:
+            self.records.append((name, end - begin, end - self.started))
+        self._last = end
+
+    def report(self):
+        """打印各阶段耗时"""
+        if not self.enabled:
+            return
+        print("启动耗时分析:")
+        print(f"  {'阶段':<36s}{'耗时(ms)':>10s}{'累计(ms)':>10s}")
+        for name, elapsed, total in self.records:
+            print(f"  {name:<36s}{elapsed * 1000:10.1f}{total * 1000:10.1f}")
@@ -0,0 +1,274 @@
+# storage.py - 闹钟存储后端：JSON文件、追加日志、SQLite
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Callable, List, Optional
+from journal import AlarmJournal
+from persistence import write_json_atomic
+from utils import parse_minute_of_day
+
+# 加载闹钟时各后端可能抛出的异常
+LOAD_ERRORS = (OSError, ValueError, KeyError, sqlite3.Error)
+
+
+class JsonFileStorage:
+    """JSON文件存储：任何修改都整体重写文件（可交给后台写线程合并）
+
+    所有存储后端提供相同的方法：load / put / delete / put_many / delete_many /
+    clear / save_all / flush / close。put、delete、clear及其批量版本是增量修改，
+    save_all按snapshot_provider的结果整体保存。
+    """
+
+    def __init__(self, path: str, lock: threading.RLock,
+                 snapshot_provider: Callable[[], List[dict]], writer=None):
+        self.path = path
+        self.lock = lock
+        self._snapshot_provider = snapshot_provider
+        # 后台写线程（persistence.BackgroundWriter），为None时同步写入
+        self.writer = writer
+
+    def load(self) -> List[dict]:
+        """读取所有闹钟字典，文件不存在时返回空列表"""
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def put(self, alarm_data: dict):
+        """新增或修改闹钟（JSON文件只能整体保存）"""
+        self.save_all()
+
+    def delete(self, alarm_id: str):
+        """删除闹钟（JSON文件只能整体保存）"""
+        self.save_all()
+
+    def clear(self):
+        """清空所有闹钟（JSON文件只能整体保存）"""
+        self.save_all()
+
+    def put_many(self, alarms_data: List[dict]):
+        """批量新增或修改闹钟（整体保存一次）"""
+        self.save_all()
+
+    def delete_many(self, alarm_ids: List[str]):
+        """批量删除闹钟（整体保存一次）"""
+        self.save_all()
+
+    def save_all(self):
+        """整体保存：有后台写线程时只登记请求，否则当前线程原子写入"""
+        if self.writer:
+            self.writer.submit(self.path, self._locked_snapshot)
+        else:
+            write_json_atomic(self.path, self._locked_snapshot())
+
+    def _locked_snapshot(self) -> List[dict]:
+        """加锁获取当前所有闹钟的字典列表"""
+        with self.lock:
+            return self._snapshot_provider()
+
+    def flush(self):
+        """等待后台写线程写出待保存的数据"""
+        if self.writer:
+            self.writer.flush()
+
+    def close(self):
+        """写出待保存的数据"""
+        self.flush()
+
+
+class SQLiteStorage:
+    """SQLite存储：按行upsert/删除，按一天中的分钟数和启用状态建立索引
+
+    使用WAL模式，其他进程可以在应用写入时并发读取。
+    Alarm.to_dict中没有单独列的字段保存在extra列（JSON）中。
+    """
+
+    COLUMNS = ('id', 'time_str', 'repeat_daily', 'enabled', 'audio_file', 'message')
+
+    def __init__(self, path: str, lock: threading.RLock,
+                 snapshot_provider: Callable[[], List[dict]]):
+        self.path = path
+        self.lock = lock
+        self._snapshot_provider = snapshot_provider
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """按需打开数据库连接并建表"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS alarms (
+                    id TEXT PRIMARY KEY,
+                    time_str TEXT NOT NULL,
+                    minute_of_day INTEGER NOT NULL,
+                    repeat_daily INTEGER NOT NULL,
+                    enabled INTEGER NOT NULL,
+                    audio_file TEXT,
+                    message TEXT NOT NULL DEFAULT '',
+                    extra TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_alarms_minute ON alarms (minute_of_day);
+                CREATE INDEX IF NOT EXISTS idx_alarms_enabled ON alarms (enabled, minute_of_day);
+            """)
+            self._conn = conn
+        return self._conn
+
+    @classmethod
+    def _to_row(cls, alarm_data: dict) -> tuple:
+        """闹钟字典 -> 表行"""
+        try:
+            minute_of_day = parse_minute_of_day(alarm_data['time_str'])
+        except ValueError:
+            minute_of_day = 0
+        extra = {k: v for k, v in alarm_data.items() if k not in cls.COLUMNS}
+        return (
+            alarm_data['id'], alarm_data['time_str'], minute_of_day,
+            int(bool(alarm_data.get('repeat_daily', True))),
+            int(bool(alarm_data.get('enabled', True))),
+            alarm_data.get('audio_file'), alarm_data.get('message') or '',
+            json.dumps(extra, ensure_ascii=False) if extra else None
+        )
+
+    @staticmethod
+    def _from_row(row: tuple) -> dict:
+        """表行 -> 闹钟字典"""
+        alarm_id, time_str, _, repeat_daily, enabled, audio_file, message, extra = row
+        alarm_data = {
+            'id': alarm_id,
+            'time_str': time_str,
+            'repeat_daily': bool(repeat_daily),
+            'enabled': bool(enabled),
+            'audio_file': audio_file,
+            'message': message
+        }
+        if extra:
+            alarm_data.update(json.loads(extra))
+        return alarm_data
+
+    _UPSERT = """
+        INSERT INTO alarms (id, time_str, minute_of_day, repeat_daily, enabled,
+                            audio_file, message, extra)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(id) DO UPDATE SET
+            time_str = excluded.time_str,
+            minute_of_day = excluded.minute_of_day,
+            repeat_daily = excluded.repeat_daily,
+            enabled = excluded.enabled,
+            audio_file = excluded.audio_file,
+            message = excluded.message,
+            extra = excluded.extra
+    """
+
+    def load(self) -> List[dict]:
+        """读取所有闹钟字典（按时间排序）"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT * FROM alarms ORDER BY minute_of_day").fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def query_minutes(self, start: int, end: int, enabled_only: bool = False) -> List[dict]:
+        """查询一天中分钟数在[start, end]内的闹钟（走minute_of_day索引）"""
+        sql = "SELECT * FROM alarms WHERE minute_of_day BETWEEN ? AND ?"
+        if enabled_only:
+            sql += " AND enabled = 1"
+        with self.lock:
+            rows = self.conn.execute(sql + " ORDER BY minute_of_day", (start, end)).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def put(self, alarm_data: dict):
+        """新增或修改一行"""
+        with self.lock, self.conn:
+            self.conn.execute(self._UPSERT, self._to_row(alarm_data))
+
+    def delete(self, alarm_id: str):
+        """删除一行"""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM alarms WHERE id = ?", (alarm_id,))
+
+    def put_many(self, alarms_data: List[dict]):
+        """在一个事务内新增或修改多行"""
+        with self.lock, self.conn:
+            self.conn.executemany(self._UPSERT, [self._to_row(data) for data in alarms_data])
+
+    def delete_many(self, alarm_ids: List[str]):
+        """在一个事务内删除多行"""
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM alarms WHERE id = ?",
+                                  [(alarm_id,) for alarm_id in alarm_ids])
+
+    def clear(self):
+        """删除所有行"""
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM alarms")
+
+    def save_all(self):
+        """在一个事务内用当前所有闹钟替换表内容"""
+        with self.lock, self.conn:
+            rows = [self._to_row(alarm_data) for alarm_data in self._snapshot_provider()]
+            self.conn.execute("DELETE FROM alarms")
+            self.conn.executemany(self._UPSERT, rows)
+
+    def flush(self):
+        """每次修改都已提交，无需等待"""
+
+    def close(self):
+        """关闭数据库连接"""
+        with self.lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class MemoryStorage:
+    """内存存储：不保存任何数据（例如分片工作进程中的闹钟副本，持久化由父进程负责）"""
+
+    def load(self) -> List[dict]:
+        return []
+
+    def put(self, alarm_data: dict):
+        pass
+
+    def delete(self, alarm_id: str):
+        pass
+
+    def clear(self):
+        pass
+
+    def put_many(self, alarms_data: List[dict]):
+        pass
+
+    def delete_many(self, alarm_ids: List[str]):
+        pass
+
+    def save_all(self):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# 可在AlarmManager构造时选择的存储后端
+STORAGE_BACKENDS = ("json", "journal", "sqlite", "memory")
+
+
+def create_storage(backend: str, path: str, lock: threading.RLock,
+                   snapshot_provider: Callable[[], List[dict]],
+                   writer=None, compact_threshold: int = 1000):
+    """按名称创建存储后端"""
+    if backend == "json":
+        return JsonFileStorage(path, lock, snapshot_provider, writer)
+    if backend == "journal":
+        return AlarmJournal(path, lock, snapshot_provider, compact_threshold)
+    if backend == "sqlite":
+        return SQLiteStorage(path, lock, snapshot_provider)
+    if backend == "memory":
+        return MemoryStorage()
+    raise ValueError(f"未知的存储后端: {backend}，可选: {', '.join(STORAGE_BACKENDS)}")
@@ -44,13 +44,949 @@ def test_alarm_manager():
     return manager
 
 
+def test_alarm_scheduler(engine: str = "heap"):
+    """测试闹钟调度"""
+    print(f"1b. 测试闹钟调度（{engine}）...")
+    from datetime import datetime, timedelta
+    manager = AlarmManager("test_scheduler_alarms.json", engine=engine)
+    triggered = []
+    manager.on_alarm_trigger = triggered.append
+
+    # 当前分钟的闹钟：把上次触发时间往前调，使其立即到期
+    now = datetime.now()
+    alarm_id = manager.add_alarm(now.strftime("%H:%M"), True, None)
+    manager.alarms[alarm_id].last_triggered -= timedelta(minutes=5)
+    manager.start()
+    time.sleep(0.3)
+    assert len(triggered) == 1, f"预期触发1次，实际{len(triggered)}次"
+
+    # 触发后应排程到第二天
+    next_time = manager.scheduled_time(alarm_id)
+    assert next_time.date() == (now + timedelta(days=1)).date(), f"下次触发时间错误: {next_time}"
+
+    # 禁用后不再排程
+    manager.toggle_alarm(alarm_id)
+    assert manager.scheduled_time(alarm_id) is None, "禁用的闹钟不应被排程"
+
+    manager.stop()
+    assert not manager.check_thread.is_alive(), "调度线程未停止"
+    print("   [OK] 闹钟调度测试通过")
+
+
+def test_alarm_index():
+    """测试分钟索引查询"""
+    print("1c. 测试分钟索引...")
+    manager = AlarmManager("test_index_alarms.json")
+    alarm_id = manager.add_alarm("08:30", True, None)
+    manager.add_alarm("23:30", True, None)
+    manager.add_alarm("00:10", True, None)
+
+    assert [a.id for a in manager.get_alarms_at("08:30")] == [alarm_id], "按分钟查询失败"
+    late = [a.time_str for a in manager.get_alarms_between("23:00", "01:00")]
+    assert late == ["23:30", "00:10"], f"跨午夜查询失败: {late}"
+
+    # 修改时间后索引同步更新
+    manager.update_alarm(alarm_id, time_str="09:00")
+    assert not manager.get_alarms_at("08:30"), "修改时间后旧索引未清除"
+    assert len(manager.get_alarms_between("08:00", "09:00")) == 1, "修改时间后新索引缺失"
+
+    manager.toggle_alarm(alarm_id)
+    assert not manager.get_alarms_at("09:00", enabled_only=True), "禁用闹钟不应出现在启用查询中"
+
+    manager.remove_alarm(alarm_id)
+    assert len(manager.get_alarms_between("00:00", "23:59")) == 2, "删除后索引未更新"
+    print("   [OK] 分钟索引测试通过")
+
+
+def test_simulation():
+    """测试虚拟时钟模拟"""
+    print("1d. 测试虚拟时间模拟...")
+    from datetime import datetime, timedelta
+    from clock import VirtualClock
+    from simulation import simulate, arm_alarms
+
+    start = datetime(2026, 3, 1, 8, 0, 30)
+    clock = VirtualClock(start)
+    manager = AlarmManager("test_simulation_alarms.json", clock=clock)
+    daily_id = manager.add_alarm("08:00", True, None)   # 当前分钟，首次在第二天触发
+    once_id = manager.add_alarm("09:30", False, None)  # 一次性闹钟
+    arm_alarms(manager, start)
+
+    fired = simulate(manager, clock, start + timedelta(days=3))
+    sequence = [(fire_time.strftime("%m-%d %H:%M"), alarm_id) for fire_time, alarm_id, _ in fired]
+    expected = [
+        ("03-01 09:30", once_id),
+        ("03-02 08:00", daily_id),
+        ("03-03 08:00", daily_id),
+        ("03-04 08:00", daily_id),
+    ]
+    assert sequence == expected, f"触发序列错误: {sequence}"
+    print("   [OK] 虚拟时间模拟测试通过")
+
+
+def test_clock_jump(engine: str = "heap"):
+    """测试时钟跳变和系统休眠后的补发"""
+    print(f"1d2. 测试时钟跳变补发（{engine}）...")
+    from datetime import datetime, timedelta
+    from clock import VirtualClock
+    from simulation import arm_alarms
+
+    start = datetime(2026, 3, 1, 8, 0, 30)
+    clock = VirtualClock(start)
+    manager = AlarmManager("test_jump_alarms.json", engine=engine, clock=clock, grace_seconds=600)
+    nine_id = manager.add_alarm("09:00", True, None)
+    ten_id = manager.add_alarm("10:00", True, None)
+    noon_id = manager.add_alarm("12:00", False, None)
+    arm_alarms(manager, start)
+    events = []
+    manager.on_alarm_event = events.append
+    assert manager.tick() == [], "不应有闹钟到期"
+
+    # 墙上时间向前跳过09:00（单调时钟不变），迟到在补发窗口内，补发一次
+    clock.jump(timedelta(hours=1, minutes=5))
+    manager.tick()
+    assert [(e.id, int(e.late_by)) for e in events] == [(nine_id, 330)], f"补发错误: {events}"
+
+    # 系统休眠两小时：10:00迟到超过窗口被跳过，12:00的一次性闹钟补发
+    clock.advance(60)
+    clock.jump(timedelta(hours=2, minutes=59))
+    events.clear()
+    manager.tick()
+    assert [e.id for e in events] == [noon_id], f"休眠后补发错误: {events}"
+    assert manager.scheduled_time(ten_id).date() == datetime(2026, 3, 2).date(), "跳过的闹钟未排程到下一天"
+
+    # 时钟向后调整：重新排程，已触发的闹钟不重复触发
+    clock.jump(-timedelta(hours=4))
+    events.clear()
+    manager.tick()
+    clock.advance(3600)
+    manager.tick()
+    assert events == [], f"时钟回调后不应重复触发: {events}"
+    assert manager.scheduled_time(nine_id) == datetime(2026, 3, 2, 9, 0), "时钟回调后排程错误"
+
+    # 小于跳变阈值的时钟回调不重新排程：调度引擎的结果应与最小堆一致，不提前触发
+    import random
+    from scheduler import HeapScheduler, create_scheduler
+    rnd = random.Random(7)
+    base = datetime(2026, 3, 1, 8, 0)
+    scheduler, reference = create_scheduler(engine), HeapScheduler()
+    now = base
+    for step in range(2000):
+        if rnd.random() < 0.3:
+            fire_time = now + timedelta(seconds=rnd.uniform(-2, 90))
+            scheduler.schedule(f"a{step}", fire_time)
+            reference.schedule(f"a{step}", fire_time)
+        now += timedelta(seconds=rnd.choice((-4, -1, 0.5, 1, 2, 3, 7)))
+        popped = scheduler.pop_due(now)
+        assert sorted(popped) == sorted(reference.pop_due(now)), f"时钟回调后触发结果不一致: {now}"
+        assert all(fire_time <= now for _, fire_time in popped), "闹钟提前触发"
+        wake, earliest = scheduler.next_fire_time(), reference.next_fire_time()
+        assert earliest is None or (wake is not None and wake <= earliest), f"唤醒时间晚于最早的闹钟: {wake}"
+
+    # 未调用reset的调度引擎不依赖系统时钟
+    scheduler = create_scheduler(engine)
+    scheduler.schedule("x", datetime(2030, 1, 1, 0, 0, 30))
+    assert scheduler.next_fire_time() == datetime(2030, 1, 1, 0, 0, 30), "下一次唤醒时间错误"
+    assert scheduler.pop_due(datetime(2030, 1, 1, 0, 0, 10)) == [], "未到时间不应触发"
+    assert scheduler.next_fire_time() == datetime(2030, 1, 1, 0, 0, 30), "下一次唤醒时间错误"
+    assert scheduler.pop_due(datetime(2030, 1, 1, 0, 0, 30)) == [("x", datetime(2030, 1, 1, 0, 0, 30))]
+
+    # 长时间间隔（休眠、虚拟时钟快进）直接跳过空格子，结果仍与最小堆一致
+    scheduler, reference = create_scheduler(engine), HeapScheduler()
+    scheduler.reset(base)
+    reference.reset(base)
+    now = base
+    for step in range(300):
+        fire_time = now + timedelta(seconds=rnd.choice((rnd.uniform(0, 120), rnd.uniform(0, 40 * 86400))))
+        scheduler.schedule(f"b{step}", fire_time)
+        reference.schedule(f"b{step}", fire_time)
+        now += timedelta(seconds=rnd.uniform(0, 5 * 86400))
+        assert sorted(scheduler.pop_due(now)) == sorted(reference.pop_due(now)), f"长时间跳跃后触发结果不一致: {now}"
+    scheduler.schedule("far", now + timedelta(days=30, seconds=5))
+    started = time.perf_counter()
+    assert ("far", now + timedelta(days=30, seconds=5)) not in scheduler.pop_due(now + timedelta(days=30))
+    assert time.perf_counter() - started < 0.2, "跳过空格子过慢"
+    print("   [OK] 时钟跳变补发测试通过")
+
+
+def test_precise_alarms(engine: str = "heap"):
+    """测试秒和毫秒精度的闹钟"""
+    print(f"1d3. 测试精确触发（{engine}）...")
+    from datetime import datetime, timedelta
+    from clock import VirtualClock
+    from simulation import simulate
+    from utils import validate_time_format
+
+    for time_str in ("08:30", "08:30:05", "08:30:05.250", "23:59:59.9"):
+        assert validate_time_format(time_str), f"应为有效时间: {time_str}"
+    for time_str in ("08:30:60", "08:30.5", "08:30:05.2500", "8:5"):
+        assert not validate_time_format(time_str), f"应为无效时间: {time_str}"
+
+    start = datetime(2026, 3, 1, 8, 0, 30)
+    clock = VirtualClock(start)
+    manager = AlarmManager("test_precise_alarms.json", engine=engine, clock=clock)
+    later_id = manager.add_alarm("08:00:45.250", False, None)  # 本分钟内稍后，当天触发
+    past_id = manager.add_alarm("08:00:15", True, None)        # 本分钟内已过，次日触发
+    manager.reschedule()
+
+    fired = simulate(manager, clock, start + timedelta(days=1, minutes=1))
+    sequence = [(fire_time, alarm_id) for fire_time, alarm_id, _ in fired]
+    expected = [
+        (datetime(2026, 3, 1, 8, 0, 45, 250000), later_id),
+        (datetime(2026, 3, 2, 8, 0, 15), past_id),
+    ]
+    assert sequence == expected, f"精确触发序列错误: {sequence}"
+    stats = manager.lateness_stats()
+    assert stats["count"] == 2 and stats["max_ms"] == 0, f"延迟统计错误: {stats}"
+    print("   [OK] 精确触发测试通过")
+
+
+def test_recurrence():
+    """测试重复规则"""
+    print("1d4. 测试重复规则...")
+    from datetime import datetime, timedelta
+    from clock import VirtualClock
+    from simulation import simulate, arm_alarms
+
+    start = datetime(2026, 3, 6, 7, 0)  # 周五
+    clock = VirtualClock(start)
+    manager = AlarmManager("test_recurrence_alarms.json", clock=clock)
+    weekly_id = manager.add_alarm("08:00", True, None, recurrence="weekly:mon,fri")
+    every_id = manager.add_alarm("22:00", True, None, recurrence="every:45m")
+    monthly_id = manager.add_alarm("09:30", True, None, recurrence="monthly:-1sun")
+    cron_id = manager.add_alarm("00:00", True, None, recurrence="cron:0 12 * * sat")
+    arm_alarms(manager, start)
+
+    fired = simulate(manager, clock, start + timedelta(days=3, hours=2))
+    sequence = [(fire_time.strftime("%d %H:%M"), alarm_id) for fire_time, alarm_id, _ in fired]
+    expected = [
+        ("06 08:00", weekly_id),
+        ("06 22:00", every_id), ("06 22:45", every_id), ("06 23:30", every_id),
+        ("07 12:00", cron_id),
+        ("07 22:00", every_id), ("07 22:45", every_id), ("07 23:30", every_id),
+        ("08 22:00", every_id), ("08 22:45", every_id), ("08 23:30", every_id),
+        ("09 08:00", weekly_id),
+    ]
+    assert sequence == expected, f"重复规则触发序列错误: {sequence}"
+    assert manager.scheduled_time(monthly_id) == datetime(2026, 3, 29, 9, 30), "每月规则排程错误"
+
+    # 日或星期以*/N开头时仍受限，两者需同时满足；都受限时满足其一即可
+    from recurrence import compile_rule
+
+    def cron_days(expression, after, count=3):
+        rule, days, moment = compile_rule(f"cron:{expression}"), [], after
+        for _ in range(count):
+            moment = rule.next_after(moment)
+            days.append(moment.strftime("%Y-%m-%d"))
+        return days
+
+    october = datetime(2026, 10, 1)
+    assert cron_days("0 0 */2 * *", october) == ["2026-10-03", "2026-10-05", "2026-10-07"], "*/N日规则错误"
+    assert cron_days("0 0 */10 * mon", october) == ["2026-12-21", "2027-01-11", "2027-02-01"], "*/N日与星期规则错误"
+    assert cron_days("0 0 1 * */3", october) == ["2026-11-01", "2027-05-01", "2027-08-01"], "日与*/N星期规则错误"
+    assert cron_days("0 0 13 * fri", october) == ["2026-10-02", "2026-10-09", "2026-10-13"], "日或星期规则错误"
+
+    # 无效规则整批拒绝；规则随闹钟保存和加载
+    try:
+        manager.add_alarms([{"time_str": "08:00", "recurrence": "weekly:xyz"}])
+        assert False, "无效规则应抛出ValueError"
+    except ValueError:
+        pass
+    manager.save_alarms()
+    manager2 = AlarmManager("test_recurrence_alarms.json")
+    manager2.load_alarms()
+    assert manager2.alarms[cron_id].recurrence == "cron:0 12 * * sat", "加载后重复规则丢失"
+    assert manager2.alarms[weekly_id].to_dict()["recurrence"] == "weekly:mon,fri", "序列化后重复规则丢失"
+    print("   [OK] 重复规则测试通过")
+
+
+def test_countdown(engine: str = "heap"):
+    """测试倒计时器"""
+    print(f"1d5. 测试倒计时器（{engine}）...")
+    import random
+    from datetime import datetime, timedelta
+    from clock import VirtualClock
+
+    start = datetime(2026, 3, 1, 8, 0, 0)
+    clock = VirtualClock(start)
+    manager = AlarmManager("test_countdown_alarms.json", engine=engine, clock=clock)
+    fired = []
+    manager.on_alarm_trigger = lambda timer: fired.append(timer.id)
+    tea_id = manager.add_timer(90, "泡茶")
+    job_id = manager.add_timer(30, persist=False)
+    idle_id = manager.add_timer(60, start=False)
+    assert manager.get_timer(tea_id).time_str == "01:30", "时长显示错误"
+
+    clock.advance(30)
+    manager.tick()
+    assert fired == [job_id] and job_id not in manager.timers, f"到期触发错误: {fired}"
+
+    # 暂停后剩余时间不变；墙上时间跳变不影响倒计时
+    manager.pause_timer(tea_id)
+    clock.advance(100)
+    clock.jump(timedelta(hours=1))
+    manager.tick()
+    assert manager.timer_remaining(tea_id) == 60, "暂停后剩余时间错误"
+    manager.resume_timer(tea_id)
+    manager.start_timer(idle_id)
+    clock.jump(timedelta(minutes=30))
+    clock.advance(59)
+    manager.tick()
+    assert fired == [job_id], f"墙上时间跳变后不应提前触发: {fired}"
+    clock.advance(1)
+    manager.tick()
+    assert sorted(fired[1:]) == sorted([tea_id, idle_id]), f"恢复后触发错误: {fired}"
+
+    # 计时中重新开始：从完整时长重新计时
+    restart_id = manager.add_timer(60)
+    clock.advance(50)
+    assert manager.start_timer(restart_id) and manager.timer_remaining(restart_id) == 60, "重新开始后剩余时间错误"
+    clock.advance(10)
+    manager.tick()
+    assert restart_id not in fired, "重新开始的倒计时器提前触发"
+    clock.advance(50)
+    manager.tick()
+    assert fired[-1] == restart_id, f"重新开始的倒计时器未触发: {fired}"
+
+    # 取消的倒计时器不触发；剩余时间随文件保存，重新加载后继续计时
+    cancel_id = manager.add_timer(10)
+    assert manager.cancel_timer(cancel_id) and not manager.cancel_timer(cancel_id), "取消倒计时器失败"
+    saved_id = manager.add_timer(600)
+    clock.advance(100)
+    manager.close()
+    clock2 = VirtualClock(start)
+    manager2 = AlarmManager("test_countdown_alarms.json", engine=engine, clock=clock2)
+    manager2.load_alarms()
+    assert list(manager2.timers) == [saved_id], f"加载的倒计时器错误: {list(manager2.timers)}"
+    assert manager2.timer_remaining(saved_id) == 500, "加载后剩余时间错误"
+    clock2.advance(500)
+    assert [timer.id for timer in manager2.tick()] == [saved_id], "加载后倒计时器未触发"
+
+    # 大量并发倒计时器共用调度引擎，不创建额外线程
+    rnd = random.Random(0)
+    durations = [rnd.randint(1, 3600) for _ in range(20000)]
+    timer_ids = manager2.add_timers([{"duration": d, "persist": False} for d in durations])
+    deadlines = {timer_id: clock2.monotonic() + d for timer_id, d in zip(timer_ids, durations)}
+    late = []
+    manager2.on_alarm_trigger = lambda timer: late.append(clock2.monotonic() - deadlines[timer.id])
+    for _ in range(60):
+        clock2.advance(60)
+        manager2.tick()
+    assert len(late) == len(timer_ids) and not manager2.timers, f"批量倒计时器未全部触发: {len(late)}"
+    assert 0 <= min(late) and max(late) < 60, "批量倒计时器触发时间错误"
+    try:
+        manager2.add_timers([{"duration": 5}, {"duration": 0}])
+        assert False, "无效时长应抛出ValueError"
+    except ValueError:
+        pass
+    print("   [OK] 倒计时器测试通过")
+
+
+def test_prewarm():
+    """测试即将触发闹钟的音频预热通知"""
+    print("1d6. 测试音频预热...")
+    from datetime import datetime, timedelta
+    from clock import VirtualClock
+    from simulation import arm_alarms
+
+    start = datetime(2026, 3, 1, 8, 0, 0)
+    clock = VirtualClock(start)
+    manager = AlarmManager("test_prewarm_alarms.json", clock=clock, prewarm_seconds=300)
+    requests = []
+    manager.on_prewarm = lambda files: requests.extend((clock.now().strftime("%H:%M"), f) for f in files)
+    manager.add_alarm("08:03", True, "soon.mp3")
+    manager.add_alarm("08:20", True, "later.mp3")
+    manager.add_alarm("09:00", True, None)
+    arm_alarms(manager, start)
+    manager.tick()
+    assert requests == [("08:00", "soon.mp3")], f"添加时预热错误: {requests}"
+
+    # 滚动窗口：闹钟进入5分钟窗口时预热一次，触发之前完成
+    for _ in range(60):
+        clock.advance(60)
+        manager.tick()
+    assert requests[1:] == [("08:15", "later.mp3"), ("08:55", None)], f"滚动预热错误: {requests}"
+
+    # 加载闹钟时预热窗口内的音频
+    manager.save_alarms()
+    clock2 = VirtualClock(datetime(2026, 3, 2, 8, 17, 0))
+    manager2 = AlarmManager("test_prewarm_alarms.json", clock=clock2)
+    loaded = []
+    manager2.on_prewarm = loaded.extend
+    manager2.load_alarms()
+    assert loaded == ["later.mp3"], f"加载时预热错误: {loaded}"
+    print("   [OK] 音频预热测试通过")
+
+
+def test_one_shot_reload():
+    """测试一次性闹钟触发后重新加载不再触发"""
+    print("1d7. 测试一次性闹钟的触发状态保存...")
+    from datetime import datetime
+    from clock import VirtualClock
+    from simulation import simulate
+
+    for storage, config in (("json", "test_once_alarms.json"), ("sqlite", "test_once_alarms.db")):
+        if os.path.exists(config):
+            os.remove(config)
+        start = datetime(2026, 3, 1, 8, 0)
+        clock = VirtualClock(start)
+        manager = AlarmManager(config, clock=clock, storage=storage)
+        once_id = manager.add_alarm("08:30", False, None)
+        daily_id = manager.add_alarm("09:00", True, None)
+        fired = simulate(manager, clock, datetime(2026, 3, 1, 10, 0))
+        assert [alarm_id for _, alarm_id, _ in fired] == [once_id, daily_id], f"触发错误: {fired}"
+        manager.flush()
+
+        # 重新加载（重启或SIGHUP）后一次性闹钟不再触发，每日闹钟照常
+        reloaded = AlarmManager(config, clock=clock, storage=storage)
+        reloaded.load_alarms()
+        assert reloaded.get_alarm(once_id).has_triggered, f"{storage}: 未保存触发状态"
+        assert reloaded.scheduled_time(once_id) is None, f"{storage}: 一次性闹钟被重新排程"
+        fired = simulate(reloaded, clock, datetime(2026, 3, 3, 10, 0))
+        assert [alarm_id for _, alarm_id, _ in fired] == [daily_id, daily_id], f"{storage}: 重复触发 {fired}"
+
+        # 只修改提醒内容不会再次触发；修改时间或重新启用后视为新的闹钟
+        reloaded.update_alarms([{"id": once_id, "message": "改了内容"}])
+        assert reloaded.scheduled_time(once_id) is None, "修改内容后不应再次排程"
+        reloaded.update_alarm(once_id, time_str="11:00")
+        assert reloaded.scheduled_time(once_id) == datetime(2026, 3, 3, 11, 0), "修改时间后应重新排程"
+        reloaded.storage.close()
+        manager.storage.close()
+    print("   [OK] 一次性闹钟触发状态测试通过")
+
+
+def test_journal():
+    """测试日志持久化模式"""
+    print("1e. 测试日志持久化...")
+    config_file = "test_journal_alarms.json"
+    manager = AlarmManager(config_file, storage="journal", compact_threshold=20)
+    alarm_ids = [manager.add_alarm(f"{i % 24:02d}:30", True, None) for i in range(30)]
+    manager.toggle_alarm(alarm_ids[0])
+    manager.remove_alarm(alarm_ids[1])
+    manager.update_alarm(alarm_ids[2], time_str="07:07")
+    time.sleep(0.5)  # 等待后台压缩
+
+    assert os.path.exists(config_file), "后台压缩未生成快照"
+    with open(config_file + ".journal", encoding="utf-8") as f:
+        assert sum(1 for _ in f) < 20, "压缩后日志未截断"
+
+    manager2 = AlarmManager(config_file, storage="journal")
+    manager2.load_alarms()
+    assert len(manager2.alarms) == 29, f"重放后预期29个闹钟，实际{len(manager2.alarms)}个"
+    assert not manager2.alarms[alarm_ids[0]].enabled, "重放后启用状态错误"
+    assert manager2.alarms[alarm_ids[2]].time_str == "07:07", "重放后时间错误"
+
+    manager.close()
+    manager2.close()
+    os.remove(config_file + ".journal")
+
+    # 后台压缩与save_alarms同时进行：不应失败，重放结果与内存一致
+    import contextlib
+    import io
+    output = io.StringIO()
+    manager = AlarmManager(config_file, storage="journal", compact_threshold=3)
+    with contextlib.redirect_stdout(output):
+        saver = threading.Thread(target=lambda: [manager.save_alarms() for _ in range(100)])
+        saver.start()
+        for i in range(300):
+            manager.add_alarm(f"{i % 24:02d}:{i % 60:02d}", True, None)
+        saver.join()
+        manager.close()
+    assert "失败" not in output.getvalue(), f"并发压缩失败: {output.getvalue()[:200]}"
+    manager2 = AlarmManager(config_file, storage="journal")
+    manager2.load_alarms()
+    assert set(manager2.alarms) == set(manager.alarms), "并发压缩后重放结果不一致"
+    manager2.close()
+    os.remove(config_file + ".journal")
+    print("   [OK] 日志持久化测试通过")
+
+
+def test_atomic_write():
+    """测试原子写入"""
+    print("1e2. 测试原子写入...")
+    import json
+    import stat
+    import tempfile
+    from persistence import write_json_atomic
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "alarms.json")
+        write_json_atomic(path, [])
+        os.chmod(path, 0o640)
+
+        # 多个线程同时写同一个文件：都成功，结果是其中一次的完整内容
+        errors = []
+
+        def writer(n):
+            for i in range(50):
+                try:
+                    write_json_atomic(path, [{"writer": n, "i": i}])
+                except OSError as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors, f"并发写入失败: {errors[:3]}"
+        with open(path, encoding="utf-8") as f:
+            assert json.load(f)[0]["i"] == 49, "写入内容不完整"
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o640, "覆盖后文件权限改变"
+
+        # 写入失败时不留下临时文件，原文件不变
+        try:
+            write_json_atomic(path, [object()])
+            assert False, "无法序列化的数据应抛出异常"
+        except TypeError:
+            pass
+        assert os.listdir(workdir) == ["alarms.json"], f"留下了临时文件: {os.listdir(workdir)}"
+    print("   [OK] 原子写入测试通过")
+
+
+def test_sqlite_storage():
+    """测试SQLite存储后端"""
+    print("1f. 测试SQLite存储...")
+    db_file = "test_storage_alarms.db"
+    manager = AlarmManager(db_file, storage="sqlite")
+    alarm_id1 = manager.add_alarm("08:30", True, None)
+    alarm_id2 = manager.add_alarm("09:15", False, None)
+    manager.add_alarm("22:00", True, None)
+    manager.toggle_alarm(alarm_id1)
+    manager.update_alarm(alarm_id2, time_str="08:45")
+
+    # 按分钟索引查询
+    rows = manager.storage.query_minutes(8 * 60, 9 * 60)
+    assert [row['id'] for row in rows] == [alarm_id1, alarm_id2], f"索引查询错误: {rows}"
+    rows = manager.storage.query_minutes(8 * 60, 9 * 60, enabled_only=True)
+    assert [row['id'] for row in rows] == [alarm_id2], f"启用状态查询错误: {rows}"
+
+    manager.remove_alarm(alarm_id1)
+    manager2 = AlarmManager(db_file, storage="sqlite")
+    manager2.load_alarms()
+    assert len(manager2.alarms) == 2, f"加载后预期2个闹钟，实际{len(manager2.alarms)}个"
+    assert manager2.alarms[alarm_id2].time_str == "08:45", "加载后时间错误"
+    assert not manager2.alarms[alarm_id2].repeat_daily, "加载后重复标志错误"
+
+    manager.close()
+    manager2.close()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
+    print("   [OK] SQLite存储测试通过")
+
+
+def test_bulk_operations():
+    """测试批量操作"""
+    print("1g. 测试批量操作...")
+    manager = AlarmManager("test_bulk_alarms.json")
+    notifications = []
+    manager.on_alarms_changed = notifications.append
+
+    alarm_ids = manager.add_alarms([{"time_str": f"{i % 24:02d}:00"} for i in range(100)])
+    assert len(alarm_ids) == 100 and len(manager.alarms) == 100, "批量添加失败"
+    assert len(notifications) == 1, "批量添加应只通知一次"
+
+    # 任一项无效时整批不生效
+    try:
+        manager.add_alarms([{"time_str": "08:00"}, {"time_str": "25:00"}])
+        assert False, "无效时间应抛出ValueError"
+    except ValueError:
+        pass
+    assert len(manager.alarms) == 100, "校验失败时不应添加任何闹钟"
+
+    results = manager.update_alarms([{"id": alarm_ids[0], "time_str": "07:07", "priority": 3},
+                                     {"id": "missing"}])
+    assert results == [True, False], f"批量更新结果错误: {results}"
+    assert manager.get_alarms_at("07:07")[0].id == alarm_ids[0], "批量更新后索引未更新"
+
+    assert all(manager.set_enabled_many(alarm_ids[:50], False)), "批量禁用失败"
+    assert sum(a.enabled for a in manager.alarms.values()) == 50, "批量禁用数量错误"
+
+    assert manager.remove_alarms(alarm_ids[90:] + ["missing"]) == [True] * 10 + [False], "批量删除结果错误"
+    assert len(notifications) == 4, f"预期通知4次，实际{len(notifications)}次"
+
+    manager2 = AlarmManager("test_bulk_alarms.json")
+    manager2.load_alarms()
+    assert len(manager2.alarms) == 90, f"加载后预期90个闹钟，实际{len(manager2.alarms)}个"
+    assert manager2.alarms[alarm_ids[0]].priority == 3, "加载后播放优先级丢失"
+    print("   [OK] 批量操作测试通过")
+
+
+def test_async_manager():
+    """测试asyncio版闹钟管理器"""
+    print("1h. 测试asyncio版闹钟管理器...")
+    import asyncio
+    from datetime import datetime, timedelta
+    from async_manager import AsyncAlarmManager
+
+    async def run():
+        manager = AsyncAlarmManager("test_async_alarms.json")
+        triggered = []
+
+        async def on_alarm(alarm):
+            await asyncio.sleep(0)
+            triggered.append(alarm.id)
+
+        manager.on_alarm_trigger = on_alarm
+        manager.start()
+
+        # 当前分钟的闹钟：把上次触发时间往前调，使其立即到期
+        alarm_id = manager.add_alarm(datetime.now().strftime("%H:%M"), True, None)
+        manager.alarms[alarm_id].last_triggered -= timedelta(minutes=5)
+        manager.reschedule()
+
+        events = manager.events()
+        event = await asyncio.wait_for(events.__anext__(), timeout=2)
+        assert event.alarm.id == alarm_id, "事件中的闹钟错误"
+        await manager.wait_closed()
+        assert triggered == [alarm_id], f"async回调未执行: {triggered}"
+
+        # stop后events()迭代结束
+        manager.stop()
+        remaining = [e async for e in events]
+        assert remaining == [], "stop后不应再有事件"
+        assert manager._timer is None, "stop后定时器未取消"
+
+    asyncio.run(run())
+    print("   [OK] asyncio版闹钟管理器测试通过")
+
+
+def test_callback_dispatcher():
+    """测试回调分发器"""
+    print("1i. 测试回调分发器...")
+    from datetime import timedelta
+    from dispatcher import CallbackDispatcher
+
+    class FakeAlarm:
+        def __init__(self, alarm_id):
+            self.id = alarm_id
+
+    release = threading.Event()
+    handled = []
+
+    def blocked(alarm):
+        release.wait(2)
+        handled.append(alarm.id)
+
+    # drop_oldest：唯一的工作线程被占用，队列满时丢弃最早的事件
+    dispatcher = CallbackDispatcher(workers=1, max_queue=2, policy="drop_oldest")
+    dispatcher.submit(blocked, FakeAlarm("busy"))
+    time.sleep(0.1)
+    for alarm_id in ("a", "b", "c"):
+        dispatcher.submit(blocked, FakeAlarm(alarm_id))
+    release.set()
+    assert dispatcher.join(), "回调未执行完"
+    assert handled == ["busy", "b", "c"], f"drop_oldest顺序错误: {handled}"
+    assert dispatcher.stats["dropped"] == 1, f"丢弃计数错误: {dispatcher.stats}"
+    dispatcher.shutdown()
+
+    # coalesce：同一闹钟排队中时合并
+    release.clear()
+    handled.clear()
+    dispatcher = CallbackDispatcher(workers=1, max_queue=8, policy="coalesce")
+    dispatcher.submit(blocked, FakeAlarm("busy"))
+    time.sleep(0.1)
+    for alarm_id in ("a", "a", "b", "a"):
+        dispatcher.submit(blocked, FakeAlarm(alarm_id))
+    release.set()
+    dispatcher.join()
+    assert handled == ["busy", "a", "b"], f"coalesce结果错误: {handled}"
+    assert dispatcher.stats["coalesced"] == 2, f"合并计数错误: {dispatcher.stats}"
+    dispatcher.shutdown()
+
+    # 慢回调报告闹钟ID；调度线程不被慢回调阻塞
+    slow = []
+    dispatcher = CallbackDispatcher(workers=1, slow_threshold=0.1)
+    dispatcher.on_slow_callback = lambda alarm_id, elapsed: slow.append(alarm_id)
+    manager = AlarmManager("test_dispatch_alarms.json", dispatcher=dispatcher)
+    manager.on_alarm_trigger = lambda alarm: time.sleep(0.3)
+    alarm_id = manager.add_alarm(time.strftime("%H:%M"), True, None)
+    manager.alarms[alarm_id].last_triggered -= timedelta(minutes=5)
+    manager.reschedule()
+    started = time.monotonic()
+    assert len(manager.tick()) == 1, "闹钟未触发"
+    assert time.monotonic() - started < 0.1, "tick被慢回调阻塞"
+    dispatcher.shutdown()
+    assert slow == [alarm_id], f"慢回调未报告: {slow}"
+    print("   [OK] 回调分发器测试通过")
+
+
+def test_headless_daemon():
+    """测试无界面守护进程模式"""
+    print("1j. 测试无界面模式...")
+    import json
+    import signal
+    import subprocess
+    import tempfile
+    from datetime import datetime, timedelta
+
+    if not hasattr(signal, "SIGHUP"):
+        print("   [SKIP] 当前平台没有SIGHUP")
+        return
+
+    with tempfile.TemporaryDirectory() as workdir:
+        config_file = os.path.join(workdir, "alarms.json")
+        timer_file = os.path.join(workdir, "alarms.timers.json")
+        with open(timer_file, "w", encoding="utf-8") as f:
+            json.dump([{"id": "t1", "duration": 600, "remaining": 600, "state": "running"}], f)
+
+        main_py = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+        process = subprocess.Popen(
+            [sys.executable, "-X", "importtime", main_py, "--headless", "--no-audio",
+             "--config", config_file],
+            cwd=workdir, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        try:
+            assert "无界面模式已启动" in process.stdout.readline() + process.stdout.readline(), \
+                "无界面模式未启动"
+
+            # 外部修改配置后SIGHUP重新加载，新闹钟按时触发
+            fire_at = (datetime.now() + timedelta(seconds=2)).strftime("%H:%M:%S")
+            with open(config_file, "w", encoding="utf-8") as f:
+                json.dump([{"id": "a1", "time_str": fire_at, "repeat_daily": True}], f)
+            process.send_signal(signal.SIGHUP)
+            time.sleep(3.5)
+        finally:
+            process.send_signal(signal.SIGTERM)
+            output, imports = process.communicate(timeout=10)
+
+        assert process.returncode == 0, f"退出码错误: {process.returncode}"
+        assert "已重新加载闹钟配置：1 个闹钟" in output, f"SIGHUP未重新加载: {output}"
+        assert f"闹钟触发: {fire_at} a1" in output, f"闹钟未触发: {output}"
+        assert "已退出" in output, "SIGTERM未正常退出"
+
+        # 不导入GUI相关模块
+        modules = {line.rsplit("|", 1)[-1].strip().split(".")[0] for line in imports.splitlines()}
+        loaded = modules & {"tkinter", "_tkinter", "PIL", "pystray", "gui", "tray_icon"}
+        assert not loaded, f"无界面模式导入了GUI模块: {loaded}"
+
+        # 退出时保存了倒计时器的剩余时间
+        with open(timer_file, encoding="utf-8") as f:
+            timers = json.load(f)
+        assert timers[0]["id"] == "t1" and timers[0]["remaining"] < 600, f"倒计时器未保存: {timers}"
+    print("   [OK] 无界面模式测试通过")
+
+
+def test_control_api():
+    """测试本地控制接口"""
+    print("1k. 测试本地控制接口...")
+    import socket
+    import tempfile
+    from clock import VirtualClock
+    from datetime import datetime
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("   [SKIP] 当前平台不支持Unix域套接字")
+        return
+    import stat
+    import control
+    from control import ControlClient, ControlServer
+
+    clock = VirtualClock(datetime(2024, 1, 1, 8, 0))
+    manager = AlarmManager("test_control_alarms.json", clock=clock)
+    changed = []
+    manager.on_alarms_changed = changed.append
+    with tempfile.TemporaryDirectory() as workdir:
+        socket_path = os.path.join(workdir, "control.sock")
+        server = ControlServer(manager, socket_path)
+        old_umask = os.umask(0o022)
+        try:
+            server.start()
+            # 套接字权限为0600，进程的umask不变
+            assert os.umask(old_umask) == 0o022, "启动控制接口修改了进程的umask"
+        except BaseException:
+            os.umask(old_umask)
+            raise
+        assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600, "套接字权限不是0600"
+        try:
+            with ControlClient(socket_path) as client:
+                assert client.call("ping") == "pong"
+
+                # 超长的请求只返回一个错误响应，不影响前后的请求
+                max_line_bytes = control.MAX_LINE_BYTES
+                control.MAX_LINE_BYTES = 1024
+                try:
+                    responses = client.pipeline([
+                        {"op": "ping"},
+                        {"op": "add", "time_str": "09:00", "message": "x" * 5000},
+                        {"op": "ping"},
+                    ])
+                finally:
+                    control.MAX_LINE_BYTES = max_line_bytes
+                assert [r["ok"] for r in responses] == [True, False, True], responses
+                assert "超过" in responses[1]["error"] and not manager.alarms, "超长请求处理错误"
+                alarm_id = client.call("add", time_str="09:00", message="开会", priority=2)
+                assert manager.get_alarm(alarm_id).message == "开会", "add未作用于闹钟管理器"
+                assert client.call("toggle", id=alarm_id) is False, "toggle应返回切换后的状态"
+                assert client.call("update", id=alarm_id, enabled=True, time_str="08:30")
+                assert client.call("get", id=alarm_id)["next_fire"] == "2024-01-01T08:30:00"
+
+                # 流水线：一次发送多个请求，错误请求不影响其他请求
+                responses = client.pipeline([
+                    {"op": "add", "time_str": "25:00"},
+                    {"op": "remove", "id": "missing"},
+                    {"op": "nope"},
+                    {"op": "add_many", "items": [{"time_str": f"10:{m:02d}"} for m in range(50)]},
+                ])
+                assert [r["ok"] for r in responses] == [False, False, False, True], responses
+                batch_ids = responses[3]["result"]
+                assert len(manager.alarms) == 51, f"闹钟数量错误: {len(manager.alarms)}"
+
+                assert client.call("set_enabled_many", ids=batch_ids[:10], enabled=False) == [True] * 10
+                assert client.call("update_many", updates=[{"id": batch_ids[10], "message": "x"}]) == [True]
+                upcoming = client.call("upcoming", limit=3)
+                assert [item["id"] for item in upcoming] == [alarm_id] + batch_ids[10:12], upcoming
+                assert len(client.call("upcoming", limit=100, within=3600)) == 1, "within过滤错误"
+                assert client.call("remove_many", ids=batch_ids + ["missing"]) == [True] * 50 + [False]
+                assert [alarm["id"] for alarm in client.call("list")] == [alarm_id]
+
+                client.call("pause")
+                assert client.call("status")["paused"], "pause未生效"
+                client.call("resume")
+                assert not manager.paused, "resume未生效"
+                client.call("remove", id=alarm_id)
+                assert not manager.alarms
+
+            # 同一路径不能重复监听；停止后删除套接字文件
+            try:
+                ControlServer(manager, socket_path).start()
+                assert False, "重复监听应失败"
+            except OSError:
+                pass
+        finally:
+            server.stop()
+        assert not os.path.exists(socket_path), "停止后未删除套接字文件"
+    assert len(changed) == 8, f"变化通知次数错误: {len(changed)}"
+    print("   [OK] 本地控制接口测试通过")
+
+
+def test_sharded_manager():
+    """测试多进程分片版闹钟管理器"""
+    print("1l. 测试多进程分片...")
+    import operator
+    from datetime import datetime, timedelta
+    from sharded_manager import ShardEvent, ShardedAlarmManager, shard_of
+
+    # 触发钩子必须可pickle：取闹钟的提醒内容作为钩子结果
+    manager = ShardedAlarmManager("test_shard_alarms.json", shards=2,
+                                  trigger_hook=operator.itemgetter("message"))
+    events = []
+    manager.on_alarm_event = events.append
+    manager.start()
+    try:
+        assert manager.sharded and len(manager._processes) == 2, "工作进程未启动"
+        fire_at = (datetime.now() + timedelta(seconds=1.5)).strftime("%H:%M:%S.%f")[:12]
+        ids = manager.add_alarms([{"time_str": fire_at, "message": f"m{i}"} for i in range(20)])
+        # 启动后的修改同步到工作进程：删除的不触发，修改后的按新内容触发
+        manager.remove_alarm(ids[0])
+        manager.update_alarm(ids[1], enabled=False)
+        manager.update_alarms([{"id": ids[2], "message": "changed"}])
+        assert sorted(manager.shard_sizes()) != [0, 19], f"分片不均: {manager.shard_sizes()}"
+
+        deadline = time.monotonic() + 10
+        while len(events) < 18 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.3)
+        assert len(events) == 18, f"触发次数错误: {len(events)}"
+        assert all(isinstance(event, ShardEvent) and event.error is None for event in events)
+        results = {event.id: event.result for event in events}
+        assert results[ids[2]] == "changed" and results[ids[3]] == "m3", "钩子结果错误"
+        assert {event.shard for event in events} == {0, 1}, "未在多个分片中触发"
+        assert all(event.shard == shard_of(event.id, 2) for event in events), "事件来自错误的分片"
+        # 父进程同步了触发状态，下一次触发在明天
+        assert manager.scheduled_time(ids[3]) > datetime.now() + timedelta(hours=23), "父进程未同步触发状态"
+    finally:
+        manager.stop()
+    assert not manager.sharded, "工作进程未停止"
+    print("   [OK] 多进程分片测试通过")
+
+
+def test_metrics():
+    """测试运行指标"""
+    print("1m. 测试运行指标...")
+    import tempfile
+    from datetime import datetime, timedelta
+    from clock import VirtualClock
+    from control import ControlServer
+    from metrics import MetricsDumper, MetricsRegistry
+
+    registry = MetricsRegistry()
+    clock = VirtualClock(datetime(2026, 3, 1, 8, 0))
+    manager = AlarmManager("test_metrics_alarms.json", clock=clock, grace_seconds=600,
+                           metrics=registry)
+    manager.add_alarm("08:00:30", True, None)
+    manager.add_alarm("08:10", True, None)
+    manager.reschedule()
+
+    # 迟到1秒触发；08:10迟到超过补发窗口被跳过
+    clock.advance(31)
+    manager.tick()
+    clock.jump(timedelta(minutes=30))
+    manager.tick()
+    lateness = registry.get("alarm_fire_lateness_seconds").labels()
+    assert lateness.count == 1 and lateness.quantile(0.5) == 1.0, f"迟到直方图错误: {lateness.snapshot()}"
+    assert registry.get("alarm_missed_total").labels().value == 1, "跳过计数错误"
+    assert registry.get("scheduler_tick_seconds").labels().count == 2, "调度耗时未记录"
+
+    # 整体保存记录耗时和持锁生成快照的时间
+    holds = registry.get("alarm_save_lock_hold_seconds").labels().count
+    manager.save_alarms()
+    assert registry.get("alarm_save_seconds").labels().count == 1, "保存耗时未记录"
+    assert registry.get("alarm_save_lock_hold_seconds").labels().count == holds + 1, "持锁时间未记录"
+
+    # 带标签的指标和重复注册
+    plays = registry.histogram("audio_play_start_seconds", "", ("mode",))
+    plays.labels("cached").observe(0.0002)
+    assert registry.histogram("audio_play_start_seconds", "", ("mode",)) is plays, "重复注册应返回已有指标"
+    try:
+        registry.counter("audio_play_start_seconds", "")
+        assert False, "同名不同类型的指标应注册失败"
+    except ValueError:
+        pass
+
+    # Prometheus文本格式：累积分桶、+Inf、_sum、_count
+    text = registry.to_prometheus()
+    for line in ('# TYPE alarm_fire_lateness_seconds histogram',
+                 'alarm_fire_lateness_seconds_bucket{le="0.5"} 0',
+                 'alarm_fire_lateness_seconds_bucket{le="1"} 1',
+                 'alarm_fire_lateness_seconds_bucket{le="+Inf"} 1',
+                 'alarm_fire_lateness_seconds_sum 1',
+                 'alarm_fire_lateness_seconds_count 1',
+                 'alarm_missed_total 1',
+                 'audio_play_start_seconds_bucket{mode="cached",le="0.0005"} 1'):
+        assert line in text.splitlines(), f"Prometheus文本缺少: {line}"
+
+    # 控制接口读取指标（可序列化为JSON）
+    server = ControlServer(manager)
+    result = server.handle({"op": "metrics"})["result"]
+    series = result["alarm_fire_lateness_seconds"]["series"][0]["value"]
+    assert series["buckets"]["+Inf"] == 1 and series["count"] == 1, f"指标快照错误: {series}"
+    assert server.handle({"op": "metrics", "format": "prometheus"})["result"] == registry.to_prometheus()
+
+    # 定期写入文件，停止时再写一次
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "metrics.prom")
+        dumper = MetricsDumper(registry, path, interval=0.05)
+        dumper.start()
+        deadline = time.monotonic() + 5
+        while not os.path.exists(path) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert os.path.exists(path), "未定期写入指标文件"
+        manager.tick()
+        dumper.stop()
+        with open(path, encoding="utf-8") as f:
+            assert "scheduler_tick_seconds_count 3" in f.read().splitlines(), "停止时未写入最终指标"
+    print("   [OK] 运行指标测试通过")
+
+
 def test_audio_player():
     """测试音频播放器"""
     print("2. 测试音频播放器...")
     player = AudioPlayer()
 
-    # 测试初始化
-    assert player.initialized, "音频播放器初始化失败"
+    # mixer延迟到第一次播放或预热时初始化
+    assert not player.initialized, "创建音频播放器时不应初始化mixer"
+    assert player.ensure_mixer() and player.initialized, "音频播放器初始化失败"
 
     # 测试音量设置
     player.set_volume(0.7)
@@ -62,10 +998,170 @@ def test_audio_player():
     time.sleep(0.5)  # 等待播放
     player.stop()
 
+    # 小文件整体解码播放，超过阈值的大文件流式播放
+    import tempfile
+    import wave
+    with tempfile.TemporaryDirectory() as workdir:
+        clips = {}
+        for name, seconds in (("short.wav", 0.5), ("long.wav", 3)):
+            clips[name] = os.path.join(workdir, name)
+            with wave.open(clips[name], "wb") as f:
+                f.setnchannels(2)
+                f.setsampwidth(2)
+                f.setframerate(22050)
+                f.writeframes(bytes(int(22050 * seconds) * 4))
+        player.stream_threshold = os.path.getsize(clips["short.wav"])
+        player.play_alarm(clips["short.wav"], key="short")
+        assert not player.streaming and player.is_playing("short"), "小文件应整体解码播放"
+        player.play_alarm(clips["long.wav"], key="long")
+        assert player.streaming and player.is_playing("long"), "大文件应流式播放"
+        modes = [mode for _, _, mode in player.play_latencies][-2:]
+        assert modes == ["decoded", "stream"], f"播放方式统计错误: {modes}"
+        from metrics import REGISTRY
+        starts = REGISTRY.get("audio_play_start_seconds")
+        assert starts.labels("stream").count >= 1, "未记录流式播放的开始延迟"
+
+        # 同时响铃的闹钟各占一个通道，只停止自己的声音
+        player.play_alarm(clips["short.wav"], key="other")
+        player.stop("short")
+        assert not player.is_playing("short") and player.is_playing("other"), "停止了其他闹钟的声音"
+        player.set_volume(0.3)
+        player.stop()
+        assert not player.streaming and not player.is_playing(), "停止后仍在播放"
+
+        # 默认流式阈值按缓存上限推算；解码后超过缓存上限的文件只预热一次
+        small = AudioPlayer(cache_bytes=64 * 1024)
+        assert small.stream_threshold == 64 * 1024 // 10, f"默认流式阈值错误: {small.stream_threshold}"
+        small.stream_threshold = os.path.getsize(clips["long.wav"])  # 约258KB，整体解码
+        small.prewarm([clips["long.wav"]])
+        deadline = time.time() + 5
+        while not small.sound_cache.too_large(clips["long.wav"]) and time.time() < deadline:
+            time.sleep(0.05)
+        assert small.sound_cache.too_large(clips["long.wav"]), "未记录超过缓存上限的音频"
+        small.prewarm([clips["long.wav"]])
+        time.sleep(0.2)
+        assert small.sound_cache.stats["misses"] == 1, f"超过缓存上限的音频被重复预热: {small.sound_cache.stats}"
+        small.cleanup()
+
     print("   [OK] 音频播放器测试通过")
     return player
 
 
+def test_sound_cache():
+    """测试解码音频缓存"""
+    print("2b. 测试解码音频缓存...")
+    import tempfile
+    from audio_cache import SoundCache
+
+    decoded = []
+
+    def loader(path):
+        decoded.append(os.path.basename(path))
+        with open(path, "rb") as f:
+            return f.read()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = {}
+        for name, size in (("a.wav", 400), ("b.wav", 300), ("c.wav", 500)):
+            paths[name] = os.path.join(workdir, name)
+            with open(paths[name], "wb") as f:
+                f.write(b"x" * size)
+        cache = SoundCache(loader, len, max_bytes=1000)
+
+        # 连续播放同一文件只解码一次
+        cache.get(paths["a.wav"])
+        cache.get(paths["a.wav"])
+        cache.get(paths["b.wav"])
+        assert decoded == ["a.wav", "b.wav"], f"重复解码: {decoded}"
+        assert cache.stats["hits"] == 1 and cache.stats["misses"] == 2, f"命中统计错误: {cache.stats}"
+
+        # 超过字节上限时淘汰最久未使用的（a刚被使用，淘汰b）
+        cache.get(paths["a.wav"])
+        cache.get(paths["c.wav"])
+        assert cache.size_bytes == 900 and not cache.contains(paths["b.wav"]), f"淘汰错误: {cache.info()}"
+        assert cache.stats["evictions"] == 1, f"淘汰统计错误: {cache.stats}"
+
+        # 文件大小或修改时间变化后重新解码
+        with open(paths["a.wav"], "wb") as f:
+            f.write(b"y" * 450)
+        assert cache.get(paths["a.wav"]) == b"y" * 450, "文件变化后未重新解码"
+        assert cache.stats["invalidations"] == 1 and cache.size_bytes == 950, f"失效处理错误: {cache.info()}"
+
+        # 超过上限的音频不缓存，记下后too_large为真；文件变化后重新判断
+        big = os.path.join(workdir, "big.wav")
+        with open(big, "wb") as f:
+            f.write(b"z" * 1200)
+        cache.get(big)
+        assert not cache.contains(big) and cache.too_large(big), f"超过上限的音频处理错误: {cache.info()}"
+        assert cache.size_bytes == 950, "超过上限的音频不应挤掉其他缓存"
+        with open(big, "wb") as f:
+            f.write(b"z" * 100)
+        assert not cache.too_large(big), "文件变化后仍判断为超过上限"
+        cache.get(big)
+        assert cache.contains(big) and not cache.too_large(big), "缩小后的音频应进入缓存"
+
+        cache.clear()
+        assert len(cache) == 0 and cache.size_bytes == 0, "清空缓存失败"
+        try:
+            cache.get(os.path.join(workdir, "missing.wav"))
+            assert False, "文件不存在时应抛出OSError"
+        except OSError:
+            pass
+    print("   [OK] 解码音频缓存测试通过")
+
+
+def test_channel_pool():
+    """测试播放通道池"""
+    print("2c. 测试播放通道池...")
+    from channel_pool import ChannelPool
+
+    class FakeChannel:
+        def __init__(self, index):
+            self.index = index
+            self.sound = None
+
+        def play(self, sound, loops=0):
+            self.sound = sound
+
+        def stop(self):
+            self.sound = None
+
+        def fadeout(self, duration):
+            self.sound = None
+
+        def set_volume(self, volume):
+            self.volume = volume
+
+        def get_busy(self):
+            return self.sound is not None
+
+    sizes = []
+    pool = ChannelPool(FakeChannel, sizes.append, channels=2, max_channels=4)
+    for key, priority in (("a", 0), ("b", 5), ("c", 0), ("d", 1)):
+        assert pool.play(key, f"sound-{key}", loops=-1, priority=priority), f"{key}应能播放"
+    assert len(pool) == 4 and sizes == [2, 4], f"通道池未扩容: {sizes}"
+
+    # 通道用完：抢占优先级最低且最早的a；优先级低于所有声音时不播放
+    assert pool.play("e", "sound-e", priority=0), "同优先级应抢占最早的声音"
+    assert sorted(pool.active_keys()) == ["b", "c", "d", "e"], f"抢占错误: {pool.active_keys()}"
+    assert not pool.play("f", "sound-f", priority=-1), "低优先级不应抢占"
+    assert pool.stats["stolen"] == 1 and pool.stats["rejected"] == 1, f"统计错误: {pool.stats}"
+
+    # 每个声音单独停止和淡出，同一个键再次播放时替换
+    pool.stop("c")
+    pool.fadeout("d", 500)
+    assert sorted(pool.active_keys()) == ["b", "e"], f"单独停止错误: {pool.active_keys()}"
+    pool.play("b", "sound-b2", priority=5)
+    assert sorted(pool.active_keys()) == ["b", "e"], "同一个键应替换原来的声音"
+    pool.stop_all()
+    assert not pool.is_playing(), "全部停止失败"
+
+    never = ChannelPool(FakeChannel, channels=1, max_channels=1, policy="none")
+    never.play("x", "sound-x", priority=0)
+    assert not never.play("y", "sound-y", priority=9), "none策略不应抢占"
+    print("   [OK] 播放通道池测试通过")
+
+
 def test_config():
     """测试配置管理器"""
     print("3. 测试配置管理器...")
@@ -147,7 +1243,32 @@ def main():
     try:
         # 运行所有测试
         manager = test_alarm_manager()
+        test_alarm_scheduler("heap")
+        test_alarm_scheduler("wheel")
+        test_alarm_index()
+        test_simulation()
+        test_clock_jump("heap")
+        test_clock_jump("wheel")
+        test_precise_alarms("heap")
+        test_precise_alarms("wheel")
+        test_recurrence()
+        test_countdown("heap")
+        test_countdown("wheel")
+        test_prewarm()
+        test_one_shot_reload()
+        test_journal()
+        test_atomic_write()
+        test_sqlite_storage()
+        test_bulk_operations()
+        test_async_manager()
+        test_callback_dispatcher()
+        test_headless_daemon()
+        test_control_api()
+        test_sharded_manager()
+        test_metrics()
         player = test_audio_player()
+        test_sound_cache()
+        test_channel_pool()
         config = test_config()
         tray = test_tray_icon()
         gui = test_gui_creation()
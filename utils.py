@@ -6,15 +6,34 @@ from datetime import datetime
 
 
 def validate_time_format(time_str: str) -> bool:
-    """验证时间格式 (HH:MM 24小时制)"""
-    pattern = r'^([01]?[0-9]|2[0-3]):[0-5][0-9]$'
-    if re.match(pattern, time_str):
-        try:
-            datetime.strptime(time_str, "%H:%M")
-            return True
-        except ValueError:
-            return False
-    return False
+    """验证时间格式 (24小时制 HH:MM，可带秒 HH:MM:SS 和毫秒 HH:MM:SS.mmm)"""
+    pattern = r'^([01]?[0-9]|2[0-3]):[0-5][0-9](:[0-5][0-9](\.[0-9]{1,3})?)?$'
+    return bool(re.match(pattern, time_str))
+
+
+def _is_digits(text: str, max_length: int) -> bool:
+    return 0 < len(text) <= max_length and text.isascii() and text.isdigit()
+
+
+def parse_time_of_day(time_str: str) -> int:
+    """把"HH:MM"、"HH:MM:SS"或"HH:MM:SS.mmm"解析为一天中的毫秒数"""
+    hour_str, sep, rest = time_str.partition(":")
+    minute_str, has_second, second_str = rest.partition(":")
+    second_str, has_fraction, fraction_str = second_str.partition(".")
+    if (sep and _is_digits(hour_str, 2) and _is_digits(minute_str, 2) and
+            (not has_second or _is_digits(second_str, 2)) and
+            (not has_fraction or (has_second and _is_digits(fraction_str, 3)))):
+        hour, minute = int(hour_str), int(minute_str)
+        second = int(second_str) if has_second else 0
+        if hour < 24 and minute < 60 and second < 60:
+            millisecond = int(fraction_str.ljust(3, "0")) if has_fraction else 0
+            return ((hour * 60 + minute) * 60 + second) * 1000 + millisecond
+    raise ValueError(f"无效的时间格式: {time_str!r}")
+
+
+def parse_minute_of_day(time_str: str) -> int:
+    """把时间字符串解析为一天中的分钟数（秒和毫秒被舍去）"""
+    return parse_time_of_day(time_str) // 60000
 
 
 def format_time_display(time_str: str) -> str:
@@ -61,7 +80,7 @@ if __name__ == "__main__":
     # 测试代码
     print("测试工具函数...")
 
-    test_times = ["14:30", "25:00", "09:15", "9:5", "23:59"]
+    test_times = ["14:30", "25:00", "09:15", "9:5", "23:59", "07:30:15", "07:30:15.250", "07:30.5"]
     for time_str in test_times:
         valid = validate_time_format(time_str)
         print(f"{time_str}: {'有效' if valid else '无效'}")